@@ -1,47 +1,90 @@
 #!/usr/bin/env python3
 """
 Script para corrigir todos os fragments JSX mal balanceados no checkout.tsx
+
+As correções valem para o layout antigo da página, em que os ramos de
+loading e de status de pagamento ainda não tinham fragments.  O checkout.tsx
+atual já não tem esse layout: nele o script não altera nada e termina
+dizendo que o layout não foi encontrado.
 """
 
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from codemods.apply import Change, write_changes
+from codemods.balance import BalanceError
+from codemods.patch import INSERT_BEFORE, Anchor, AnchorError, Edit, edit_splices
+from codemods.verify import VerifyError
+
+# Âncoras: cada fragment é fechado antes da linha que encerra o seu ramo
+DESKTOP_LOADING = Anchor('{isLoading ? (')
+DESKTOP_ELSE = Anchor(') : (', after=DESKTOP_LOADING)
+PIX_APPROVED = Anchor("{pixPaymentStatus === 'approved' ? (")
+PIX_REJECTED = Anchor('// Payment Rejected State')
+PIX_PENDING = Anchor(') : (', after=PIX_REJECTED)
+CARD_REJECTED = Anchor('// Payment Rejected State', after=Anchor(')}', after=PIX_PENDING))
+CARD_PENDING = Anchor(') : (', after=CARD_REJECTED)
+MOBILE_LOADING = Anchor('{isLoading ? (', occurrence=2)
+MOBILE_ELSE = Anchor(') : (', after=MOBILE_LOADING)
+
+
+def primeira_linha(ramo):
+    """A primeira linha do ramo aberto por ``ramo`` ("? (" ou ") : (")."""
+    return ramo._replace(offset=ramo.offset + 1)
+
+
+# Definir as correções: linha antes da qual adicionar </>, com a indentação
+# do conteúdo do ramo que ele fecha (a indentação vem da própria página)
+CORRECTIONS = [
+    # Seção 1 - Botões loading (Desktop)
+    Edit(DESKTOP_ELSE, INSERT_BEFORE, "</>", level=0, like=primeira_linha(DESKTOP_LOADING)),
+    Edit(Anchor(')}', after=DESKTOP_ELSE), INSERT_BEFORE, "</>", level=0,
+         like=primeira_linha(DESKTOP_ELSE)),
+
+    # Seção 2 - PIX Payment Results
+    Edit(Anchor(") : pixPaymentStatus === 'rejected' ? ("), INSERT_BEFORE, "</>", level=0,
+         like=primeira_linha(PIX_APPROVED)),  # approved
+    Edit(PIX_PENDING, INSERT_BEFORE, "</>", level=0, like=PIX_REJECTED),  # rejected
+    Edit(Anchor(')}', after=PIX_PENDING), INSERT_BEFORE, "</>", level=0,
+         like=primeira_linha(PIX_PENDING)),  # pending
+
+    # Seção 3 - Credit Card Payment Results
+    Edit(CARD_PENDING, INSERT_BEFORE, "</>", level=0, like=CARD_REJECTED),  # rejected
+    Edit(Anchor(')}', after=CARD_PENDING), INSERT_BEFORE, "</>", level=0,
+         like=primeira_linha(CARD_PENDING)),  # pending
+
+    # Seção 4 - Botões loading (Mobile)
+    Edit(MOBILE_ELSE, INSERT_BEFORE, "</>", level=0, like=primeira_linha(MOBILE_LOADING)),
+    Edit(Anchor(')}', after=MOBILE_ELSE), INSERT_BEFORE, "</>", level=0,
+         like=primeira_linha(MOBILE_ELSE)),
+]
+
+
 def fix_fragments():
-    # Ler o arquivo
-    with open('src/pages/checkout.tsx', 'r') as f:
-        lines = f.readlines()
-    
-    # Definir as correções: linha onde adicionar </> após determinado conteúdo
-    corrections = [
-        # Seção 1 - Botões loading (Desktop)
-        {"after_line": 3199, "content": "                              </>"},  # Fecha fragment linha 3195
-        {"after_line": 3210, "content": "                              </>"},  # Fecha fragment linha 3201
-        
-        # Seção 2 - PIX Payment Results 
-        {"after_line": 3263, "content": "                    </>"},  # Fecha fragment linha 3244 (approved)
-        {"after_line": 3282, "content": "                    </>"},  # Fecha fragment linha 3268 (rejected)
-        {"after_line": 3301, "content": "                    </>"},  # Fecha fragment linha 3286 (pending)
-        
-        # Seção 3 - Credit Card Payment Results
-        {"after_line": 3423, "content": "                    </>"},  # Fecha fragment linha 3406 (rejected)
-        {"after_line": 3445, "content": "                    </>"},  # Fecha fragment linha 3427 (pending)
-        
-        # Seção 4 - Botões loading (Mobile)
-        {"after_line": 3504, "content": "                  </>"},  # Fecha fragment linha 3500
-        {"after_line": 3515, "content": "                  </>"},  # Fecha fragment linha 3506
-    ]
-    
-    # Aplicar correções em ordem reversa para não afetar números de linha
-    corrections.reverse()
-    
-    for correction in corrections:
-        line_idx = correction["after_line"] - 1  # Convert to 0-based index
-        if line_idx < len(lines):
-            # Inserir a linha de fechamento após a linha especificada
-            lines.insert(line_idx + 1, correction["content"] + "\n")
-    
-    # Escrever o arquivo corrigido
-    with open('src/pages/checkout.tsx', 'w') as f:
-        f.writelines(lines)
-    
-    print("Fragmentos JSX corrigidos com sucesso!")
+    # Ler o arquivo como bytes: fim de linha (CRLF/LF), BOM e acentos
+    # fora das linhas editadas são gravados de volta exatamente como estão.
+    # O caminho é relativo à raiz do repositório, de onde quer que o script rode
+    page = Change('client/src/pages/checkout.tsx')
+
+    # Todas as âncoras são resolvidas antes de qualquer alteração; o resultado
+    # precisa continuar balanceado e não pode mudar nada fora das inserções.
+    # O arquivo é gravado de uma vez (arquivo temporário + rename), para o
+    # Vite nunca ler o arquivo pela metade, e as inserções ficam no journal
+    # (python -m codemods.journal --rollback desfaz a execução)
+    try:
+        page.splices, applied = edit_splices(page.text, CORRECTIONS)
+    except AnchorError as e:
+        sys.exit(f"Nenhuma alteração feita: {page.name} não tem o layout que estas "
+                 f"correções esperam (já corrigido, ou alterado desde então): {e}")
+    try:
+        write_changes([page])
+    except (BalanceError, VerifyError) as e:
+        print(f"Nenhuma alteração feita: {e}")
+        return
+
+    print(f"Fragmentos JSX corrigidos com sucesso! ({len(applied)} fechamentos inseridos)")
 
 if __name__ == "__main__":
-    fix_fragments()
\ No newline at end of file
+    fix_fragments()
@@ -1,35 +1,48 @@
 #!/usr/bin/env python3
-import re
+import os
+import sys
 
-# Read the file
-with open('src/pages/checkout.tsx', 'r') as f:
-    content = f.read()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
-print("Applying JSX Fragment corrections...")
+from codemods.apply import Change, write_changes
+from codemods.balance import BalanceError
+from codemods.fragments import fragment_splices, wrap_ternary_fragments
+from codemods.verify import VerifyError
 
-# Fix 1: isLoading ternary (lines around 3196-3198)
-# Pattern: {isLoading ? ( <div...> <span...> ) : (
-pattern1 = r'({isLoading \? \(\s*\n\s*)(<div[^>]*>.*?</div>\s*\n\s*<span[^>]*>.*?</span>)(\s*\n.*?\) : \()'
-replacement1 = r'\1<>\2</>\3'
-content = re.sub(pattern1, replacement1, content, flags=re.DOTALL)
+PAGE = 'client/src/pages/checkout.tsx'
 
-# Fix 2: pixPaymentStatus === 'approved' ternary
-pattern2 = r'({pixPaymentStatus === [\'"]approved[\'"] \? \(\s*\n\s*// Payment Confirmed State\s*\n)(\s*<div[^>]*>.*?</p>\s*\n)(\s*\) : pixPaymentStatus === [\'"]rejected[\'"] \?)'
-replacement2 = r'\1<>\2</>\3'
-content = re.sub(pattern2, replacement2, content, flags=re.DOTALL)
 
-# Fix 3: pixPaymentStatus === 'rejected' ternary
-pattern3 = r'({pixPaymentStatus === [\'"]rejected[\'"] \? \(\s*\n\s*// Payment Rejected State\s*\n)(\s*<div[^>]*>.*?</p>\s*\n)(\s*\) : \()'
-replacement3 = r'\1<>\2</>\3'
-content = re.sub(pattern3, replacement3, content, flags=re.DOTALL)
+def fix_jsx_fragments(content):
+    # One pass over the file: the isLoading, pixPaymentStatus ('approved' /
+    # 'rejected') and isCopying ternaries get their multi-root branches
+    # wrapped in <>...</>
+    return wrap_ternary_fragments(content)
 
-# Fix 4: isCopying ternary - check if needed
-pattern4 = r'({isCopying \? \(\s*\n)(\s*<span[^>]*>.*?</span>\s*\n)(\s*\) : \()'
-replacement4 = r'\1<>\2</>\3'
-content = re.sub(pattern4, replacement4, content, flags=re.DOTALL)
 
-# Write back to file
-with open('src/pages/checkout.tsx', 'w') as f:
-    f.write(content)
+def fix_page(path=PAGE, journal=True):
+    # Read the file as bytes (the path is from the repository root, wherever
+    # this runs); only the inserted fragments are re-encoded
+    page = Change(path)
 
-print("JSX Fragment corrections applied successfully!")
\ No newline at end of file
+    print("Applying JSX Fragment corrections...")
+    page.splices = fragment_splices(page.text)
+    if not page:
+        print("No JSX Fragment corrections needed: no multi-root branch found.")
+        return 0
+
+    # Refuse to write output whose tags and brackets no longer pair up, or
+    # whose bytes differ from the page anywhere but at the inserted fragments.
+    # Write back to file in one rename, so the dev server never reads half a page,
+    # and record the splices for python -m codemods.journal --rollback
+    try:
+        write_changes([page], journal=journal)
+    except (BalanceError, VerifyError) as e:
+        sys.exit(f"Not writing {page.path.name}: {e}")
+
+    wrapped = len(page.splices) // 2  # "<>" and "</>" per branch
+    print(f"JSX Fragment corrections applied: {wrapped} branch(es) wrapped.")
+    return wrapped
+
+
+if __name__ == '__main__':
+    fix_page()
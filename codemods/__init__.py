@@ -0,0 +1,10 @@
+"""
+Codemod tooling for the UNIPET TSX sources.
+
+The modules in this package back the ``fix_*`` scripts in the repository
+root and in ``client/``.  They share one tokenizer (``scanner``) so every
+transform walks a file in a single linear pass instead of stacking
+``re.DOTALL`` substitutions over the whole page, and one I/O layer
+(``apply``) that reads, checks, writes and journals what a script changes.
+``python -m codemods`` is the entry point to the tools (see ``__main__``).
+"""
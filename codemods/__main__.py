@@ -0,0 +1,71 @@
+"""
+The codemod tools behind one command.
+
+Usage (from the repository root)::
+
+    python -m codemods list                         # the transforms and commands
+    python -m codemods run -t fragments --check     # codemods.runner
+    python -m codemods watch                        # codemods.watch
+    python -m codemods journal --rollback           # codemods.journal
+    python -m codemods plan run.json --diff         # codemods.plan
+    python -m codemods logs --report                # codemods.logs
+    python -m codemods symbols | routes | duplicates | bench ...
+
+``python -m codemods COMMAND ARGS`` runs ``main(ARGS)`` of the command's
+module, which is only imported then: a command loads its own dependencies
+and nothing else, and transforms are only imported when they are selected
+(see ``codemods.transforms``).
+"""
+
+import importlib
+import sys
+from typing import Optional, Sequence
+
+# Command -> (module, one-line summary)
+COMMANDS = {
+    'run': ('codemods.runner', 'apply transforms to the client pages'),
+    'watch': ('codemods.watch', 'apply transforms to pages as they are saved'),
+    'journal': ('codemods.journal', 'list or roll back the runs that wrote files'),
+    'plan': ('codemods.plan', 'review, merge or apply saved edit plans'),
+    'symbols': ('codemods.symbols', 'refresh or query the symbol index'),
+    'imports': ('codemods.imports', 'list what imports a file, or what it imports'),
+    'logs': ('codemods.logs', 'gate the console.log calls of the server behind LOG_LEVEL'),
+    'routes': ('codemods.routes', 'print the route table of the Express server'),
+    'duplicates': ('codemods.duplicates', 'find near-duplicate TSX files'),
+    'bench': ('codemods.bench', 'benchmark the codemod scripts'),
+}
+
+
+def usage() -> str:
+    lines = ['usage: python -m codemods COMMAND [ARGS...]', '', 'commands:']
+    lines.extend('  %-11s %s' % (name, summary) for name, (_, summary) in COMMANDS.items())
+    lines.append('  %-11s %s' % ('list', 'list the transforms and whether they run by default'))
+    lines.append('')
+    lines.append("'python -m codemods COMMAND -h' shows the options of a command.")
+    return '\n'.join(lines)
+
+
+def list_transforms() -> int:
+    from .transforms import DEFAULT_TRANSFORMS, TRANSFORMS
+    for name, module in TRANSFORMS.modules.items():
+        print('%-12s %-8s %s' % (name, 'default' if name in DEFAULT_TRANSFORMS else '', module))
+    return 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return 0 if argv else 2
+    command, rest = argv[0], argv[1:]
+    if command == 'list':
+        return list_transforms()
+    if command not in COMMANDS:
+        print('unknown command %r\n\n%s' % (command, usage()), file=sys.stderr)
+        return 2
+    module = importlib.import_module(COMMANDS[command][0])
+    return module.main(rest)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Read, check and write the files a fix script changes.
+
+The fix scripts all do the same thing around their own edits: read a page
+as bytes, splice their edits in, refuse the result when its tags and
+brackets no longer pair up (``codemods.balance``) or when tokens outside the
+edits changed (``codemods.verify``), then write every file in one batch and
+record the run in the undo journal (``codemods.journal``).  ``Change`` and
+``write_changes`` are that part, once.
+
+Paths are relative to the repository root, not to the working directory,
+so a script behaves the same wherever it is started from::
+
+    change = Change('client/src/pages/checkout.tsx')
+    change.splices = fragment_splices(change.text)
+    journal = write_changes([change])
+"""
+
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from .balance import check_balance
+from .journal import Journal
+from .output import FlushError, WriteBatch
+from .patch import apply_splices
+from .source import Source, read_source
+from .store import REPO_ROOT
+from .verify import check_edits
+
+Splice = Tuple[int, int, str]
+
+
+def repo_path(path) -> Path:
+    """``path`` resolved against the repository root (absolute paths as they are)."""
+    return REPO_ROOT / path
+
+
+class Change:
+    """The splices one script makes to one file, against its text as read."""
+
+    def __init__(self, path, splices: Sequence[Splice] = ()):
+        self.path = repo_path(path)
+        self.source: Source = read_source(self.path)
+        self.splices: List[Splice] = list(splices)
+
+    @property
+    def text(self) -> str:
+        return self.source.text
+
+    @property
+    def name(self) -> str:
+        """The path relative to the repository root, for messages."""
+        try:
+            return str(self.path.relative_to(REPO_ROOT))
+        except ValueError:
+            return str(self.path)
+
+    @property
+    def jsx(self) -> bool:
+        return self.path.suffix != '.ts'
+
+    def __bool__(self) -> bool:
+        return any(self.text[s:e] != r for s, e, r in self.splices)
+
+    def check(self) -> bytes:
+        """The new bytes of the file, after the balance and token checks.
+
+        Raises ``BalanceError`` or ``VerifyError`` when the edits broke it.
+        """
+        text = self.text
+        output = self.source.splice(self.splices)
+        check_balance(text, apply_splices(text, self.splices), jsx=self.jsx)
+        check_edits(text, Source(output).text, [(s, e) for s, e, _ in self.splices],
+                    jsx=self.jsx)
+        return output
+
+
+def write_changes(changes: Sequence[Change], journal: bool = True) -> Optional[Journal]:
+    """Check every change, then write them all in one batch; return the journal.
+
+    Nothing is written when any change fails its checks (the error is
+    raised).  Changes without an effect are left out; with ``journal`` the
+    written ones are recorded for ``python -m codemods.journal --rollback``,
+    also when a rename fails partway (``FlushError``, raised once the files
+    replaced before it are recorded).
+    """
+    batch = WriteBatch()
+    record = Journal() if journal else None
+    for change in changes:
+        if not change:
+            continue
+        batch.add(change.path, change.check())
+        if record is not None:
+            record.add(change.path, change.source.data, change.source.byte_splices(change.splices))
+    try:
+        written = batch.flush()
+    except FlushError as e:  # the files renamed before the failure can still be undone
+        if record is not None:
+            record.save(e.written)
+        raise
+    if record is not None:
+        record.save(written)
+    return record
@@ -0,0 +1,198 @@
+"""
+Open/close pairing index for TSX sources.
+
+``PairIndex`` makes one pass over the scanner's token stream with a stack
+and records where every JSX element, fragment, ``{}``, ``()``, ``[]`` and
+template ``${}`` opens and closes.  "What closes the node opened at line
+N" is then a dictionary lookup.  Anything that could not be paired is kept
+in ``problems``, and so are adjacent JSX roots in an expression (``( <a />
+<b /> )``), which pair up but need a fragment around them.
+
+``check_balance`` is the gate the runner and the fix scripts apply to a
+transform's output before writing it: output that pairs worse than its
+input is rejected with a ``BalanceError``.
+"""
+
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .scanner import (
+    COMMENT, PUNCT, TAG_CLOSE, TAG_OPEN, TAG_SELF_CLOSE, TEMPLATE, tokenize,
+)
+
+ELEMENT = 'element'
+FRAGMENT = 'fragment'
+BRACE = 'brace'
+PAREN = 'paren'
+BRACKET = 'bracket'
+SUBSTITUTION = 'substitution'  # "${" ... "}" inside a template literal
+
+_CLOSE_TAG = re.compile(r'</\s*[\w$.:-]*\s*>')
+_OPENERS = {'{': BRACE, '(': PAREN, '[': BRACKET}
+_CLOSERS = {'}': BRACE, ')': PAREN, ']': BRACKET}
+
+
+class BalanceError(ValueError):
+    """A transform produced output with unpaired tags or brackets."""
+
+
+class Pair(NamedTuple):
+    """A node from its opening token to its closing one.
+
+    ``name`` is the tag name for elements (``''`` otherwise).  For
+    self-closing elements the closing token is the ``/>``.
+    """
+    kind: str
+    name: str
+    open_start: int
+    open_end: int
+    close_start: int
+    close_end: int
+    open_line: int
+    close_line: int
+
+
+class Problem(NamedTuple):
+    pos: int
+    line: int
+    message: str
+
+
+def _describe(kind: str, name: str) -> str:
+    if kind == ELEMENT:
+        return '<%s>' % name
+    if kind == FRAGMENT:
+        return '<>'
+    return {BRACE: '{', PAREN: '(', BRACKET: '[', SUBSTITUTION: '${'}[kind]
+
+
+class PairIndex:
+    """Every open/close pair of ``text``, indexed by offset and by line."""
+
+    def __init__(self, text: str, jsx: bool = True):
+        self.pairs: List[Pair] = []
+        self.problems: List[Problem] = []
+        self._by_open: Dict[int, int] = {}
+        self._by_close: Dict[int, int] = {}
+        self._by_line: Dict[int, List[int]] = {}
+
+        # (kind, name, start, end, line) of the nodes still open
+        stack: List[Tuple[str, str, int, int, int]] = []
+        line, counted = 1, 0
+        root_end = False  # the last token closed a JSX root in an expression
+
+        def close(kind, name, start, end):
+            # Pop to the nearest matching opener; anything above it was never closed
+            for i in range(len(stack) - 1, -1, -1):
+                if stack[i][0] == kind and (kind != ELEMENT or stack[i][1] == name):
+                    break
+            else:
+                self.problems.append(Problem(start, line, 'unmatched closing %s'
+                                             % text[start:end].strip()))
+                return
+            while len(stack) > i + 1:
+                self._unclosed(stack.pop())
+            o_kind, o_name, o_start, o_end, o_line = stack.pop()
+            self._add(Pair(kind, name, o_start, o_end, start, end, o_line, line))
+
+        for tok in tokenize(text, jsx=jsx):
+            kind, start, end = tok.kind, tok.start, tok.end
+            line += text.count('\n', counted, start)
+            counted = start
+            if kind == COMMENT:
+                continue
+            if kind == TAG_OPEN and root_end:
+                self.problems.append(Problem(start, line, 'adjacent JSX elements need a fragment'))
+            root_end = False
+            if kind == PUNCT:
+                char = text[start]
+                if end - start != 1:
+                    continue
+                if char == '<' and jsx:
+                    stray = _CLOSE_TAG.match(text, start)
+                    if stray:  # "</x>" outside JSX children: nothing to close
+                        self.problems.append(Problem(start, line, 'unmatched closing %s'
+                                                     % stray.group()))
+                elif char in _OPENERS:
+                    stack.append((_OPENERS[char], '', start, end, line))
+                elif char in _CLOSERS:
+                    close(_CLOSERS[char], '', start, end)
+            elif kind == TAG_OPEN:
+                name = text[start + 1:end].strip()
+                if name == '>':
+                    stack.append((FRAGMENT, '', start, end, line))
+                else:
+                    stack.append((ELEMENT, name, start, end, line))
+            elif kind == TAG_SELF_CLOSE:
+                if stack and stack[-1][0] == ELEMENT:
+                    close(ELEMENT, stack[-1][1], start, end)
+                    root_end = not stack or stack[-1][0] not in (ELEMENT, FRAGMENT)
+                else:
+                    self.problems.append(Problem(start, line, 'stray />'))
+            elif kind == TAG_CLOSE:
+                name = text[start + 2:end - 1].strip()
+                close(ELEMENT if name else FRAGMENT, name, start, end)
+                root_end = not stack or stack[-1][0] not in (ELEMENT, FRAGMENT)
+            elif kind == TEMPLATE:
+                if text[start] == '}':
+                    close(SUBSTITUTION, '', start, start + 1)
+                if end - start >= 2 and text.startswith('${', end - 2):
+                    stack.append((SUBSTITUTION, '', end - 2, end, line))
+        while stack:
+            self._unclosed(stack.pop())
+
+    def _add(self, pair: Pair) -> None:
+        index = len(self.pairs)
+        self.pairs.append(pair)
+        self._by_open[pair.open_start] = index
+        self._by_close[pair.close_start] = index
+        self._by_line.setdefault(pair.open_line, []).append(index)
+
+    def _unclosed(self, node: Tuple[str, str, int, int, int]) -> None:
+        kind, name, start, _, line = node
+        self.problems.append(Problem(start, line, 'unclosed %s' % _describe(kind, name)))
+
+    @property
+    def balanced(self) -> bool:
+        return not self.problems
+
+    def closer(self, pos: int) -> Optional[Pair]:
+        """The pair whose opening token starts at offset ``pos``."""
+        index = self._by_open.get(pos)
+        return None if index is None else self.pairs[index]
+
+    def opener(self, pos: int) -> Optional[Pair]:
+        """The pair whose closing token starts at offset ``pos``."""
+        index = self._by_close.get(pos)
+        return None if index is None else self.pairs[index]
+
+    def opened_on(self, line: int) -> List[Pair]:
+        """The pairs opened on (1-based) ``line``, outermost first."""
+        return [self.pairs[i] for i in sorted(self._by_line.get(line, ()),
+                                              key=lambda i: self.pairs[i].open_start)]
+
+    def closing_line(self, line: int) -> Optional[int]:
+        """The line that closes the outermost node opened on ``line``."""
+        indexes = self._by_line.get(line)
+        if not indexes:
+            return None
+        return self.pairs[min(indexes, key=lambda i: self.pairs[i].open_start)].close_line
+
+
+def check_balance(original: str, new: str, jsx: bool = True) -> PairIndex:
+    """Index ``new``; raise ``BalanceError`` if it pairs worse than ``original``.
+
+    Files that were already unbalanced are held to their own count of
+    problems, so a transform is only blamed for what it broke.
+    """
+    after = PairIndex(new, jsx)
+    if after.balanced:
+        return after
+    before = PairIndex(original, jsx)
+    if len(after.problems) > len(before.problems):
+        known = {p.message for p in before.problems}
+        fresh = [p for p in after.problems if p.message not in known] or after.problems
+        first = fresh[0]
+        raise BalanceError('line %d: %s (%d unpaired, %d before the change)' % (
+            first.line, first.message, len(after.problems), len(before.problems)))
+    return after
@@ -0,0 +1,390 @@
+"""
+Benchmarks for the codemod scripts.
+
+Usage (from the repository root)::
+
+    python -m codemods.bench                       # 2k, 20k and 200k lines
+    python -m codemods.bench --sizes 2000 --legacy # include the old regexes
+    python -m codemods.bench --compare .codemod-bench/1a2b3c4.json
+
+Inputs are synthetic checkout-style pages (nested ternaries, ``{isLoading ?
+(`` blocks, the ``// Payment Confirmed State`` comments the anchors look
+for, Portuguese labels) plus adversarial cases that make the old
+``re.DOTALL`` patterns backtrack: unterminated ternaries, state comments
+that never reach a ``</p>``, a page minified onto one line and a page with
+unbalanced braces.
+
+Every transform of ``client/fix_jsx_fragments.py``, ``client/fix_fragments.py``
+and ``fix_jsx_fragments.py`` (plus the opt-in collapsible transform) is timed
+on every input.  Results go to ``.codemod-bench/<commit>.json`` so runs can
+be compared across commits with ``--compare``.
+"""
+
+import argparse
+import importlib.util
+import json
+import multiprocessing
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .patch import AnchorError, apply_edits
+from .store import REPO_ROOT
+
+RESULTS_DIR = REPO_ROOT / '.codemod-bench'
+RESULTS_FORMAT = 1
+
+DEFAULT_SIZES = (2000, 20000, 200000)
+# A case/transform pair this much slower than the baseline is a regression
+REGRESSION_RATIO = 1.25
+
+_LABELS = (
+    'Dados do Pet', 'Informações Pessoais', 'Endereço de Cobrança', 'Forma de Pagamento',
+    'Revisão do Pedido', 'Histórico de Vacinação', 'Condições Pré-existentes',
+)
+_TEXTS = (
+    'Preencha as informações abaixo para continuar.',
+    'Você poderá alterar essas informações depois.',
+    'Atenção: os dados serão validados pela operadora.',
+    'Não se preocupe, seus dados estão protegidos.',
+)
+
+_HEADER = '''import { useState } from "react";
+import { motion } from "framer-motion";
+import { ArrowRight, Check, Copy } from "lucide-react";
+
+export default function Checkout() {
+  const [isLoading, setIsLoading] = useState(false);
+  const [isCopying, setIsCopying] = useState(false);
+  const [currentStep, setCurrentStep] = useState(1);
+  const [pixPaymentStatus, setPixPaymentStatus] = useState<string | null>(null);
+  const [cardPaymentStatus, setCardPaymentStatus] = useState<string | null>(null);
+
+  return (
+    <div className="min-h-screen">
+'''
+
+_LOADING_BUTTON = '''            <button className="flex items-center px-6 py-3 rounded-lg" disabled={{isLoading}}>
+              {{isLoading ? (
+                <div className="w-4 h-4 border-2 rounded-full animate-spin mr-2"></div>
+                <span>Processando...</span>
+              ) : (
+                <span className="flex items-center">
+                  {{currentStep === {step} ? 'Finalizar' : 'Próximo'}}
+                  <ArrowRight className="w-4 h-4 ml-2" />
+                </span>
+              )}}
+            </button>
+'''
+
+_PIX_RESULTS = '''          {/* Resultado do pagamento PIX */}
+          <div className="mt-6">
+              {pixPaymentStatus === 'approved' ? (
+                    // Payment Confirmed State
+                    <div className="text-center">
+                      <h3 className="text-xl font-semibold">Pagamento Confirmado!</h3>
+                    </div>
+                    <p className="text-sm">Seu plano já está ativo.</p>
+
+              ) : pixPaymentStatus === 'rejected' ? (
+                    // Payment Rejected State
+                    <div className="text-center">
+                      <h3 className="text-xl font-semibold">Pagamento não aprovado</h3>
+                    </div>
+                    <p className="text-sm">Tente novamente ou escolha outra forma de pagamento.</p>
+
+              ) : (
+                    <div className="text-center">
+                      <h3 className="text-xl font-semibold">Aguardando pagamento</h3>
+                    </div>
+                    <p className="text-sm">Escaneie o QR Code para pagar.</p>
+              )}
+          </div>
+
+          {/* Resultado do pagamento com cartão */}
+          <div className="mt-6">
+              {cardPaymentStatus === 'rejected' ? (
+                    // Payment Rejected State
+                    <div className="text-center">
+                      <h3 className="text-xl font-semibold">Cartão recusado</h3>
+                    </div>
+                    <p className="text-sm">Verifique os dados do cartão.</p>
+              ) : (
+                    <div className="text-center">
+                      <h3 className="text-xl font-semibold">Processando cartão</h3>
+                    </div>
+                    <p className="text-sm">Isso pode levar alguns segundos.</p>
+              )}
+          </div>
+'''
+
+_STEP = '''
+          {{/* Etapa {step}: {label} */}}
+          <motion.div
+            initial={{{{ opacity: 0, y: 20 }}}}
+            animate={{{{ opacity: 1, y: 0 }}}}
+            className="mb-8 bg-white rounded-xl shadow-lg p-6"
+          >
+            <h3 className="text-lg font-semibold mb-4">{label}</h3>
+            {{currentStep === {step} ? (
+              // Etapa ativa
+              <div className="space-y-4">
+                <p className="text-sm">{text}</p>
+                {{isCopying ? (
+                  <span className="text-green-600">Copiado!</span>
+                  <Check className="w-4 h-4" />
+                ) : (
+                  <Copy className="w-4 h-4" />
+                )}}
+              </div>
+            ) : currentStep > {step} ? (
+              <p className="text-sm text-gray-500">Etapa concluída</p>
+            ) : null}}
+{button}          </motion.div>
+'''
+
+_FOOTER = '''        </div>
+    </div>
+  );
+}
+'''
+
+
+def generate_checkout(lines: int, seed: int = 0) -> str:
+    """A checkout-style page of roughly ``lines`` lines.
+
+    The page holds one PIX/card results block (so every anchor of the fix
+    scripts resolves) and as many form steps as it takes to reach the size.
+    """
+    rng = random.Random(seed)
+    parts = [_HEADER, '        <div className="max-w-4xl mx-auto">\n']
+    step = 1
+    total = _HEADER.count('\n') + _FOOTER.count('\n') + 1
+    while total < lines:
+        button = _LOADING_BUTTON.format(step=step) if step <= 2 or rng.random() < 0.5 else ''
+        block = _STEP.format(step=step, label=rng.choice(_LABELS), text=rng.choice(_TEXTS),
+                             button=button)
+        parts.append(block)
+        total += block.count('\n')
+        if step == 2:
+            parts.append(_PIX_RESULTS)
+            total += _PIX_RESULTS.count('\n')
+        step += 1
+    parts.append(_FOOTER)
+    return ''.join(parts)
+
+
+def adversarial_inputs(lines: int) -> Dict[str, str]:
+    """Inputs that make the old lazy ``.*?`` DOTALL patterns rescan to EOF."""
+    page = generate_checkout(lines)
+    unterminated = '{isLoading ? (\n  <div className="spinner">\n  <span>Carregando</span>\n'
+    no_paragraph = ("{pixPaymentStatus === 'approved' ? (\n"
+                    "  // Payment Confirmed State\n  <div className=\"ok\">\n")
+    unbalanced = re.sub(r'\{\{', '{', page)  # style={{ ... }} loses an opening brace
+    return {
+        'unterminated-ternaries': unterminated * (lines // 3),
+        'unclosed-state-comments': no_paragraph * (lines // 3),
+        'minified': page.replace('\n', ' '),
+        'unbalanced-braces': unbalanced,
+    }
+
+
+def _load_script(relative: str):
+    path = REPO_ROOT / relative
+    name = 'bench_' + re.sub(r'\W', '_', relative)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _anchored(edits) -> Callable[[str], str]:
+    def run(text: str) -> str:
+        try:
+            return apply_edits(text, edits)[0]
+        except AnchorError:
+            return text
+    return run
+
+
+def _legacy_regex(content: str) -> str:
+    """client/fix_jsx_fragments.py as it was before the single-pass scanner."""
+    for pattern in _LEGACY_PATTERNS:
+        content = re.sub(pattern, r'\1<>\2</>\3', content, flags=re.DOTALL)
+    return content
+
+
+_LEGACY_PATTERNS = (
+    r'({isLoading \? \(\s*\n\s*)(<div[^>]*>.*?</div>\s*\n\s*<span[^>]*>.*?</span>)(\s*\n.*?\) : \()',
+    r'({pixPaymentStatus === [\'"]approved[\'"] \? \(\s*\n\s*// Payment Confirmed State\s*\n)'
+    r'(\s*<div[^>]*>.*?</p>\s*\n)(\s*\) : pixPaymentStatus === [\'"]rejected[\'"] \?)',
+    r'({pixPaymentStatus === [\'"]rejected[\'"] \? \(\s*\n\s*// Payment Rejected State\s*\n)'
+    r'(\s*<div[^>]*>.*?</p>\s*\n)(\s*\) : \()',
+    r'({isCopying \? \(\s*\n)(\s*<span[^>]*>.*?</span>\s*\n)(\s*\) : \()',
+)
+
+
+def transforms(legacy: bool = False) -> Dict[str, Callable[[str], str]]:
+    """The timed transforms, keyed by the script (or transform) they come from."""
+    from .collapsible import make_collapsible
+
+    client_fragments = _load_script('client/fix_jsx_fragments.py')
+    client_fixes = _load_script('client/fix_fragments.py')
+    root_fixes = _load_script('fix_jsx_fragments.py')
+    timed = {
+        'client/fix_jsx_fragments.py': client_fragments.fix_jsx_fragments,
+        'client/fix_fragments.py': _anchored(client_fixes.CORRECTIONS),
+        'fix_jsx_fragments.py': _anchored(root_fixes.FIXES),
+        'transform:collapsible': make_collapsible,
+    }
+    if legacy:
+        timed['legacy:client/fix_jsx_fragments.py'] = _legacy_regex
+    return timed
+
+
+def _time(fn: Callable[[str], str], text: str, repeats: int) -> Tuple[List[float], bool]:
+    times = []
+    changed = False
+    for _ in range(repeats):
+        start = time.perf_counter()
+        out = fn(text)
+        times.append(time.perf_counter() - start)
+        changed = out != text
+    return times, changed
+
+
+def _time_child(queue, fn, text, repeats):
+    queue.put(_time(fn, text, repeats))
+
+
+def _time_with_timeout(fn, text, repeats, timeout):
+    """Time ``fn`` in a child process that is killed after ``timeout`` seconds."""
+    ctx = multiprocessing.get_context('fork')
+    queue = ctx.Queue()
+    child = ctx.Process(target=_time_child, args=(queue, fn, text, repeats))
+    child.start()
+    try:
+        return queue.get(timeout=timeout)
+    except Exception:
+        return None
+    finally:
+        child.terminate()
+        child.join()
+
+
+def current_commit() -> str:
+    try:
+        sha = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'diff', '--quiet', 'HEAD', '--', 'codemods',
+                                'client/fix_fragments.py', 'client/fix_jsx_fragments.py',
+                                'fix_jsx_fragments.py', 'restore_and_fix_collapsible.py'],
+                               cwd=REPO_ROOT).returncode
+        return sha + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_benchmarks(sizes: Sequence[int], repeats: int = 3, legacy: bool = False,
+                   timeout: float = 10.0, stress_lines: int = 20000) -> dict:
+    cases = [('checkout-%d' % n, 'synthetic', generate_checkout(n)) for n in sizes]
+    cases += [(name, 'adversarial', text)
+              for name, text in adversarial_inputs(stress_lines).items()]
+    results = []
+    for fn_name, fn in transforms(legacy).items():
+        isolated = fn_name.startswith('legacy:')
+        for case, kind, text in cases:
+            entry = {'case': case, 'kind': kind, 'transform': fn_name,
+                     'lines': text.count('\n') + 1, 'bytes': len(text.encode('utf-8')),
+                     'repeats': repeats}
+            if isolated:
+                timed = _time_with_timeout(fn, text, repeats, timeout)
+            else:
+                timed = _time(fn, text, repeats)
+            if timed is None:
+                entry.update(status='timeout', timeout=timeout)
+            else:
+                times, changed = timed
+                entry.update(status='ok', best=min(times), median=statistics.median(times),
+                             changed=changed)
+            results.append(entry)
+            print(_format_row(entry), flush=True)
+    return {'format': RESULTS_FORMAT, 'commit': current_commit(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(), 'machine': platform.machine(),
+            'results': results}
+
+
+def _format_row(entry: dict) -> str:
+    if entry['status'] == 'ok':
+        timing = '%10.2f ms' % (entry['best'] * 1000)
+    else:
+        timing = '%13s' % ('> %gs' % entry['timeout'])
+    return '%-38s %-26s %8d lines %s' % (entry['transform'], entry['case'], entry['lines'], timing)
+
+
+def compare(current: dict, baseline: dict, ratio: float = REGRESSION_RATIO) -> List[str]:
+    """Print current vs baseline timings; return the regressed case names."""
+    before = {(r['transform'], r['case']): r for r in baseline['results']}
+    regressions = []
+    print('\n%s vs %s' % (current['commit'], baseline['commit']))
+    for entry in current['results']:
+        key = (entry['transform'], entry['case'])
+        old = before.get(key)
+        if old is None or old['status'] != 'ok' or entry['status'] != 'ok':
+            continue
+        change = entry['best'] / old['best'] if old['best'] else float('inf')
+        flag = ''
+        if change > ratio:
+            flag = '  REGRESSION'
+            regressions.append('%s on %s' % key)
+        print('%-38s %-26s %10.2f ms -> %10.2f ms  x%.2f%s' % (
+            key[0], key[1], old['best'] * 1000, entry['best'] * 1000, change, flag))
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m codemods.bench',
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='synthetic page sizes in lines (default: %s)'
+                        % ' '.join(map(str, DEFAULT_SIZES)))
+    parser.add_argument('--stress-lines', type=int, default=20000,
+                        help='size of the adversarial inputs (default: 20000)')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--legacy', action='store_true',
+                        help='also time the regex passes the scanner replaced')
+    parser.add_argument('--timeout', type=float, default=10.0,
+                        help='per-case limit for the legacy regexes, in seconds')
+    parser.add_argument('-o', '--output', type=Path,
+                        help='results file (default: .codemod-bench/<commit>.json)')
+    parser.add_argument('--compare', type=Path, metavar='BASELINE',
+                        help='compare with an earlier results file; exit 1 on regressions')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.repeats, args.legacy, args.timeout,
+                             args.stress_lines)
+    output = args.output or RESULTS_DIR / ('%s.json' % results['commit'])
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print('\nresults written to %s' % output)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline)
+        if regressions:
+            print('\n%d regression(s): %s' % (len(regressions), '; '.join(regressions)))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
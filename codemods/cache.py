@@ -0,0 +1,68 @@
+"""
+Persistent cache of files that a transform has already left unchanged.
+
+Entries are keyed by path and hold the file's size, mtime and content hash
+plus the ``name@version`` keys of the transforms known to be no-ops on that
+content.  When size and mtime still match, a file is skipped without being
+read; when only the mtime moved, the content hash decides.  Bumping a
+transform's ``version`` invalidates its entries.  A transform that depends
+on a file's imports has keys ``name@version+digest``, where the digest
+covers the imported files; a new key of that form replaces the old one.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .store import REPO_ROOT, JsonStore
+
+CACHE_FILE = REPO_ROOT / '.codemod-cache.json'
+CACHE_FORMAT = 1
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+class ContentCache(JsonStore):
+    """``path -> {'mtime_ns', 'size', 'hash', 'clean'}``, kept on disk between runs."""
+    FORMAT = CACHE_FORMAT
+
+    def __init__(self, path: Path = CACHE_FILE):
+        super().__init__(path)
+
+    def clean_by_stat(self, path: str, st: os.stat_result) -> Optional[set]:
+        """Clean transform keys for ``path`` if its stat is unchanged."""
+        entry = self.files.get(path)
+        if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+            return set(entry['clean'])
+        return None
+
+    def clean_by_hash(self, path: str, st: os.stat_result, digest: str) -> set:
+        """Clean transform keys for content ``digest``; refreshes the stat."""
+        entry = self.files.get(path)
+        if entry and entry['hash'] == digest:
+            clean = entry['clean']
+        else:
+            clean = []
+        self.files[path] = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size,
+                            'hash': digest, 'clean': clean}
+        self.dirty = True
+        return set(clean)
+
+    def mark_clean(self, path: str, keys: Iterable[str]) -> None:
+        entry = self.files.get(path)
+        if entry is None:
+            return
+        keys = set(keys)
+        replaced = {key.partition('+')[0] for key in keys if '+' in key}
+        kept = (key for key in entry['clean'] if key.partition('+')[0] not in replaced)
+        merged = sorted(keys.union(kept))
+        if merged != entry['clean']:
+            entry['clean'] = merged
+            self.dirty = True
+
+    def save(self) -> None:
+        self.evict_missing()
+        super().save()
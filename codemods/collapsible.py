@@ -0,0 +1,331 @@
+"""
+Make ``motion.div`` page sections collapsible.
+
+A section is a ``<motion.div>`` whose first child is a heading (``h2`` to
+``h4``) followed by at least one more child.  For each section the splice
+engine:
+
+* wraps the heading in a clickable ``div`` that toggles ``<name>Expanded``
+  and shows ``ChevronUp`` / ``ChevronDown``;
+* wraps the rest of the section in ``{<name>Expanded && ( ... )}``, inside
+  a ``<>...</>`` fragment unless it is a single element;
+* declares ``const [<name>Expanded, set<Name>Expanded] = useState(true);``
+  after the component's last ``useState`` line;
+* adds ``ChevronUp``, ``ChevronDown`` and ``useState`` to the imports.
+
+New lines are indented like the lines they wrap, nested by the page's own
+indentation step (see ``scanner.Layout``); the wrapped lines move one step
+in, except those that start inside a multi-line string or template literal,
+whose whitespace is part of the value.  Only those byte ranges change;
+the rest of the page is copied through.
+Sections that are already collapsible no longer start with a heading, so
+running the transform twice is a no-op.
+"""
+
+import re
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from .jsx import ELEMENT, TEXT, parse_elements
+from .patch import apply_splices
+from .scanner import (
+    PUNCT, STRING, TAG_CLOSE, TAG_SELF_CLOSE, TEMPLATE, Token, newline_at, scan, tokenize,
+)
+from .transforms import Transform
+
+HEADINGS = ('h2', 'h3', 'h4')
+
+TRIGGERS = (('motion.div', r'<motion\.div\b'),)
+SYMBOLS = ('motion.div',)
+
+_SECTION_COMMENT = re.compile(r'\{/\*\s*(.*?)\s*\*/\}\s*$')
+_CLASS_NAME = re.compile(r'className="([^"]*)"')
+_MARGIN_BOTTOM = re.compile(r'(?:^|\s)(mb-\S+)')
+_USE_STATE = re.compile(r'^([ \t]*)const \[[^\]]*\] = useState\b', re.M)
+_COMPONENT = re.compile(r'^([ \t]*)(?:export (?:default )?)?function [\w$]+\s*\(.*\)\s*\{[ \t]*\r?$', re.M)
+_DECLARED = re.compile(r'const \[([\w$]+)')
+_NAMED_IMPORT = r'import\s*(?:[\w$]+\s*,\s*)?\{([^}]*)\}\s*from\s*(["\'])%s\2;?'
+_IMPORT_END = re.compile(r'^.*\bfrom\s*(["\'])[^"\']+\1;?[ \t]*$', re.M)
+
+# {i} is the indentation of the replaced lines and {u} one level of the page's
+_TOGGLE = '''{i}<div
+{i}{u}className="{classes}"
+{i}{u}onClick={{() => {setter}(!{state})}}
+{i}>
+{heading}
+{i}{u}{{{state} ? (
+{i}{u}{u}<ChevronUp className="w-5 h-5" style={{{{ color: 'var(--text-dark-secondary)' }}}} />
+{i}{u}) : (
+{i}{u}{u}<ChevronDown className="w-5 h-5" style={{{{ color: 'var(--text-dark-secondary)' }}}} />
+{i}{u})}}
+{i}</div>'''
+
+_BODY = '''{i}{{{state} && (
+{body}
+{i})}}'''
+
+_FRAGMENT = '''{i}<>
+{body}
+{i}</>'''
+
+
+class Section:
+    def __init__(self, element, heading, body_start: int, body_end: int, state: str,
+                 single_root: bool = True):
+        self.element = element
+        self.heading = heading
+        self.body_start = body_start
+        self.body_end = body_end
+        self.state = state
+        self.single_root = single_root  # the body is one element
+
+    @property
+    def setter(self) -> str:
+        return 'set' + self.state[0].upper() + self.state[1:]
+
+
+def _line_start(text: str, pos: int) -> int:
+    return text.rfind('\n', 0, pos) + 1
+
+
+def _literal_lines(text: str, tokens: List[Token]) -> List[int]:
+    """The start of every line that begins inside a string or template literal, sorted."""
+    starts = []
+    for tok in tokens:
+        if tok.kind in (STRING, TEMPLATE):
+            pos = text.find('\n', tok.start, tok.end)
+            while pos >= 0:
+                starts.append(pos + 1)
+                pos = text.find('\n', pos + 1, tok.end)
+    return starts
+
+
+def _kept_lines(text: str, literals: List[int], start: int, end: int) -> FrozenSet[int]:
+    """The numbers, within ``text[start:end]``, of the lines that start inside a literal."""
+    inside = literals[bisect_left(literals, start):bisect_left(literals, end)]
+    return frozenset(text.count('\n', start, pos) for pos in inside)
+
+
+def _reindent(block: str, extra: str, kept: FrozenSet[int] = frozenset()) -> str:
+    """``block`` with ``extra`` before every line that is not blank.
+
+    Lines numbered in ``kept`` start inside a string or template literal:
+    their leading whitespace is part of its value, so they are left alone.
+    """
+    return '\n'.join(extra + line if line.strip() and number not in kept else line
+                     for number, line in enumerate(block.split('\n')))
+
+
+def _camel(words: List[str]) -> str:
+    words = [w.lower() for w in words if w]
+    return words[0] + ''.join(w.capitalize() for w in words[1:]) if words else ''
+
+
+def _ascii_words(label: str) -> List[str]:
+    label = unicodedata.normalize('NFKD', label).encode('ascii', 'ignore').decode()
+    return re.findall(r'[A-Za-z0-9]+', label)
+
+
+def _state_name(text: str, element, heading, names: Dict[str, str], taken: set) -> str:
+    """``<prefix>Expanded``, from the ``{/* ... Section */}`` comment above
+    the section, else from the heading text."""
+    comment = _SECTION_COMMENT.search(text, max(0, element.start - 200), element.start)
+    label = comment.group(1) if comment else ''
+    if label in names:
+        prefix = names[label]
+    else:
+        words = _ascii_words(label)
+        if words and words[-1].lower() == 'section':
+            words.pop()
+        if not words:
+            inner = re.sub(r'<[^>]*>|\{[^}]*\}', ' ', text[heading.tag_end:heading.close_start])
+            words = _ascii_words(inner)[:3]
+        prefix = _camel(words) or 'section'
+    if prefix and prefix[0].isdigit():
+        prefix = 'section' + prefix
+    state = prefix + 'Expanded'
+    n = 2
+    while state in taken:
+        state = '%s%dExpanded' % (prefix, n)
+        n += 1
+    taken.add(state)
+    return state
+
+
+def find_sections(text: str, names: Optional[Dict[str, str]] = None,
+                  tokens: Optional[List[Token]] = None) -> List[Section]:
+    """Return the collapsible candidates of ``text`` in document order.
+
+    ``names`` maps a section comment (``'Payment History Section'``) to the
+    state prefix to use for it (``'history'``).  ``tokens`` are the tokens
+    of ``text`` when the caller already has them.
+    """
+    names = names or {}
+    taken = set(re.findall(r'const \[(\w+Expanded)\b', text))
+    sections = []
+    for element in parse_elements(text, tokens):
+        if element.name != 'motion.div' or element.close_start is None:
+            continue
+        children = [c for c in element.children if c.kind != TEXT or text[c.start:c.end].strip()]
+        if len(children) < 2:
+            continue
+        heading = children[0]
+        if heading.kind != ELEMENT or heading.name not in HEADINGS or heading.close_start is None:
+            continue
+        state = _state_name(text, element, heading, names, taken)
+        single_root = len(children) == 2 and children[1].kind == ELEMENT
+        sections.append(Section(element, heading, children[1].start, children[-1].end, state,
+                                single_root))
+    return sections
+
+
+def _state_insertion(text: str, before: int, states: List[str],
+                     unit: str) -> Optional[Tuple[int, str]]:
+    """Where and what to insert to declare ``states`` ahead of ``before``."""
+    last = None
+    for m in _USE_STATE.finditer(text, 0, before):
+        last = m
+    if last is not None:
+        indent = last.group(1)
+        # the declaration may span lines: end it at its ";" (or newline)
+        # (from the "const": after "useState" a "<T>" would read as JSX)
+        pos = last.start()
+        for tok in tokenize(text, pos):
+            if tok.depth == 0 and tok.kind == PUNCT and text[tok.start] == ';':
+                pos = tok.end
+                break
+        at = text.find('\n', pos, before)
+    else:
+        component = None
+        for m in _COMPONENT.finditer(text, 0, before):
+            component = m
+        if component is None:
+            return None
+        indent = component.group(1) + unit
+        at = text.find('\n', component.end() - 1, before)
+    if at < 0:
+        return None
+    newline = newline_at(text, at)
+    lines = ''.join('%sconst [%s, set%s%s] = useState(true);%s' % (indent, s, s[0].upper(), s[1:], newline)
+                    for s in states)
+    return at + 1, lines
+
+
+def _import_splice(text: str, module: str, wanted: List[str]) -> Optional[Tuple[int, int, str]]:
+    """Extend the named import from ``module`` with ``wanted``, or add one."""
+    m = re.search(_NAMED_IMPORT % re.escape(module), text)
+    if m is None:
+        last = None
+        for last in _IMPORT_END.finditer(text):
+            pass
+        at = last.end() if last else 0
+        quote = last.group(1) if last else '"'
+        line = 'import { %s } from %s%s%s;' % (', '.join(wanted), quote, module, quote)
+        if last is None:
+            return 0, 0, line + newline_at(text, 0)
+        return at, at, newline_at(text, at) + line
+    present = {name.strip().split(' as ')[0] for name in m.group(1).split(',')}
+    missing = [name for name in wanted if name not in present]
+    if not missing:
+        return None
+    names = m.group(1)
+    body = names.rstrip()
+    trailing = names[len(body):]
+    if body.endswith(','):
+        body = body[:-1]
+    if '\n' in body:
+        last_line = body.split('\n')[-1]
+        indent = last_line[:len(last_line) - len(last_line.lstrip())]
+        addition = ''.join(',\n' + indent + name for name in missing)
+    else:
+        addition = ''.join(', ' + name for name in missing)
+    return m.start(1), m.end(1), body + addition + trailing
+
+
+def collapsible_splices(text: str, hits=None,
+                        names: Optional[Dict[str, str]] = None) -> List[Tuple[int, int, str]]:
+    """Return the ``(start, end, replacement)`` splices for every section.
+
+    ``hits`` is accepted for the transform registry, as in
+    ``make_collapsible``: the whole page is parsed whatever the hits, since
+    state names and imports depend on every section.  ``section_extents``
+    only lets watch mode skip the transform when an edit touches no section.
+    """
+    tokens, layout = scan(text)
+    sections = find_sections(text, names, tokens)
+    if not sections:
+        return []
+    unit = layout.unit
+    literals = _literal_lines(text, tokens)
+    splices = []
+    for section in sections:
+        heading = section.heading
+        indent = layout.indent_at(heading.start)
+        head_start = _line_start(text, heading.start)
+        head = text[head_start:heading.end]
+
+        classes = ['flex', 'items-center', 'justify-between']
+        tag = text[heading.start:heading.tag_end]
+        class_attr = _CLASS_NAME.search(tag)
+        if class_attr:
+            margin = _MARGIN_BOTTOM.search(class_attr.group(1))
+            if margin:
+                classes.append(margin.group(1))
+                kept = ' '.join(c for c in class_attr.group(1).split() if c != margin.group(1))
+                offset = heading.start - head_start
+                head = (head[:offset + class_attr.start(1)] + kept
+                        + head[offset + class_attr.end(1):])
+        classes.append('cursor-pointer')
+
+        newline = newline_at(text, heading.start)
+        splices.append((head_start, heading.end, _TOGGLE.replace('\n', newline).format(
+            i=indent, u=unit, classes=' '.join(classes), setter=section.setter,
+            state=section.state,
+            heading=_reindent(head, unit, _kept_lines(text, literals, head_start, heading.end)))))
+
+        body_start = _line_start(text, section.body_start)
+        body_indent = layout.indent_at(section.body_start)
+        kept = _kept_lines(text, literals, body_start, section.body_end)
+        body = _reindent(text[body_start:section.body_end], unit, kept)
+        if not section.single_root:
+            body = _FRAGMENT.replace('\n', newline).format(i=body_indent + unit,
+                                                           body=_reindent(body, unit, kept))
+        splices.append((body_start, section.body_end, _BODY.replace('\n', newline).format(
+            i=body_indent, state=section.state, body=body)))
+
+    declared = set(_DECLARED.findall(text))
+    new_states = [s.state for s in sections if s.state not in declared]
+    if new_states:
+        state_insert = _state_insertion(text, sections[0].element.start, new_states, unit)
+        if state_insert is not None:
+            splices.append((state_insert[0], state_insert[0], state_insert[1]))
+    for module, wanted in (('lucide-react', ['ChevronUp', 'ChevronDown']), ('react', ['useState'])):
+        splice = _import_splice(text, module, wanted)
+        if splice is not None:
+            splices.append(splice)
+    return splices
+
+
+def section_extents(text: str, hits) -> Dict[int, int]:
+    """Map each ``<motion.div`` hit to the offset just past its element."""
+    extents = {}
+    for hit in hits:
+        for tok in tokenize(text, hit.start):
+            if tok.depth == 0 and tok.kind in (TAG_CLOSE, TAG_SELF_CLOSE):
+                extents[hit.start] = tok.end
+                break
+    return extents
+
+
+def make_collapsible(text: str, hits=None, names: Optional[Dict[str, str]] = None) -> str:
+    """Return ``text`` with every ``motion.div`` section made collapsible.
+
+    ``hits`` is accepted for the transform registry; sections are found by
+    parsing the whole page.
+    """
+    return apply_splices(text, collapsible_splices(text, names=names))
+
+
+TRANSFORM = Transform('collapsible', TRIGGERS, make_collapsible, version=4,
+                      extents=section_extents, splices=collapsible_splices, symbols=SYMBOLS)
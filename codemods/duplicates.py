@@ -0,0 +1,187 @@
+"""
+Find near-duplicate TSX files, such as the copies in components/ui and
+components/admin/ui.
+
+Usage (from the repository root)::
+
+    python -m codemods.duplicates                       # all of client/src
+    python -m codemods.duplicates --threshold 0.9
+    python -m codemods.duplicates --json plan.json      # consolidation plan ('-': stdout)
+
+Each file is tokenized with the codemod scanner, comments dropped, and cut
+into shingles of ``SHINGLE`` consecutive tokens, so formatting and comment
+drift do not count as differences.  Every shingle is hashed once; the
+``SKETCH`` smallest hashes of a file form its bottom-k MinHash sketch.  Files
+that share a sketch value are candidate pairs, their Jaccard similarity is
+estimated from the sketches, and pairs that come close to the threshold
+get the exact similarity of their shingle sets.  Pairs at or above the
+threshold are grouped into clusters, and each cluster gets a canonical file
+(preferably the one in components/ui) plus the action for the others:
+``reexport`` when a copy has the same token stream, ``merge`` otherwise.
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import sys
+import zlib
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set
+
+from .scanner import COMMENT, tokenize
+from .source import read_source
+from .store import REPO_ROOT, display
+
+DEFAULT_ROOT = REPO_ROOT / 'client' / 'src'
+CANONICAL_DIR = 'components/ui/'
+SHINGLE = 5
+SKETCH = 128
+THRESHOLD = 0.8
+# Candidates whose estimate is this far below the threshold are dropped
+# without computing their exact similarity
+ESTIMATE_SLACK = 0.1
+
+
+class Fingerprint(NamedTuple):
+    path: str
+    shingles: Set[int]
+    sketch: List[int]  # the SKETCH smallest shingle hashes, ascending
+    digest: str        # of the token stream: equal digests, same code
+
+
+class Pair(NamedTuple):
+    first: str
+    second: str
+    similarity: float
+    identical: bool
+
+
+def fingerprint(path: str, text: str) -> Fingerprint:
+    """Shingle, sketch and token digest of ``text``."""
+    words = [text[t.start:t.end] for t in tokenize(text, jsx=not path.endswith('.ts'))
+             if t.kind != COMMENT]
+    stream = '\0'.join(words).encode('utf-8', 'surrogateescape')
+    shingles = {zlib.crc32('\0'.join(words[i:i + SHINGLE]).encode('utf-8', 'surrogateescape'))
+                for i in range(max(len(words) - SHINGLE + 1, 1))}
+    return Fingerprint(path, shingles, heapq.nsmallest(SKETCH, shingles),
+                       hashlib.sha1(stream).hexdigest())
+
+
+def estimate(a: Fingerprint, b: Fingerprint) -> float:
+    """Jaccard similarity of ``a`` and ``b`` estimated from their sketches."""
+    union = heapq.nsmallest(SKETCH, set(a.sketch).union(b.sketch))
+    if not union:
+        return 1.0
+    # A hash below both sketches' cut-offs is in both shingle sets exactly
+    # when it is in both sketches
+    shared = set(a.sketch).intersection(b.sketch)
+    return sum(1 for h in union if h in shared) / len(union)
+
+
+def similar_pairs(prints: Sequence[Fingerprint], threshold: float = THRESHOLD) -> List[Pair]:
+    """Every pair of ``prints`` with a similarity of at least ``threshold``."""
+    by_hash: Dict[int, List[int]] = {}
+    for number, fp in enumerate(prints):
+        for h in fp.sketch:
+            by_hash.setdefault(h, []).append(number)
+    candidates = set()
+    for numbers in by_hash.values():
+        candidates.update(combinations(numbers, 2))
+    pairs = []
+    for i, j in sorted(candidates):
+        a, b = prints[i], prints[j]
+        if estimate(a, b) < threshold - ESTIMATE_SLACK:
+            continue
+        similarity = len(a.shingles & b.shingles) / len(a.shingles | b.shingles)
+        if similarity >= threshold:
+            pairs.append(Pair(a.path, b.path, similarity, a.digest == b.digest))
+    pairs.sort(key=lambda p: (-p.similarity, p.first, p.second))
+    return pairs
+
+
+def _canonical(paths: Sequence[str]) -> str:
+    def rank(path):
+        relative = display(path)
+        return ('/' + CANONICAL_DIR not in '/' + relative, relative.count('/'), relative)
+    return min(paths, key=rank)
+
+
+def consolidation_plan(pairs: Sequence[Pair]) -> List[dict]:
+    """Group ``pairs`` into clusters with a canonical file and an action per copy."""
+    parent: Dict[str, str] = {}
+
+    def find(path):
+        while parent.setdefault(path, path) != path:
+            parent[path] = parent[parent[path]]
+            path = parent[path]
+        return path
+
+    for pair in pairs:
+        parent[find(pair.first)] = find(pair.second)
+    clusters: Dict[str, List[str]] = {}
+    for path in list(parent):
+        clusters.setdefault(find(path), []).append(path)
+
+    scores = {}
+    for pair in pairs:
+        scores[(pair.first, pair.second)] = scores[(pair.second, pair.first)] = pair
+    plan = []
+    for members in clusters.values():
+        keep = _canonical(members)
+        copies = []
+        for path in sorted(members):
+            if path == keep:
+                continue
+            pair = scores.get((keep, path))
+            entry = {'path': display(path),
+                     'similarity': round(pair.similarity, 4) if pair else None}
+            entry['action'] = 'reexport' if pair and pair.identical else 'merge'
+            copies.append(entry)
+        plan.append({'canonical': display(keep), 'copies': copies})
+    plan.sort(key=lambda c: c['canonical'])
+    return plan
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m codemods.duplicates',
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument('roots', nargs='*', type=Path,
+                        help='directories to compare (default: %s)' % display(str(DEFAULT_ROOT)))
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='minimum similarity to report (default: %s)' % THRESHOLD)
+    parser.add_argument('--json', metavar='PATH',
+                        help="write the pairs and the consolidation plan as JSON ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    roots = args.roots or [DEFAULT_ROOT]
+    paths = sorted({str(p.resolve()) for root in roots for p in Path(root).glob('**/*.tsx')
+                    if p.is_file() and 'node_modules' not in p.parts})
+    prints = [fingerprint(path, read_source(path).text) for path in paths]
+    pairs = similar_pairs(prints, args.threshold)
+    plan = consolidation_plan(pairs)
+
+    if args.json:
+        data = {'threshold': args.threshold, 'files': len(paths),
+                'pairs': [{'first': display(p.first), 'second': display(p.second),
+                           'similarity': round(p.similarity, 4), 'identical': p.identical}
+                          for p in pairs],
+                'plan': plan}
+        if args.json == '-':
+            json.dump(data, sys.stdout, indent=2)
+            print()
+            return 0
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+    for pair in pairs:
+        print('%.3f %s %s %s' % (pair.similarity, '=' if pair.identical else '~',
+                                 display(pair.first), display(pair.second)))
+    copies = sum(len(c['copies']) for c in plan)
+    print('%d files: %d near-duplicate pairs, %d clusters, %d copies to consolidate'
+          % (len(paths), len(pairs), len(plan), copies))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
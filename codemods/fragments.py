@@ -0,0 +1,199 @@
+"""
+Wrap multi-root ternary branches in JSX fragments.
+
+A branch such as::
+
+    {isLoading ? (
+      <div className="spinner" />
+      <span>Processando...</span>
+    ) : (
+
+does not compile because a parenthesised JSX expression must have a single
+root.  ``wrap_ternary_fragments`` finds the ternaries listed in
+``FRAGMENT_TERNARIES`` and wraps the consequent branch in ``<>...</>``.
+
+All triggers are folded into one pattern (see ``codemods.registry``), so the
+file is searched once; the matched branches are then tokenized together, each
+token once, up to the last closing parenthesis.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .patch import apply_insertions
+from .registry import Hit, Registry
+from .scanner import (
+    COMMENT, PUNCT, TAG_CLOSE, TAG_OPEN, TAG_SELF_CLOSE, Layout, tokenize,
+)
+from .transforms import Transform
+
+# Where the fragment markers go
+INLINE = 'inline'  # "<>" right before the first root, "</>" right after the last
+LINE = 'line'      # "<>" on a line of its own before the first root's line,
+                   # "</>" on one before the line holding the closing
+                   # parenthesis, both indented like the first root
+
+# Ternary condition -> (trigger regex, placement of the fragment markers)
+FRAGMENT_TERNARIES = {
+    'isLoading': (r'isLoading', INLINE),
+    'approved': (r'pixPaymentStatus\s*===\s*(?:\'approved\'|"approved")', LINE),
+    'rejected': (r'pixPaymentStatus\s*===\s*(?:\'rejected\'|"rejected")', LINE),
+    'isCopying': (r'isCopying', LINE),
+}
+
+# "{<condition> ? (" for each ternary; a hit ends right after the "("
+TRIGGERS = tuple((name, r'\{\s*%s\s*\?\s*\(' % cond)
+                 for name, (cond, _) in FRAGMENT_TERNARIES.items())
+
+# Identifiers a file needs for any trigger to match (see codemods.symbols)
+SYMBOLS = ('isLoading', 'pixPaymentStatus', 'isCopying')
+
+_REGISTRY = Registry({'fragments': TRIGGERS})
+
+
+class _Branch:
+    """A ternary branch being matched against the token stream."""
+    __slots__ = ('paren', 'depth', 'roots', 'root_start', 'close')
+
+    def __init__(self, paren: int, depth: int):
+        self.paren = paren
+        self.depth = depth
+        self.roots: List[Tuple[int, int]] = []
+        self.root_start: Optional[int] = None
+        self.close: Optional[int] = None
+
+
+def _resolve_branches(text: str, parens: Sequence[int],
+                      ends: Optional[Dict[int, int]] = None) -> Dict[int, Tuple[List[Tuple[int, int]], int]]:
+    """``find_branch_roots`` for every offset in ``parens``, sharing scans.
+
+    A branch that starts inside another branch's scan sees the same tokens
+    (one level deeper) up to the point where it is decided, so it is matched
+    on that scan instead of tokenizing the rest of the file again.  Without
+    this, N unterminated triggers would cost N scans to the end of the file.
+
+    ``ends``, when given, receives the offset just past the token that
+    decided each branch; branches still open at the end of the file are
+    left out.
+    """
+    if ends is None:
+        ends = {}
+    wanted = set(parens)
+    results: Dict[int, Tuple[List[Tuple[int, int]], int]] = {}
+    done = set()
+    for paren in sorted(wanted):
+        if paren in done:
+            continue
+        active: List[_Branch] = []   # innermost last, before their ")"
+        waiting: List[_Branch] = []  # after their ")", before the ":"
+        for tok in tokenize(text, paren):
+            kind = tok.kind
+            if waiting and kind != COMMENT:
+                for branch in waiting:
+                    ends[branch.paren] = tok.end
+                    if kind == PUNCT and text[tok.start] == ':':
+                        results[branch.paren] = (branch.roots, branch.close)
+                waiting = []
+
+            depth = tok.depth
+            while active and active[-1].depth > depth:
+                ends[active.pop().paren] = tok.end
+            if active and active[-1].depth == depth:
+                branch = active[-1]
+                if kind == TAG_OPEN:
+                    branch.root_start = tok.start
+                elif kind in (TAG_CLOSE, TAG_SELF_CLOSE):
+                    if branch.root_start is None:
+                        ends[active.pop().paren] = tok.end
+                    else:
+                        branch.roots.append((branch.root_start, tok.end))
+                        branch.root_start = None
+                elif kind == COMMENT:
+                    pass
+                elif kind == PUNCT and text[tok.start] == ')' and branch.root_start is None:
+                    branch.close = tok.start
+                    waiting.append(active.pop())
+                else:
+                    ends[active.pop().paren] = tok.end
+
+            if tok.start in wanted and tok.start not in done and kind == PUNCT:
+                done.add(tok.start)
+                active.append(_Branch(tok.start, depth))
+            elif not active and not waiting:
+                break
+    return results
+
+
+def find_branch_roots(text: str, paren: int) -> Optional[Tuple[List[Tuple[int, int]], int]]:
+    """Return the JSX roots of the ternary branch whose ``(`` is at ``paren``.
+
+    The result is ``(roots, close)`` where ``roots`` is a list of
+    ``(start, end)`` spans and ``close`` is the offset of the matching ``)``.
+    Returns ``None`` when the branch is not made only of JSX elements (and
+    comments), is not followed by ``:``, or never closes.
+    """
+    return _resolve_branches(text, (paren,)).get(paren)
+
+
+def branch_extents(text: str, hits: Sequence[Hit]) -> Dict[int, int]:
+    """Map each hit's start to the offset where its branch was decided.
+
+    An edit outside ``[hit.start, extent)`` cannot change what the transform
+    does for that hit.  Hits whose branch never closes are left out.
+    """
+    ends: Dict[int, int] = {}
+    _resolve_branches(text, [hit.end - 1 for hit in hits], ends)
+    return {hit.start: ends[hit.end - 1] for hit in hits if hit.end - 1 in ends}
+
+
+def fragment_insertions(text: str, hits: Optional[Sequence[Hit]] = None) -> List[Tuple[int, str]]:
+    """Return ``(offset, text)`` insertions that wrap multi-root branches.
+
+    ``hits`` are this transform's trigger hits when the caller has already
+    scanned the file (see ``codemods.registry``).
+    """
+    if hits is None:
+        hits = _REGISTRY.scan(text)
+    branches = _resolve_branches(text, [hit.end - 1 for hit in hits])
+    layout = None
+    insertions = []
+    for hit in hits:
+        placement = FRAGMENT_TERNARIES[hit.trigger][1]
+        paren = hit.end - 1
+        found = branches.get(paren)
+        if found is None:
+            continue
+        roots, close = found
+        if len(roots) < 2:
+            continue
+
+        first, last = roots[0][0], roots[-1][1]
+        opener, closer = (first, '<>'), (last, '</>')
+        if placement == LINE:
+            if layout is None:
+                layout = Layout(text)
+            line = layout.line_of(first)
+            start = layout.line_start(line)
+            indent = layout.indent(line)
+            newline = '\r\n' if text[start - 2:start] == '\r\n' else '\n'
+            if start > paren and not text[start:first].strip():
+                opener = (start, indent + '<>' + newline)
+            tail = text[last:close]
+            if '\n' in tail and not tail.strip():
+                closer = (text.rfind('\n', last, close) + 1, indent + '</>' + newline)
+        insertions.append(opener)
+        insertions.append(closer)
+    return insertions
+
+
+def fragment_splices(text: str, hits: Optional[Sequence[Hit]] = None) -> List[Tuple[int, int, str]]:
+    """``fragment_insertions`` as ``(start, end, text)`` splices."""
+    return [(offset, offset, inserted) for offset, inserted in fragment_insertions(text, hits)]
+
+
+def wrap_ternary_fragments(text: str, hits: Optional[Sequence[Hit]] = None) -> str:
+    """Return ``text`` with every multi-root trigger branch fragment-wrapped."""
+    return apply_insertions(text, fragment_insertions(text, hits))
+
+
+TRANSFORM = Transform('fragments', TRIGGERS, wrap_ternary_fragments, version=2,
+                      extents=branch_extents, splices=fragment_splices, symbols=SYMBOLS)
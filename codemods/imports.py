@@ -0,0 +1,254 @@
+"""
+Persistent import graph of client/src and shared.
+
+Usage (from the repository root)::
+
+    python -m codemods.imports client/src/components/ui/copy-button.tsx
+    python -m codemods.imports --direct client/src/hooks/use-toast.ts
+    python -m codemods.imports --deps client/src/pages/checkout.tsx
+
+By default it lists the files that import the given ones, directly or
+through other files; ``--deps`` lists what they import instead.
+
+Every ``import ... from``, ``export ... from``, bare ``import '...'`` and
+dynamic ``import('...')`` of a ``.ts``/``.tsx`` file is read from its token
+stream.  Relative specifiers and the aliases of ``client/vite.config.ts``
+(``@/`` for ``client/src``, ``@shared/`` for ``shared`` and the rest) are
+resolved to files the way Vite does (the path itself, then ``.tsx``, ``.ts``,
+``/index.tsx``, ``/index.ts``, and ``x.js`` as ``x.ts``); package imports are
+left out.  The graph lives
+in ``.codemod-imports.json`` and is refreshed incrementally like the symbol
+index: unchanged stat, no read; unchanged hash, no tokenizing.
+
+The runner uses it to schedule transforms whose output depends on what a
+file imports (``Transform.imports``): such a transform's cache key for a
+file includes the hashes of the imported files it cares about, so a change
+to a shared component re-runs it on the pages that import that component
+and nowhere else.
+"""
+
+import argparse
+import fnmatch
+import hashlib
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from .cache import content_hash
+from .scanner import NAME, PUNCT, STRING, tokenize
+from .source import read_source
+from .store import REPO_ROOT, JsonStore, discover, display
+
+GRAPH_FILE = REPO_ROOT / '.codemod-imports.json'
+GRAPH_FORMAT = 1
+SOURCE_GLOBS = ('client/src/**/*.tsx', 'client/src/**/*.ts', 'shared/**/*.ts')
+
+# The resolve.alias table of client/vite.config.ts
+ALIASES = {
+    '@/': 'client/src/',
+    '@components/': 'client/src/components/',
+    '@pages/': 'client/src/pages/',
+    '@hooks/': 'client/src/hooks/',
+    '@utils/': 'client/src/utils/',
+    '@types/': 'client/src/types/',
+    '@styles/': 'client/src/styles/',
+    '@assets/': 'client/src/assets/',
+    '@lib/': 'client/src/lib/',
+    '@config/': 'client/src/config/',
+    '@shared/': 'shared/',
+}
+EXTENSIONS = ('', '.tsx', '.ts', '/index.tsx', '/index.ts')
+
+
+def file_imports(text: str, jsx: bool = True) -> List[str]:
+    """The module specifiers ``text`` imports or re-exports from, in order."""
+    specifiers = []
+    tokens = [t for t in tokenize(text, jsx=jsx) if t.kind in (NAME, PUNCT, STRING)]
+    for i, token in enumerate(tokens[:-1]):
+        if token.kind != NAME:
+            continue
+        value = text[token.start:token.end]
+        after = tokens[i + 1]
+        if value in ('from', 'import') and after.kind == STRING:
+            string = after
+        elif (value == 'import' and text[after.start:after.end] == '('
+                and i + 2 < len(tokens) and tokens[i + 2].kind == STRING):
+            string = tokens[i + 2]
+        else:
+            continue
+        if i and text[tokens[i - 1].start:tokens[i - 1].end] in ('.', '?.'):
+            continue  # a property named "from" or "import"
+        specifiers.append(text[string.start + 1:string.end - 1])
+    return specifiers
+
+
+def resolve(specifier: str, importer: str, root: Path = REPO_ROOT) -> Optional[str]:
+    """The file ``specifier`` names when imported from ``importer``, or ``None``."""
+    if specifier.startswith('.'):
+        base = os.path.join(os.path.dirname(importer), specifier)
+    else:
+        for alias, target in ALIASES.items():
+            if specifier.startswith(alias):
+                base = os.path.join(root, target, specifier[len(alias):])
+                break
+        else:
+            return None  # a package
+    base = os.path.normpath(base)
+    candidates = [base + extension for extension in EXTENSIONS]
+    if base.endswith(('.js', '.jsx')):  # TypeScript's ESM spelling of a .ts/.tsx file
+        stem = base[:base.rindex('.')]
+        candidates[1:1] = [stem + '.ts', stem + '.tsx']
+    for path in candidates:
+        if path.endswith(('.ts', '.tsx')) and os.path.isfile(path):
+            return path
+    return None
+
+
+def _relative(path: str, root: Path = REPO_ROOT) -> str:
+    return os.path.relpath(path, root).replace(os.sep, '/')
+
+
+class ImportGraph(JsonStore):
+    """``path -> [imported path, ...]``, kept on disk between runs."""
+    FORMAT = GRAPH_FORMAT
+
+    def __init__(self, path: Path = GRAPH_FILE):
+        # files: path -> {'mtime_ns', 'size', 'hash', 'imports'}
+        self._importers: Optional[Dict[str, List[str]]] = None
+        super().__init__(path)
+
+    def forget(self, path: str) -> None:
+        if path in self.files:
+            super().forget(path)
+            self._importers = None
+
+    def update(self, path: str) -> bool:
+        """Bring the edges of ``path`` up to date; ``True`` if it was tokenized."""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self.forget(path)
+            return False
+        entry = self.files.get(path)
+        if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+            return False
+        source = read_source(path)
+        digest = content_hash(source.data)
+        self.dirty = True
+        if entry and entry['hash'] == digest:
+            entry['mtime_ns'], entry['size'] = st.st_mtime_ns, st.st_size
+            return False
+        imports = []
+        for specifier in file_imports(source.text, jsx=not path.endswith('.ts')):
+            target = resolve(specifier, path)
+            if target is not None and target not in imports:
+                imports.append(target)
+        self.files[path] = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size,
+                            'hash': digest, 'imports': imports}
+        self._importers = None
+        return True
+
+    def refresh(self, paths: Iterable) -> int:
+        """Update the graph for ``paths``; return how many files were tokenized.
+
+        Entries of files that no longer exist are dropped.
+        """
+        tokenized = sum(self.update(os.path.abspath(p)) for p in paths)
+        self.evict_missing()
+        return tokenized
+
+    def imports(self, path: str) -> List[str]:
+        """The files ``path`` imports directly."""
+        entry = self.files.get(path)
+        return entry['imports'] if entry else []
+
+    def importers(self, path: str) -> List[str]:
+        """The files that import ``path`` directly."""
+        if self._importers is None:
+            self._importers = {}
+            for importer, entry in self.files.items():
+                for target in entry['imports']:
+                    self._importers.setdefault(target, []).append(importer)
+        return self._importers.get(path, [])
+
+    def dependencies(self, path: str) -> Set[str]:
+        """The files ``path`` imports, directly or through other files."""
+        return self._closure([path], self.imports) - {path}
+
+    def dependents(self, paths: Iterable[str]) -> Set[str]:
+        """The files that import any of ``paths``, directly or through other files."""
+        paths = list(paths)
+        return self._closure(paths, self.importers) - set(paths)
+
+    @staticmethod
+    def _closure(start: Sequence[str], edges) -> Set[str]:
+        seen = set(start)
+        stack = list(start)
+        while stack:
+            for other in edges(stack.pop()):
+                if other not in seen:
+                    seen.add(other)
+                    stack.append(other)
+        return seen
+
+    def digest(self, path: str, patterns: Sequence[str]) -> str:
+        """A hash of the content of the files ``path`` depends on that match ``patterns``.
+
+        ``patterns`` are ``fnmatch`` patterns of paths relative to the
+        repository root; it changes exactly when one of those files does.
+        """
+        combined = hashlib.sha1()
+        for dependency in sorted(self.dependencies(path)):
+            entry = self.files.get(dependency)  # None: deleted, the importer not re-read yet
+            name = _relative(dependency)
+            if entry and any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns):
+                combined.update(('%s %s\n' % (name, entry['hash'])).encode())
+        return combined.hexdigest()[:16]
+
+
+def load_graph(path: Path = GRAPH_FILE) -> ImportGraph:
+    """The graph, refreshed for every source file and saved."""
+    graph = ImportGraph(path)
+    graph.refresh(discover(SOURCE_GLOBS))
+    graph.save()
+    return graph
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m codemods.imports',
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument('files', nargs='+', type=Path, help='.ts/.tsx files to look up')
+    parser.add_argument('--deps', action='store_true',
+                        help='list what the files import instead of what imports them')
+    parser.add_argument('--direct', action='store_true',
+                        help='only direct imports, not the ones through other files')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='discard .codemod-imports.json and read every file again')
+    args = parser.parse_args(argv)
+
+    graph = ImportGraph()
+    if args.rebuild:
+        graph.files = {}
+    graph.refresh(discover(SOURCE_GLOBS))
+    graph.save()
+
+    paths = [os.path.abspath(p) for p in args.files]
+    unknown = [p for p in paths if p not in graph.files]
+    for path in unknown:
+        print('%s: not a .ts/.tsx file of client/src or shared' % display(path), file=sys.stderr)
+    found: Set[str] = set()
+    for path in paths:
+        if args.deps:
+            found.update(graph.imports(path) if args.direct else graph.dependencies(path))
+        elif args.direct:
+            found.update(graph.importers(path))
+        else:
+            found.update(graph.dependents([path]))
+    for path in sorted(found):
+        print(display(path))
+    return 1 if unknown else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+Instrumentation for the transform layer.
+
+Nothing is recorded unless a ``Recorder`` is active (``with recording():``),
+so the hooks in the runner and the patch engine cost a global lookup
+otherwise.  While one is active it collects:
+
+* per transform: calls, files changed, wall time, trigger hits handled and
+  substitutions (every splice or edit the patch engine applied for it);
+* per trigger pattern: matches, and the wall time of that pattern scanning
+  the same files on its own (the combined matcher cannot be split up);
+* per run: files and bytes scanned, time spent scanning, and how many files
+  ended up changed, unchanged, skipped, cached or in error.
+
+``as_dict`` is JSON-serialisable and ``merge`` folds in the dict of another
+recorder (the runner's worker processes each record their own).  With
+``profile=True`` a ``cProfile.Profile`` runs while scanning and transforming
+only, so its statistics show the tokenizer loop rather than file I/O.
+"""
+
+import re
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+from typing import Dict, Iterator, Optional
+
+# Substitutions made outside any transform (the fix scripts call the patch
+# engine directly) are counted under this name
+DIRECT = '(direct)'
+
+_TRANSFORM_FIELDS = ('calls', 'changed', 'hits', 'substitutions', 'seconds')
+_PATTERN_FIELDS = ('matches', 'seconds')
+_SCAN_FIELDS = ('files', 'bytes', 'seconds')
+
+
+class Recorder:
+    def __init__(self, profile: bool = False):
+        self.transforms: Dict[str, Dict[str, float]] = {}
+        self.patterns: Dict[str, Dict[str, float]] = {}
+        self.scan: Dict[str, float] = dict.fromkeys(_SCAN_FIELDS, 0)
+        self.files: Dict[str, int] = {}
+        self.profiler = None
+        if profile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+        self._current: Optional[str] = None
+
+    def _transform(self, name: str) -> Dict[str, float]:
+        entry = self.transforms.get(name)
+        if entry is None:
+            entry = self.transforms[name] = dict.fromkeys(_TRANSFORM_FIELDS, 0)
+        return entry
+
+    @contextmanager
+    def profiling(self) -> Iterator[None]:
+        if self.profiler is None:
+            yield
+            return
+        self.profiler.enable()
+        try:
+            yield
+        finally:
+            self.profiler.disable()
+
+    @contextmanager
+    def transform(self, name: str, hits: int = 0) -> Iterator[Dict[str, float]]:
+        """Time one application of transform ``name``; yields its counters."""
+        entry = self._transform(name)
+        entry['calls'] += 1
+        entry['hits'] += hits
+        previous, self._current = self._current, name
+        start = perf_counter()
+        try:
+            with self.profiling():
+                yield entry
+        finally:
+            entry['seconds'] += perf_counter() - start
+            self._current = previous
+
+    def substitutions(self, count: int) -> None:
+        self._transform(self._current or DIRECT)['substitutions'] += count
+
+    def scanned(self, nbytes: int, seconds: float) -> None:
+        self.scan['files'] += 1
+        self.scan['bytes'] += nbytes
+        self.scan['seconds'] += seconds
+
+    def time_patterns(self, triggers, text: str) -> None:
+        """Scan ``text`` with each of ``triggers`` (``Registry.triggers``) alone."""
+        for (transform, trigger), pattern in triggers.items():
+            compiled = re.compile(pattern)
+            start = perf_counter()
+            matches = sum(1 for _ in compiled.finditer(text))
+            seconds = perf_counter() - start
+            entry = self.patterns.get('%s/%s' % (transform, trigger))
+            if entry is None:
+                entry = self.patterns['%s/%s' % (transform, trigger)] = dict.fromkeys(_PATTERN_FIELDS, 0)
+            entry['matches'] += matches
+            entry['seconds'] += seconds
+
+    def file_status(self, status: str) -> None:
+        self.files[status] = self.files.get(status, 0) + 1
+
+    def total(self, field: str) -> float:
+        return sum(entry[field] for entry in self.transforms.values())
+
+    def as_dict(self) -> dict:
+        return {'transforms': self.transforms, 'patterns': self.patterns,
+                'scan': self.scan, 'files': self.files}
+
+    def merge(self, data: dict) -> None:
+        for name, entry in data['transforms'].items():
+            mine = self._transform(name)
+            for field in _TRANSFORM_FIELDS:
+                mine[field] += entry[field]
+        for name, entry in data['patterns'].items():
+            mine = self.patterns.setdefault(name, dict.fromkeys(_PATTERN_FIELDS, 0))
+            for field in _PATTERN_FIELDS:
+                mine[field] += entry[field]
+        for field in _SCAN_FIELDS:
+            self.scan[field] += data['scan'][field]
+        for status, count in data['files'].items():
+            self.files[status] = self.files.get(status, 0) + count
+
+    def table(self) -> str:
+        lines = ['%-24s %6s %7s %6s %6s %10s' % ('transform', 'calls', 'changed', 'hits', 'subs', 'time')]
+        for name, e in sorted(self.transforms.items()):
+            lines.append('%-24s %6d %7d %6d %6d %8.1fms' % (
+                name, e['calls'], e['changed'], e['hits'], e['substitutions'], e['seconds'] * 1000))
+        if self.patterns:
+            lines.append('')
+            lines.append('%-38s %7s %10s' % ('pattern (scanned alone)', 'matches', 'time'))
+            for name, e in sorted(self.patterns.items()):
+                lines.append('%-38s %7d %8.1fms' % (name, e['matches'], e['seconds'] * 1000))
+        lines.append('')
+        lines.append('scanned %d files, %d bytes in %.1fms' % (
+            self.scan['files'], self.scan['bytes'], self.scan['seconds'] * 1000))
+        if self.files:
+            lines.append('files: ' + ', '.join('%d %s' % (n, s) for s, n in sorted(self.files.items())))
+        return '\n'.join(lines)
+
+
+_active: Optional[Recorder] = None
+
+
+def active() -> Optional[Recorder]:
+    return _active
+
+
+@contextmanager
+def recording(recorder: Optional[Recorder] = None) -> Iterator[Recorder]:
+    """Make ``recorder`` (or a new one) the active recorder for the block."""
+    global _active
+    previous, _active = _active, recorder or Recorder()
+    try:
+        yield _active
+    finally:
+        _active = previous
+
+
+def transform(name: str, hits: int = 0):
+    """``Recorder.transform`` on the active recorder; yields ``None`` if there is none."""
+    if _active is None:
+        return nullcontext()
+    return _active.transform(name, hits)
+
+
+def substitutions(count: int) -> None:
+    if _active is not None and count:
+        _active.substitutions(count)
@@ -0,0 +1,323 @@
+"""
+Undo journal of the files a codemod run wrote.
+
+Usage (from the repository root)::
+
+    python -m codemods.journal                    # the recorded runs, newest last
+    python -m codemods.journal --show RUN         # the edits of one run
+    python -m codemods.journal --rollback         # undo the latest run not undone yet
+    python -m codemods.journal --rollback RUN     # undo an earlier one
+
+Instead of a backup copy of every file it touches, a run records what each
+of its splices did: the offset in the written file, the bytes it removed
+and the bytes it inserted, plus the file's hash before and after and its
+stat once written.  A splice that mostly re-indents the region it replaces
+is narrowed to the bytes that differ, line by line, so a journal is the
+size of the edits and a run over hundreds of pages costs kilobytes.  It is one JSON file per run in
+``.codemod-journal/``; the oldest are dropped past ``JOURNAL_KEEP``.  Watch
+mode records every save it fixes as a run of its own, so ``--rollback``
+repeated undoes them one by one, newest first.
+
+Rolling back puts the removed bytes back in place of the inserted ones,
+file by file from slices of the current content, without diffing or
+rescanning anything.  A file counts as untouched since the run when its
+size and mtime are the ones recorded (or, when only the mtime moved, its
+hash is) and every inserted span is still at its offset; if any file of the
+run fails that check the rollback is refused as a whole and nothing is
+written.  The restored files are written together in one batch (see
+``codemods.output``).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .cache import content_hash
+from .output import WriteBatch, atomic_write
+from .patch import iter_splices
+from .source import changed_span
+from .store import REPO_ROOT, display
+
+JOURNAL_DIR = REPO_ROOT / '.codemod-journal'
+JOURNAL_FORMAT = 1
+JOURNAL_KEEP = 50
+
+# ``(start, end, replacement)`` against the bytes of the file before the run
+ByteSplice = Tuple[int, int, bytes]
+
+_last_stamp = 0  # microseconds of the last run id handed out
+
+
+class RollbackError(Exception):
+    """A run that cannot be rolled back: unknown, already undone, or files changed since."""
+
+
+def _encode(data: bytes) -> str:
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        import base64
+        return 'base64:' + base64.b64encode(data).decode('ascii')
+
+
+def _decode(value: str) -> bytes:
+    if value.startswith('base64:'):
+        import base64
+        return base64.b64decode(value[7:])
+    return value.encode('utf-8')
+
+
+def _trimmed(start: int, removed: bytes, inserted: bytes) -> Iterator[ByteSplice]:
+    first, removed_end, inserted_end = changed_span(removed, inserted)
+    if removed_end > first or inserted_end > first:
+        yield start + first, removed[first:removed_end], inserted[first:inserted_end]
+
+
+def _narrow(start: int, removed: bytes, inserted: bytes) -> Iterator[ByteSplice]:
+    """The parts of a splice at ``start`` that actually change bytes.
+
+    Transforms replace whole regions that they mostly re-indent; lines are
+    matched on their stripped content, and a matched line only contributes
+    the bytes that differ (usually its indentation).
+    """
+    if b'\n' not in removed or b'\n' not in inserted:
+        yield from _trimmed(start, removed, inserted)
+        return
+    from difflib import SequenceMatcher  # only runs that write pay for the import
+    old, new = removed.splitlines(True), inserted.splitlines(True)
+    starts = [start]
+    for line in old:
+        starts.append(starts[-1] + len(line))
+    matcher = SequenceMatcher(None, [line.strip() for line in old],
+                              [line.strip() for line in new], autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            for number, (line, replacement) in enumerate(zip(old[i1:i2], new[j1:j2]), i1):
+                yield from _trimmed(starts[number], line, replacement)
+        else:
+            yield from _trimmed(starts[i1], b''.join(old[i1:i2]), b''.join(new[j1:j2]))
+
+
+def _command() -> str:
+    """How this process was started, as it would be typed again."""
+    spec = getattr(sys.modules.get('__main__'), '__spec__', None)
+    if spec is not None and spec.name:  # python -m package[.module]
+        name = spec.name[:-len('.__main__')] if spec.name.endswith('.__main__') else spec.name
+        return ' '.join(['python -m', name] + sys.argv[1:])
+    return ' '.join([os.path.basename(sys.argv[0])] + sys.argv[1:])
+
+
+class Journal:
+    """The edits of one run, recorded as files are queued for writing.
+
+    ``add`` each file with its original bytes and byte splices before it is
+    written, then ``save`` once the writes are done::
+
+        journal = Journal()
+        journal.add(path, source.data, source.byte_splices(splices))
+        atomic_write(path, source.splice(splices))
+        journal.save()
+    """
+
+    def __init__(self, directory: Path = JOURNAL_DIR, command: Optional[str] = None):
+        self.directory = Path(directory)
+        # to the microsecond, and never twice: one process (watch mode)
+        # records many runs a second
+        global _last_stamp
+        _last_stamp = max(time.time_ns() // 1000, _last_stamp + 1)
+        seconds, micros = divmod(_last_stamp, 1000000)
+        self.run = '%s.%06d-%d' % (time.strftime('%Y%m%d-%H%M%S', time.localtime(seconds)),
+                                   micros, os.getpid())
+        self.command = command if command is not None else _command()
+        self.files: Dict[str, dict] = {}
+
+    def add(self, path, data: bytes, splices: Sequence[ByteSplice]) -> None:
+        """Record that ``path``, holding ``data``, is rewritten with ``splices``."""
+        edits = []
+        shift = 0  # how far the new file has moved past the old one so far
+        post = hashlib.sha1()
+        for piece in iter_splices(data, splices):
+            post.update(piece)
+        for start, end, replacement in sorted(splices, key=lambda item: (item[0], item[1])):
+            if isinstance(replacement, str):
+                replacement = replacement.encode('utf-8')
+            for offset, removed, inserted in _narrow(start, bytes(data[start:end]), replacement):
+                edits.append([offset + shift, _encode(removed), _encode(inserted)])
+                shift += len(inserted) - len(removed)
+        if edits:
+            self.files[os.path.abspath(path)] = {
+                'pre_hash': content_hash(data), 'post_hash': post.hexdigest(), 'edits': edits}
+
+    def add_content(self, path, old: bytes, new: bytes) -> None:
+        """Record a rewrite of ``path`` from ``old`` to ``new`` as one splice.
+
+        For changes that only exist as new content; the splice covers
+        everything from the first to the last byte that differs.
+        """
+        start, old_end, new_end = changed_span(old, new)
+        self.add(path, old, [(start, old_end, new[start:new_end])])
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def save(self, written: Optional[Sequence[str]] = None) -> Optional[Path]:
+        """Write the journal, with each file's stat as it is now; return its path.
+
+        ``written`` limits it to the files that were actually written.
+        Nothing is saved for a run that wrote nothing.
+        """
+        if written is not None:
+            keep = {os.path.abspath(p) for p in written}
+            self.files = {p: e for p, e in self.files.items() if p in keep}
+        if not self.files:
+            return None
+        for path, entry in self.files.items():
+            st = os.stat(path)
+            entry['mtime_ns'], entry['size'] = st.st_mtime_ns, st.st_size
+        self.directory.mkdir(exist_ok=True)
+        target = self.directory / ('%s.json' % self.run)
+        atomic_write(target, json.dumps({
+            'format': JOURNAL_FORMAT, 'run': self.run, 'command': self.command,
+            'files': self.files}, ensure_ascii=False, separators=(',', ':')))
+        for old in runs(self.directory)[:-JOURNAL_KEEP]:
+            try:
+                os.unlink(self.directory / ('%s.json' % old))
+            except OSError:
+                pass
+        return target
+
+
+def runs(directory: Path = JOURNAL_DIR) -> List[str]:
+    """The ids of the recorded runs, oldest first."""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return sorted(name[:-5] for name in names if name.endswith('.json'))
+
+
+def load(run: Optional[str] = None, directory: Path = JOURNAL_DIR) -> dict:
+    """The journal of ``run``, by default the latest one."""
+    recorded = runs(directory)
+    if run is None:
+        if not recorded:
+            raise RollbackError('no runs recorded in %s' % directory)
+        run = recorded[-1]
+    try:
+        with open(Path(directory) / ('%s.json' % run), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except OSError:
+        raise RollbackError('no run %r in %s' % (run, directory)) from None
+    except ValueError as e:
+        raise RollbackError('journal of run %r is corrupt: %s' % (run, e)) from None
+    if data.get('format') != JOURNAL_FORMAT:
+        raise RollbackError('journal of run %r has an unknown format' % run)
+    return data
+
+
+def latest(directory: Path = JOURNAL_DIR) -> str:
+    """The newest run that has not been rolled back."""
+    recorded = runs(directory)
+    if not recorded:
+        raise RollbackError('no runs recorded in %s' % directory)
+    for run in reversed(recorded):
+        if not load(run, directory).get('rolled_back'):
+            return run
+    raise RollbackError('every run in %s is rolled back already' % directory)
+
+
+def _unchanged(path: str, entry: dict) -> Tuple[Optional[bytes], Optional[str]]:
+    """``(content, None)`` when ``path`` is as the run left it, else ``(None, reason)``."""
+    try:
+        st = os.stat(path)
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None, 'deleted since the run'
+    if (st.st_mtime_ns, st.st_size) != (entry['mtime_ns'], entry['size']) \
+            and content_hash(data) != entry['post_hash']:
+        return None, 'changed since the run'
+    for offset, _, inserted in entry['edits']:
+        inserted = _decode(inserted)
+        if data[offset:offset + len(inserted)] != inserted:
+            return None, 'changed since the run (at byte %d)' % offset
+    return data, None
+
+
+def undo_splices(entry: dict) -> List[ByteSplice]:
+    """The splices that turn a file as the run wrote it back into the original."""
+    splices = []
+    for offset, removed, inserted in entry['edits']:
+        splices.append((offset, offset + len(_decode(inserted)), _decode(removed)))
+    return splices
+
+
+def rollback(run: Optional[str] = None, directory: Path = JOURNAL_DIR) -> List[str]:
+    """Undo ``run`` (by default the ``latest`` not rolled back); return the restored paths.
+
+    Raises ``RollbackError``, having written nothing, when any file of the
+    run changed since or the run was already rolled back.
+    """
+    data = load(run if run is not None else latest(directory), directory)
+    if data.get('rolled_back'):
+        raise RollbackError('run %s was already rolled back' % data['run'])
+    batch = WriteBatch()
+    refused = []
+    for path, entry in data['files'].items():
+        content, reason = _unchanged(path, entry)
+        if reason is not None:
+            refused.append('%s: %s' % (display(path), reason))
+            continue
+        batch.add(path, iter_splices(content, undo_splices(entry)))
+    if refused:
+        raise RollbackError('not rolling back run %s:\n  %s' % (data['run'], '\n  '.join(refused)))
+    restored = batch.flush()
+    data['rolled_back'] = time.strftime('%Y-%m-%d %H:%M:%S')
+    atomic_write(Path(directory) / ('%s.json' % data['run']),
+                 json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+    return restored
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m codemods.journal',
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--show', metavar='RUN',
+                        help='list the files and edits of RUN')
+    parser.add_argument('--rollback', nargs='?', const='', metavar='RUN',
+                        help='undo RUN (default: the latest run not rolled back yet)')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.rollback is not None:
+            run = args.rollback or latest()
+            restored = rollback(run)
+            for path in restored:
+                print('restored   %s' % display(path))
+            print('run %s rolled back: %d files' % (run, len(restored)))
+        elif args.show:
+            data = load(args.show)
+            for path, entry in data['files'].items():
+                print('%s (%d edits)' % (display(path), len(entry['edits'])))
+                for offset, removed, inserted in entry['edits']:
+                    print('  @%-8d -%d +%d bytes' % (offset, len(_decode(removed)),
+                                                     len(_decode(inserted))))
+        else:
+            for run in runs():
+                data = load(run)
+                edits = sum(len(e['edits']) for e in data['files'].values())
+                state = '  (rolled back)' if data.get('rolled_back') else ''
+                print('%s  %3d files %5d edits  %s%s' % (run, len(data['files']), edits,
+                                                       data.get('command', ''), state))
+    except RollbackError as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
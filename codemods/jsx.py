@@ -0,0 +1,95 @@
+"""
+JSX element tree built from the scanner's token stream.
+
+``parse_elements`` makes one pass over the tokens and returns every JSX
+element with the offsets of its opening tag, closing tag and direct
+children.  Children are elements, ``{...}`` expression containers and
+non-blank text runs; elements nested inside an expression container are
+children of that container.
+"""
+
+from typing import Iterable, List, Optional
+
+from .scanner import (
+    PUNCT, TAG_CLOSE, TAG_END, TAG_OPEN, TAG_SELF_CLOSE, TEXT, Token, tokenize,
+)
+
+ELEMENT = 'element'
+EXPRESSION = 'expression'
+ATTRIBUTE = 'attribute'  # "{...}" attribute value; never listed as a child
+
+
+class Node:
+    """An element, expression container or text run.
+
+    For elements, ``name`` is the tag name (``''`` for fragments),
+    ``tag_end`` the offset just past the opening tag and ``close_start`` the
+    offset of the closing tag (equal to ``end`` for self-closing elements).
+    """
+    __slots__ = ('kind', 'name', 'start', 'end', 'depth', 'tag_end',
+                 'close_start', 'children')
+
+    def __init__(self, kind: str, name: str, start: int, depth: int):
+        self.kind = kind
+        self.name = name
+        self.start = start
+        self.end = -1
+        self.depth = depth
+        self.tag_end: Optional[int] = None
+        self.close_start: Optional[int] = None
+        self.children: List['Node'] = []
+
+    def __repr__(self):
+        return '<%s %s %d:%d>' % (self.kind, self.name, self.start, self.end)
+
+
+def parse_elements(text: str, tokens: Optional[Iterable[Token]] = None) -> List[Node]:
+    """Return every element of ``text`` in document order.
+
+    ``tokens`` are the tokens of ``text`` when the caller already has them
+    (see ``scanner.scan``).
+    """
+    elements = []
+    stack: List[Node] = []
+    for tok in tokenize(text) if tokens is None else tokens:
+        kind = tok.kind
+        if kind == TAG_OPEN:
+            name = text[tok.start + 1:tok.end].strip()
+            node = Node(ELEMENT, '' if name == '>' else name, tok.start, tok.depth)
+            if not node.name:
+                node.tag_end = tok.end
+            if stack:
+                stack[-1].children.append(node)
+            stack.append(node)
+            elements.append(node)
+        elif kind == TAG_END:
+            if stack and stack[-1].kind == ELEMENT and stack[-1].tag_end is None:
+                stack[-1].tag_end = tok.end
+        elif kind in (TAG_SELF_CLOSE, TAG_CLOSE):
+            while stack and stack[-1].kind != ELEMENT:
+                stack.pop()  # an unterminated expression inside the element
+            if stack:
+                node = stack.pop()
+                node.end = tok.end
+                if kind == TAG_SELF_CLOSE:
+                    node.tag_end = node.close_start = tok.end
+                else:
+                    node.close_start = tok.start
+        elif kind == PUNCT and stack:
+            top = stack[-1]
+            char = text[tok.start]
+            if char == '{' and top.kind == ELEMENT and tok.depth == top.depth + 1:
+                if top.tag_end is None:
+                    stack.append(Node(ATTRIBUTE, '', tok.start, tok.depth))
+                else:
+                    node = Node(EXPRESSION, '', tok.start, tok.depth)
+                    top.children.append(node)
+                    stack.append(node)
+            elif char == '}' and top.kind != ELEMENT and tok.depth == top.depth:
+                top.end = tok.end
+                stack.pop()
+        elif kind == TEXT and stack and stack[-1].kind == ELEMENT and stack[-1].tag_end is not None:
+            node = Node(TEXT, '', tok.start, tok.depth)
+            node.end = tok.end
+            stack[-1].children.append(node)
+    return elements
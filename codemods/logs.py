@@ -0,0 +1,256 @@
+"""
+Gate ``console.log`` calls in server code behind the log level.
+
+Every ``console.log(...)`` call becomes a call to ``logger.debug`` from
+``server/utils/logger.ts`` behind a check of ``logger.debugEnabled``, so its
+arguments (often large objects built for the log line) are not evaluated at
+all when the level is above ``debug``:
+
+* as a statement (including right after a ``case x:`` or ``default:``
+  label), ``console.log(a, b);`` becomes
+  ``if (logger.debugEnabled) logger.debug(a, b);``
+* anywhere else (an arrow body, an unbraced ``if``/``else`` branch, an
+  operand), it becomes ``logger.debugEnabled && logger.debug(a, b)``, which
+  cannot capture a following ``else``; after an operator that binds tighter
+  than ``&&`` it is parenthesized.  It never starts a line with ``(``, which
+  would continue the previous statement when that has no semicolon.
+
+Calls are found on one token stream of the file (``jsx=False``), so
+multi-line calls, nested parentheses and ``console.log`` inside strings,
+templates or comments are handled; the arguments are copied verbatim.
+When anything was rewritten and the file does not import ``logger`` yet, the
+import is added after its last top-level import.
+
+Usage (from the repository root)::
+
+    python -m codemods logs                     # rewrite the request-path files
+    python -m codemods logs --report            # count the calls per file, write nothing
+    python -m codemods logs server/index.ts     # other files
+"""
+
+import argparse
+import os
+import re
+import sys
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from .apply import Change, write_changes
+from .balance import BalanceError
+from .scanner import COMMENT, NAME, PUNCT, STRING, Token, newline_at, tokenize
+from .store import REPO_ROOT
+from .verify import VerifyError
+
+LOGGER_MODULE = os.path.join('server', 'utils', 'logger')
+
+STATEMENT = 'if (logger.debugEnabled) logger.debug(%s)'
+EXPRESSION = 'logger.debugEnabled && logger.debug(%s)'
+
+# The files that run on every request: routes, services and storage
+DEFAULT_GLOBS = (
+    'server/routes.ts',
+    'server/unit-routes.ts',
+    'server/routes/*.ts',
+    'server/services/*.ts',
+    'server/storage.ts',
+    'server/supabase-storage.ts',
+)
+
+_OPENERS = frozenset(('(', '[', '{'))
+_CLOSERS = frozenset((')', ']', '}'))
+# After these a new statement starts; after ")" (an if/for/while head),
+# "else" or "do" comes a statement that is not in a block of its own
+_BLOCK_BOUNDARY = frozenset((';', '{', '}'))
+# Tokens after which the expression form needs no parentheses
+_LOOSE_PUNCT = frozenset((')', ']', '}', '{', ';', '(', '[', ',', '=>', '=', '?', ':',
+                          '||', '??', '&&'))
+_TIGHT_KEYWORDS = frozenset(('await', 'typeof', 'void', 'delete'))
+_IMPORTED = re.compile(r'\bimport\s*\{[^}]*\blogger\b[^}]*\}\s*from\b')
+
+
+def _value(text: str, token: Optional[Token]) -> Optional[str]:
+    return text[token.start:token.end] if token is not None else None
+
+
+def _closes_label(text: str, tokens: List[Token], colon: int) -> bool:
+    """Whether the ``:`` at ``tokens[colon]`` ends a ``case x:`` or ``default:`` label."""
+    depth = tokens[colon].depth
+    before = _value(text, tokens[colon - 1]) if colon else None
+    if before == 'default':
+        # "default:" in a switch, not the key of "{ default: ... }"
+        prev = _value(text, tokens[colon - 2]) if colon > 1 else None
+        return prev in (';', '}', ':') or prev == '{' and colon > 2 \
+            and _value(text, tokens[colon - 3]) == ')'
+    # "case" before the colon, outside any bracket, with an expression in between
+    level = 0
+    for k in range(colon - 1, -1, -1):
+        token = tokens[k]
+        if token.depth != depth:
+            continue
+        value = _value(text, token)
+        if token.kind == NAME and value == 'case' and not level and k < colon - 1:
+            return True
+        if token.kind != PUNCT:
+            continue
+        if value in (')', ']'):
+            level += 1
+        elif value in ('(', '['):
+            level -= 1
+            if level < 0:
+                return False
+        elif value in ('?', ':') and not level or value in (';', '{', '}'):
+            return False
+    return False
+
+
+def _in_block(text: str, tokens: List[Token], call: int) -> bool:
+    """Whether the call starting at ``tokens[call]`` is a statement of its own block."""
+    if not call:
+        return True
+    prev = tokens[call - 1]
+    if prev.kind == PUNCT:
+        value = _value(text, prev)
+        if value in _BLOCK_BOUNDARY:
+            return True
+        if value == ':':
+            return _closes_label(text, tokens, call - 1)
+        # "if (x)\n  console.log()" has no block of its own, and cannot be
+        # told apart from "foo()\nconsole.log()" without parsing: take the
+        # form that is right for both
+        return value == ']' and '\n' in text[prev.end:tokens[call].start]
+    if prev.kind == NAME and _value(text, prev) in ('else', 'do', 'return', 'typeof',
+                                                    'void', 'await', 'yield'):
+        return False
+    # an identifier, literal or template ending the previous statement
+    return '\n' in text[prev.end:tokens[call].start]
+
+
+def log_splices(text: str) -> List[Tuple[int, int, str]]:
+    """The ``(start, end, replacement)`` splices that gate every ``console.log``."""
+    tokens = [t for t in tokenize(text, jsx=False) if t.kind != COMMENT]
+    splices = []
+    i = 0
+    while i + 3 < len(tokens):
+        first = tokens[i]
+        if (first.kind != NAME or _value(text, first) != 'console'
+                or _value(text, tokens[i + 1]) != '.' or _value(text, tokens[i + 2]) != 'log'
+                or _value(text, tokens[i + 3]) != '('):
+            i += 1
+            continue
+        prev = tokens[i - 1] if i else None
+        if prev is not None and _value(text, prev) in ('.', '?.'):
+            i += 1
+            continue  # "window.console.log" and the like are left alone
+        open_paren = tokens[i + 3]
+        level = 0
+        j = i + 3
+        while j < len(tokens):
+            token = tokens[j]
+            if token.kind == PUNCT:
+                value = _value(text, token)
+                if value in _OPENERS:
+                    level += 1
+                elif value in _CLOSERS:
+                    level -= 1
+                    if level == 0:
+                        break
+            j += 1
+        if j == len(tokens):
+            break  # unterminated call: leave the rest of the file alone
+        close = tokens[j]
+        args = text[open_paren.end:close.start]
+        if _in_block(text, tokens, i):
+            replacement = STATEMENT % args
+        elif prev.kind == PUNCT and _value(text, prev) not in _LOOSE_PUNCT \
+                or prev.kind == NAME and _value(text, prev) in _TIGHT_KEYWORDS:
+            replacement = '(%s)' % (EXPRESSION % args)
+        else:
+            replacement = EXPRESSION % args
+        splices.append((first.start, close.end, replacement))
+        i = j + 1
+    return splices
+
+
+def _import_splice(text: str, path: str, root: str) -> Tuple[int, int, str]:
+    """The splice adding the ``logger`` import to the file at ``path``."""
+    module = os.path.relpath(os.path.join(root, LOGGER_MODULE), os.path.dirname(path))
+    module = module.replace(os.sep, '/')
+    if not module.startswith('.'):
+        module = './' + module
+    end, quote = None, '"'
+    tokens = [t for t in tokenize(text, jsx=False) if t.kind != COMMENT]
+    for i, token in enumerate(tokens):
+        if token.depth or token.kind != NAME or _value(text, token) != 'import':
+            continue
+        if i + 1 < len(tokens) and _value(text, tokens[i + 1]) in ('(', '.'):
+            continue  # import() and import.meta
+        for j in range(i + 1, len(tokens)):
+            if tokens[j].kind == STRING:
+                end, quote = tokens[j].end, text[tokens[j].start]
+                if j + 1 < len(tokens) and _value(text, tokens[j + 1]) == ';':
+                    end = tokens[j + 1].end
+                break
+    line = 'import { logger } from %s%s.js%s;' % (quote, module, quote)
+    # the new line ends like the one it goes after (or before), so no other
+    # line's ending changes in a file that mixes CRLF and LF
+    if end is None:
+        return 0, 0, line + newline_at(text, 0)
+    return end, end, newline_at(text, end) + line
+
+
+def gate_splices(text: str, path: str, root: str) -> List[Tuple[int, int, str]]:
+    """``log_splices`` plus the ``logger`` import when the file needs it.
+
+    ``path`` is the file's path and ``root`` the repository root, to derive
+    the import's relative module path.  Raises ``ValueError`` when the file
+    has a ``logger`` of its own that the import would shadow.
+    """
+    splices = log_splices(text)
+    if splices and not _IMPORTED.search(text):
+        if re.search(r'\blogger\b', text):
+            raise ValueError('already defines or uses a name "logger"')
+        splices.append(_import_splice(text, path, root))
+    return splices
+
+
+def default_files() -> List[Path]:
+    return sorted({p for pattern in DEFAULT_GLOBS for p in REPO_ROOT.glob(pattern)
+                   if not p.name.endswith(('.test.ts', '.spec.ts'))})
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m codemods.logs',
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument('files', nargs='*', type=Path,
+                        help='server files to rewrite (default: routes, services and storage)')
+    parser.add_argument('--report', action='store_true',
+                        help='only count the calls that would be rewritten in each file')
+    args = parser.parse_args(argv)
+
+    changes = []
+    total = errors = 0
+    for path in args.files or default_files():
+        change = Change(os.path.abspath(path))
+        try:
+            change.splices = gate_splices(change.text, str(change.path), str(REPO_ROOT))
+            calls = sum(1 for s in change.splices if s[0] != s[1])  # the import is an insertion
+            if calls and not args.report:
+                change.check()
+                changes.append(change)
+        except (ValueError, BalanceError, VerifyError) as e:
+            print('%s: not rewritten: %s' % (change.name, e), file=sys.stderr)
+            errors += 1
+            continue
+        total += calls
+        if calls or args.report:
+            print('%5d  %s' % (calls, change.name))
+
+    journal = write_changes(changes)  # one rename window, so the dev server restarts once
+    print('%d console.log calls %s' % (total, 'to gate' if args.report else 'gated'))
+    if journal:
+        print('undo with: python -m codemods.journal --rollback %s' % journal.run)
+    return 2 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
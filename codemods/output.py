@@ -0,0 +1,129 @@
+"""
+Atomic, coalesced file output.
+
+Transforms work on strings in memory; a ``WriteBatch`` collects the new
+content of every changed file and ``flush`` puts it all on disk in two
+phases:
+
+1. each file is written in full to a hidden temporary next to it
+   (``.<name>.<pid>.tmp``), with the original's permission bits;
+2. the temporaries are renamed over the originals, back to back.
+
+A watcher such as the Vite dev server never sees a half-written page
+(``os.replace`` is atomic), and since the renames of a whole run happen
+within a fraction of a millisecond they land in one debounce window: one
+rebuild instead of one per file.  If any temporary cannot be written,
+nothing has been replaced yet and the temporaries are removed.  If a rename
+fails, the files renamed before it stay replaced: ``FlushError`` says which
+they are, so the caller can record them (in the undo journal, say), and the
+remaining temporaries are removed.
+"""
+
+import os
+from typing import Dict, Iterable, List, Union
+
+# A file's new content: text, bytes, or bytes in pieces (see
+# ``Source.iter_splice``), which are written one by one and never joined
+Content = Union[str, bytes, Iterable[Union[bytes, memoryview]]]
+
+
+class FlushError(OSError):
+    """A rename failed partway through a flush; ``written`` were replaced already."""
+
+    def __init__(self, error: OSError, path: str, written: List[str]):
+        super().__init__(error.errno, error.strerror, path)
+        self.written = written
+
+
+def _temporary(path: str) -> str:
+    directory, name = os.path.split(path)
+    return os.path.join(directory, '.%s.%d.tmp' % (name, os.getpid()))
+
+
+class WriteBatch:
+    """New file contents, kept in memory until ``flush``.
+
+    Usable as a context manager that flushes on a clean exit::
+
+        with WriteBatch() as batch:
+            batch.add(path, text)
+    """
+
+    def __init__(self, fsync: bool = False):
+        self.fsync = fsync  # also survive a crash, not just a concurrent reader
+        self.pending: Dict[str, Content] = {}
+
+    def add(self, path, content: Content) -> None:
+        """Queue ``content`` (``str`` is UTF-8 encoded as is) for ``path``.
+
+        Pieces are only consumed by ``flush``; whatever they are sliced from
+        must stay unchanged until then.
+        """
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        self.pending[os.fspath(path)] = content
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def flush(self) -> List[str]:
+        """Write every queued file; return their paths in the order written.
+
+        Raises ``FlushError`` when a rename fails; the files it lists as
+        ``written`` are no longer pending, the others still are.
+        """
+        staged = []
+        try:
+            for path, data in self.pending.items():
+                tmp = _temporary(path)
+                with open(tmp, 'wb') as f:
+                    staged.append((tmp, path))
+                    if isinstance(data, (bytes, bytearray, memoryview)):
+                        f.write(data)
+                    else:
+                        f.writelines(data)
+                    if self.fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+                try:
+                    os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+                except FileNotFoundError:
+                    pass
+        except BaseException:
+            for tmp, _ in staged:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+            raise
+        # The write window: nothing but renames from here on
+        written = []
+        for number, (tmp, path) in enumerate(staged):
+            try:
+                os.replace(tmp, path)
+            except OSError as e:
+                for left, _ in staged[number:]:
+                    try:
+                        os.unlink(left)
+                    except OSError:
+                        pass
+                raise FlushError(e, path, written) from e
+            del self.pending[path]
+            written.append(path)
+        return written
+
+    def __enter__(self) -> 'WriteBatch':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.flush()
+        else:
+            self.pending.clear()
+
+
+def atomic_write(path, content: Content, fsync: bool = False) -> None:
+    """Replace ``path`` with ``content`` in one rename."""
+    batch = WriteBatch(fsync)
+    batch.add(path, content)
+    batch.flush()
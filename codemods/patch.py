@@ -0,0 +1,251 @@
+"""
+Anchor-indexed patch engine.
+
+Edits are addressed by the content of an anchor line instead of by absolute
+line number, so an upstream change to the page moves the patch along with it
+instead of silently corrupting the file.  ``AnchorIndex`` hashes every line
+once; each anchor then resolves with a dictionary lookup plus a bisect over
+the (usually one-element) list of lines with that content.  The whole batch
+is applied in one rebuild of the file.  Both work on ``str`` or on a file's
+UTF-8 bytes; with bytes, untouched lines are copied as ``memoryview`` slices
+and never decoded.
+"""
+
+from bisect import bisect_right
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from . import instrument
+from .scanner import Layout
+
+# Patched text: ``str``, or the UTF-8 bytes of a file
+Text = Union[str, bytes]
+
+
+REPLACE = 'replace'
+INSERT_BEFORE = 'insert_before'
+INSERT_AFTER = 'insert_after'
+
+
+class AnchorError(LookupError):
+    """An anchor did not resolve, or two edits disagree about a line."""
+
+
+class Anchor(NamedTuple):
+    """A line located by its stripped content.
+
+    ``occurrence`` counts matches from the top of the file, or from the line
+    of ``after`` when given.  ``offset`` moves the result up or down from the
+    matched line, for edits that target a line next to a distinctive one.
+    """
+    text: str
+    occurrence: int = 1
+    after: Optional['Anchor'] = None
+    offset: int = 0
+
+
+class Edit(NamedTuple):
+    """Replace the anchored line, or insert a line before/after it.
+
+    ``text`` is the new line without its line ending.  For replacements,
+    ``expect`` is the stripped content the target line must have.  With a
+    ``level``, ``text`` is given without indentation and gets that of the
+    anchored line, or of the line ``like`` points at, ``level`` steps deeper
+    (see ``scanner.Layout``): a fragment line lines up with the content of
+    its branch, not with the ``) : (`` next to it.
+    """
+    anchor: Anchor
+    action: str
+    text: str
+    expect: Optional[str] = None
+    level: Optional[int] = None
+    like: Optional[Anchor] = None
+
+
+class AnchorIndex:
+    """Hash index from stripped line content to line numbers (0-based).
+
+    ``text`` may be ``str`` or UTF-8 ``bytes``; lines are kept as
+    ``(start, end)`` offsets and only sliced out to be hashed.  A byte order
+    mark is not part of the first line, so edits to that line keep it.
+    """
+
+    def __init__(self, text: Text):
+        self.text = text
+        self.spans = _line_spans(text)
+        self._binary = not isinstance(text, str)
+        bom = b'\xef\xbb\xbf' if self._binary else '\ufeff'
+        if self.spans and text.startswith(bom):
+            self.spans[0] = (len(bom), self.spans[0][1])
+        self._positions: Dict[Text, List[int]] = {}
+        for number, (start, end) in enumerate(self.spans):
+            key = text[start:end].strip()
+            if key:
+                self._positions.setdefault(key, []).append(number)
+        self._resolved: Dict[Anchor, int] = {}
+
+    def resolve(self, anchor: Anchor) -> int:
+        """Return the 0-based line number ``anchor`` points at."""
+        if anchor in self._resolved:
+            return self._resolved[anchor]
+        key = anchor.text.strip()
+        positions = self._positions.get(key.encode('utf-8') if self._binary else key, [])
+        first = 0
+        if anchor.after is not None:
+            first = bisect_right(positions, self.resolve(anchor.after))
+        index = first + anchor.occurrence - 1
+        if index >= len(positions):
+            raise AnchorError('anchor not found: %r (occurrence %d)'
+                              % (anchor.text, anchor.occurrence))
+        number = positions[index] + anchor.offset
+        if not 0 <= number < len(self.spans):
+            raise AnchorError('anchor %r offset %d leaves the file'
+                              % (anchor.text, anchor.offset))
+        self._resolved[anchor] = number
+        return number
+
+
+def _line_spans(text: Text) -> List[Tuple[int, int]]:
+    """``(start, end)`` of every line; ``end`` is past its line ending."""
+    newline = '\n' if isinstance(text, str) else b'\n'
+    spans = []
+    start = 0
+    size = len(text)
+    while start < size:
+        end = text.find(newline, start) + 1 or size
+        spans.append((start, end))
+        start = end
+    return spans
+
+
+def _newline_of(text: Text, spans: Sequence[Tuple[int, int]]) -> Text:
+    """The line ending of the first line that has one (``\\n`` by default)."""
+    binary = not isinstance(text, str)
+    for start, end in spans:
+        if text[end - 1:end] in ('\n', b'\n'):
+            crlf = end - start > 1 and text[end - 2:end - 1] in ('\r', b'\r')
+            newline = '\r\n' if crlf else '\n'
+            return newline.encode() if binary else newline
+    return b'\n' if binary else '\n'
+
+
+def apply_edits(text: Text, edits: Sequence[Edit]) -> Tuple[Text, List[Tuple[Edit, int]]]:
+    """Apply ``edits`` to ``text`` in a single rebuild.
+
+    Returns the new text and the ``(edit, line_number)`` pairs, in the order
+    given, with 1-based line numbers of the original file.  Raises
+    ``AnchorError`` before changing anything if an edit does not resolve or
+    two replacements target the same line.  ``text`` may be ``str`` or UTF-8
+    ``bytes``; the result has the same type, and only the edited lines
+    differ from the input.
+    """
+    splices, resolved = edit_splices(text, edits)
+    return apply_splices(text, splices), resolved
+
+
+def edit_splices(text: Text, edits: Sequence[Edit]) -> Tuple[List[Tuple[int, int, Text]],
+                                                              List[Tuple[Edit, int]]]:
+    """The ``(start, end, text)`` splices of ``edits``, as ``apply_edits`` applies them.
+
+    Returns the splices, in order, and the resolved ``(edit, line_number)``
+    pairs; raises ``AnchorError`` like ``apply_edits``.
+    """
+    index = AnchorIndex(text)
+    binary = not isinstance(text, str)
+    newline = _newline_of(text, index.spans)
+    line_end = b'\r\n' if binary else '\r\n'
+
+    # (start, rank, order, end, text): at one offset, lines inserted after
+    # the previous line come before lines inserted before the next one
+    splices = []
+    replaced = set()
+    unterminated = None  # an unterminated last line something is inserted after
+    layout = None
+    resolved = []
+    for order, edit in enumerate(edits):
+        number = index.resolve(edit.anchor)
+        start, end = index.spans[number]
+        line = text[start:end]
+        new = edit.text.encode('utf-8') if binary else edit.text
+        if edit.level is not None:
+            if layout is None:
+                layout = Layout(text)
+            like = number if edit.like is None else index.resolve(edit.like)
+            new = layout.indent_for(like, edit.level) + new.lstrip()
+        if edit.action == REPLACE:
+            if edit.expect is not None:
+                current = line.decode('utf-8', 'replace') if binary else line
+                if current.strip() != edit.expect.strip():
+                    raise AnchorError('line %d is %r, expected %r'
+                                      % (number + 1, current.strip(), edit.expect))
+            if number in replaced:
+                raise AnchorError('line %d replaced twice' % (number + 1))
+            replaced.add(number)
+            ending = line[len(line.rstrip(line_end)):] or newline
+            splices.append((start, 2, order, end, new + ending))
+        elif edit.action == INSERT_BEFORE:
+            splices.append((start, 1, order, start, new + newline))
+        elif edit.action == INSERT_AFTER:
+            if line[-1:] not in ('\n', b'\n'):
+                unterminated = number
+            splices.append((end, 0, order, end, new + newline))
+        else:
+            raise ValueError('unknown edit action: %r' % (edit.action,))
+        resolved.append((edit, number + 1))
+
+    if not resolved:
+        return [], resolved
+    if unterminated is not None and unterminated not in replaced:
+        end = index.spans[unterminated][1]
+        splices.append((end, 0, -1, end, newline))  # a replaced line gets its own
+    splices.sort(key=lambda item: item[:3])
+    return [(start, end, new) for start, _, _, end, new in splices], resolved
+
+
+def apply_splices(text: Text, splices: Sequence[Tuple[int, int, Text]]) -> Text:
+    """Replace each ``(start, end, text)`` range of ``text`` in one rebuild.
+
+    Untouched regions are copied through as slices; ranges must not overlap
+    (insertions, where ``start == end``, may share an offset and keep their
+    order).  ``text`` may also be bytes-like: untouched regions are then
+    ``memoryview`` slices joined once, and ``str`` replacements are UTF-8
+    encoded, so no byte outside the ranges is copied twice or re-encoded.
+    """
+    if not splices:
+        return text
+    instrument.substitutions(len(splices))
+    return rebuild(text, splices)
+
+
+def rebuild(text: Text, splices: Sequence[Tuple[int, int, Text]]) -> Text:
+    """``apply_splices`` without the instrument count, for callers that count themselves."""
+    pieces = iter_splices(text, splices)
+    return b''.join(pieces) if not isinstance(text, str) else ''.join(pieces)
+
+
+def iter_splices(text: Text, splices: Sequence[Tuple[int, int, Text]]) -> Iterator[Text]:
+    """Yield the pieces of ``text`` with ``splices`` applied, in order.
+
+    The pieces are what ``apply_splices`` joins: slices of ``text`` (of a
+    ``memoryview`` for bytes) and the replacements.  Writing them out one by
+    one never builds the new content as a whole.
+    """
+    binary = not isinstance(text, str)
+    source = memoryview(text) if binary else text
+    pos = 0
+    for start, end, replacement in sorted(splices, key=lambda item: (item[0], item[1])):
+        if start < pos:
+            raise ValueError('overlapping splices at offset %d' % start)
+        if start > pos:
+            yield source[pos:start]
+        if binary and isinstance(replacement, str):
+            replacement = replacement.encode('utf-8')
+        if replacement:
+            yield replacement
+        pos = end
+    if pos < len(text) or not splices:
+        yield source[pos:]
+
+
+def apply_insertions(text: Text, insertions: Sequence[Tuple[int, str]]) -> Text:
+    """Apply ``(offset, text)`` insertions in one rebuild of ``text``."""
+    return apply_splices(text, [(offset, offset, inserted) for offset, inserted in insertions])
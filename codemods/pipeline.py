@@ -0,0 +1,175 @@
+"""
+Chain transforms as splice lists over one base text.
+
+Applying transforms one after another builds a full copy of the file per
+transform and then rescans the copy for the next one.  A ``Pipeline``
+instead keeps the splices of every transform so far against the text it
+started from: a transform with ``splices`` and ``extents`` is run on that
+same base text with the hits of the original scan, and its splices are
+added to the list when they cannot interact with the ones already there,
+that is when none of its hits' regions (``extents``) contains or touches an
+earlier splice and none of its splices touches one.  The base is only
+materialized (the splices applied and the file rescanned) when a transform
+does interact, has no splice form, or would find a new trigger match in the
+text an earlier one inserted.
+
+The result is either the splices against the original text, which the
+runner turns into output pieces with ``Source.iter_splice`` and writes
+without ever joining them, or the materialized text.  Either way ``spans``
+are the regions of the original text the transforms meant to change, for
+``codemods.verify`` to check that nothing else did.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Sequence, Tuple
+
+from . import instrument
+from .patch import rebuild
+from .registry import Hit
+from .source import changed_span
+from .transforms import TRANSFORMS, registry
+
+Splice = Tuple[int, int, str]
+Span = Tuple[int, int]
+
+# A trigger match is assumed to be shorter than this, when looking for one
+# that a pending splice would create
+TRIGGER_REACH = 256
+
+
+def _touches(splices: Sequence[Splice], start: int, end: int) -> bool:
+    return any(s <= end and e >= start for s, e, _ in splices)
+
+
+class _Layer:
+    """How one materialization moved offsets: its splices in new and old offsets."""
+    __slots__ = ('new_starts', 'regions')
+
+    def __init__(self, splices: Sequence[Splice]):
+        self.regions = []  # (new_start, new_end, old_start, old_end)
+        shift = 0
+        for start, end, replacement in sorted(splices, key=lambda item: (item[0], item[1])):
+            self.regions.append((start + shift, start + shift + len(replacement), start, end))
+            shift += len(replacement) - (end - start)
+        self.new_starts = [region[0] for region in self.regions]
+
+    def back(self, start: int, end: int) -> Span:
+        """The old offsets of the new ``[start, end)``, widened to whole regions."""
+        i = bisect_right(self.new_starts, start) - 1
+        if i >= 0:
+            new_start, new_end, old_start, old_end = self.regions[i]
+            start = old_start if start < new_end else start + old_end - new_end
+        i = bisect_left(self.new_starts, end) - 1
+        if i >= 0:
+            new_start, new_end, old_start, old_end = self.regions[i]
+            end = old_end if end <= new_end else end + old_end - new_end
+        return start, end
+
+
+class Pipeline:
+    """The transforms applied so far to ``original``, as pending splices."""
+
+    def __init__(self, text: str):
+        self.original = text
+        self.base = text          # the text the pending splices apply to
+        self.splices: List[Splice] = []
+        self.origins: List[str] = []  # the transform of each pending splice
+        self.applied: List[str] = []
+        self.spans: List[Span] = []  # what the transforms changed, in the original
+        self._layers: List[_Layer] = []
+
+    @property
+    def materialized(self) -> bool:
+        """Whether ``base`` is no longer the original text."""
+        return self.base is not self.original
+
+    def _materialize(self) -> None:
+        if self.splices:
+            self._layers.append(_Layer(self.splices))
+            self.base = rebuild(self.base, self.splices)  # counted when added
+            self.splices = []
+            self.origins = []
+
+    def _record(self, start: int, end: int) -> None:
+        """Note that ``[start, end)`` of the base text is being changed."""
+        for layer in reversed(self._layers):
+            start, end = layer.back(start, end)
+        self.spans.append((start, end))
+
+    def _creates_hits(self, name: str) -> bool:
+        """Whether a pending splice would give ``name``'s triggers a new match."""
+        matcher = registry((name,))
+        base = self.base
+        for start, end, replacement in self.splices:
+            before = base[max(0, start - TRIGGER_REACH):start]
+            after = base[end:end + TRIGGER_REACH]
+            old = len(matcher.scan(before + base[start:end] + after))
+            if len(matcher.scan(before + replacement + after)) != old:
+                return True
+        return False
+
+    def _independent(self, name: str, hits: Sequence[Hit], found: Sequence[Splice]) -> bool:
+        if not self.splices:
+            return True
+        extents = TRANSFORMS[name].extents(self.base, hits)
+        for hit in hits:
+            if _touches(self.splices, hit.start, extents.get(hit.start, len(self.base))):
+                return False
+        return not any(_touches(self.splices, s, e) for s, e, _ in found)
+
+    def add(self, name: str, hits: Optional[Sequence[Hit]] = None) -> bool:
+        """Run transform ``name``; return whether it changed anything.
+
+        ``hits`` are its hits in the original text; after the base has
+        moved on, the transform's triggers are rescanned.
+        """
+        transform = TRANSFORMS[name]
+        if self.splices and (transform.splices is None or transform.extents is None
+                             or self._creates_hits(name)):
+            self._materialize()
+        if hits is None or self.materialized:
+            hits = registry((name,)).scan(self.base)
+        if not hits:
+            return False
+        with instrument.transform(name, len(hits)) as counters:
+            changed = self._run(name, hits)
+            if changed and counters is not None:
+                counters['changed'] += 1
+        if changed:
+            self.applied.append(name)
+        return changed
+
+    def _run(self, name: str, hits: Sequence[Hit]) -> bool:
+        transform = TRANSFORMS[name]
+        if transform.splices is None:
+            new = transform.apply(self.base, hits)
+            if new == self.base:
+                return False
+            start, old_end, new_end = changed_span(self.base, new)
+            self._record(start, old_end)
+            self._layers.append(_Layer([(start, old_end, new[start:new_end])]))
+            self.base = new
+            return True
+        found = [s for s in transform.splices(self.base, hits)
+                 if s[2] != self.base[s[0]:s[1]]]
+        if not found:
+            return False
+        if not self._independent(name, hits, found):
+            self._materialize()
+            hits = registry((name,)).scan(self.base)
+            found = [s for s in transform.splices(self.base, hits)
+                     if s[2] != self.base[s[0]:s[1]]]
+            if not found:
+                return False
+        instrument.substitutions(len(found))
+        for start, end, _ in found:
+            self._record(start, end)
+        self.splices.extend(found)
+        self.origins.extend([name] * len(found))
+        return True
+
+    def text(self) -> str:
+        """The result as one string."""
+        if not self.splices:
+            return self.base
+        return rebuild(self.base, self.splices)
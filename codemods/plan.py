@@ -0,0 +1,376 @@
+"""
+Edit plans: what transforms would change, as data.
+
+Usage (from the repository root)::
+
+    python -m codemods.runner --plan frag.json    # plan the run, write nothing
+    python -m codemods.plan frag.json             # the files and edits of a plan
+    python -m codemods.plan frag.json --diff      # review it as a unified diff
+    python -m codemods.plan a.json b.json -o both.json   # merge plans
+    python -m codemods.plan both.json --apply     # write it
+
+A plan is a list of edits, each a file (relative to the repository root), a
+byte range of that file, the replacement text and the transform that asked
+for it, together with the hash of every file as it was planned against.  It
+is saved as JSON, so it can be reviewed, kept, merged and applied later.
+
+The diff is rendered from the edits themselves, never by comparing whole
+files: each edit is widened to the lines it touches, lines that come out the
+same at either end are trimmed, and hunks within two contexts of each other
+are joined.  Only the edited lines and their context are split and decoded,
+so the work follows the number of edits; line numbers come from counting
+newlines between one edit and the next.
+
+Merging refuses plans made against different contents of a file, and edits
+that overlap or touch an edit of the other plan (``PlanConflict``); an edit
+that is in both is kept once.  Applying refuses a plan whose files changed
+since (``PlanError``) and otherwise writes it the way the fix scripts do
+(see ``codemods.apply``): checked, in one batch, and journaled.
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from .apply import Change, repo_path, write_changes
+from .balance import BalanceError
+from .cache import content_hash
+from .journal import Journal
+from .output import atomic_write
+from .source import Source
+from .store import REPO_ROOT
+from .verify import VerifyError
+
+PLAN_FORMAT = 1
+CONTEXT = 3
+
+
+class PlanEdit(NamedTuple):
+    path: str          # relative to the repository root
+    start: int         # byte range of the file as planned
+    end: int
+    replacement: str
+    transform: str
+
+
+class PlanError(Exception):
+    """A plan that cannot be loaded or applied: unknown format, or files changed since."""
+
+
+class PlanConflict(PlanError):
+    """Plans that cannot be merged: their edits overlap, or their files differ."""
+
+
+def _relative(path) -> str:
+    path = repo_path(path)
+    try:
+        return path.relative_to(REPO_ROOT).as_posix()
+    except ValueError:
+        return str(path)
+
+
+def _line_end(data: bytes, pos: int) -> int:
+    """The end of the line holding ``pos``, past its newline."""
+    end = data.find(b'\n', pos)
+    return len(data) if end < 0 else end + 1
+
+
+def _lines_before(data: bytes, pos: int, count: int) -> List[bytes]:
+    start = pos
+    for _ in range(count):
+        if start == 0:
+            break
+        start = data.rfind(b'\n', 0, start - 1) + 1
+    return data[start:pos].splitlines(True)
+
+
+def _lines_after(data: bytes, pos: int, count: int) -> List[bytes]:
+    end = pos
+    for _ in range(count):
+        if end >= len(data):
+            break
+        end = _line_end(data, end)
+    return data[pos:end].splitlines(True)
+
+
+def _common(a: Sequence[bytes], b: Sequence[bytes]) -> int:
+    return next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), min(len(a), len(b)))
+
+
+class _Change(NamedTuple):
+    line: int              # number of the first old line
+    old: List[bytes]
+    new: List[bytes]
+    start: int             # byte range of the old lines
+    end: int
+    transforms: List[str]
+
+
+def _changes(data: bytes, edits: Sequence[PlanEdit]) -> Iterator[_Change]:
+    """The line-level changes of ``edits`` (sorted) to ``data``."""
+    blocks = []  # [line start, line end, edits]
+    for edit in edits:
+        start = data.rfind(b'\n', 0, edit.start) + 1
+        if edit.end > start and data[edit.end - 1:edit.end] == b'\n':
+            end = edit.end
+        else:
+            end = _line_end(data, edit.end)
+        if blocks and blocks[-1][1] >= start:
+            blocks[-1][1] = max(blocks[-1][1], end)
+            blocks[-1][2].append(edit)
+        else:
+            blocks.append([start, end, [edit]])
+    line, counted = 1, 0
+    for start, end, group in blocks:
+        pieces, cursor = [], start
+        for edit in group:
+            pieces.append(data[cursor:edit.start])
+            pieces.append(edit.replacement.encode('utf-8', 'surrogateescape'))
+            cursor = edit.end
+        pieces.append(data[cursor:end])
+        old = data[start:end].splitlines(True)
+        new = b''.join(pieces).splitlines(True)
+        head = _common(old, new)
+        tail = min(_common(old[::-1], new[::-1]), len(old) - head, len(new) - head)
+        if head == len(old) == len(new):
+            continue
+        line += data.count(b'\n', counted, start)
+        counted = start
+        first = start + sum(len(l) for l in old[:head])
+        last = end - sum(len(l) for l in old[len(old) - tail:])
+        transforms = list(dict.fromkeys(edit.transform for edit in group))
+        yield _Change(line + head, old[head:len(old) - tail], new[head:len(new) - tail],
+                      first, last, transforms)
+
+
+def _range(start: int, count: int) -> str:
+    if count == 0:
+        start -= 1  # an empty range names the line before it
+    return str(start) if count == 1 else '%d,%d' % (start, count)
+
+
+def _emit(prefix: str, lines: Sequence[bytes]) -> Iterator[str]:
+    for line in lines:
+        text = line.decode('utf-8', 'replace')
+        if text.endswith('\n'):
+            yield prefix + text
+        else:
+            yield prefix + text + '\n'
+            yield '\\ No newline at end of file\n'
+
+
+def _hunks(data: bytes, changes: List[_Change], context: int) -> Iterator[str]:
+    groups: List[List[_Change]] = []
+    for change in changes:
+        if groups:
+            previous = groups[-1][-1]
+            if change.line - (previous.line + len(previous.old)) <= 2 * context:
+                groups[-1].append(change)
+                continue
+        groups.append([change])
+    shift = 0
+    for group in groups:
+        before = _lines_before(data, group[0].start, context)
+        after = _lines_after(data, group[-1].end, context)
+        body: List[Tuple[str, List[bytes]]] = [(' ', before)]
+        old_count = new_count = len(before) + len(after)
+        for i, change in enumerate(group):
+            if i:
+                between = data[group[i - 1].end:change.start].splitlines(True)
+                body.append((' ', between))
+                old_count += len(between)
+                new_count += len(between)
+            body.append(('-', change.old))
+            body.append(('+', change.new))
+            old_count += len(change.old)
+            new_count += len(change.new)
+        body.append((' ', after))
+        old_start = group[0].line - len(before)
+        transforms = list(dict.fromkeys(t for change in group for t in change.transforms))
+        yield '@@ -%s +%s @@ %s\n' % (_range(old_start, old_count),
+                                      _range(old_start + shift, new_count),
+                                      ', '.join(transforms))
+        for prefix, lines in body:
+            yield from _emit(prefix, lines)
+        shift += new_count - old_count
+
+
+class Plan:
+    """Planned edits to files, with the hash of each file as planned."""
+
+    def __init__(self):
+        self.edits: List[PlanEdit] = []
+        self.hashes: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.edits)
+
+    def add(self, path, source: Source, splices: Sequence[Tuple[int, int, str]],
+            transform: Union[str, Sequence[str]]) -> None:
+        """Plan ``splices`` (``str`` offsets of ``source.text``) of the file at ``path``.
+
+        ``transform`` names the transform of all the splices, or of each one.
+        """
+        name = _relative(path)
+        digest = content_hash(source.data)
+        if self.hashes.setdefault(name, digest) != digest:
+            raise PlanConflict('%s: planned against different contents' % name)
+        names = [transform] * len(splices) if isinstance(transform, str) else transform
+        for (start, end, replacement), origin in zip(splices, names):
+            if source.text[start:end] != replacement:
+                self.edits.append(PlanEdit(name, source.byte_offset(start),
+                                           source.byte_offset(end), replacement, origin))
+
+    def files(self) -> Dict[str, List[PlanEdit]]:
+        """The edits of each file, in file order."""
+        by_file: Dict[str, List[PlanEdit]] = {}
+        for edit in self.edits:
+            by_file.setdefault(edit.path, []).append(edit)
+        for edits in by_file.values():
+            edits.sort(key=lambda e: (e.start, e.end))
+        return by_file
+
+    def merge(self, other: 'Plan') -> 'Plan':
+        """This plan and ``other`` as one; raises ``PlanConflict`` when they collide."""
+        merged = Plan()
+        merged.hashes = dict(self.hashes)
+        conflicts = []
+        for path, digest in other.hashes.items():
+            if merged.hashes.setdefault(path, digest) != digest:
+                conflicts.append('%s: the plans were made against different contents' % path)
+        mine, theirs = self.files(), other.files()
+        for path in sorted(set(mine) | set(theirs)):
+            own = mine.get(path, [])
+            seen = {e[1:4] for e in own}
+            tagged = [(e, 0) for e in own] + [(e, 1) for e in theirs.get(path, ())
+                                               if e[1:4] not in seen]
+            tagged.sort(key=lambda item: (item[0].start, item[0].end))
+            reach: List[Optional[PlanEdit]] = [None, None]  # the furthest-reaching edit per plan
+            for edit, side in tagged:
+                rival = reach[1 - side]
+                if rival is not None and rival.end >= edit.start:
+                    conflicts.append('%s: bytes %d-%d (%s) collide with bytes %d-%d (%s)' % (
+                        path, rival.start, rival.end, rival.transform,
+                        edit.start, edit.end, edit.transform))
+                if reach[side] is None or edit.end > reach[side].end:
+                    reach[side] = edit
+                merged.edits.append(edit)
+        if conflicts:
+            raise PlanConflict('cannot merge the plans:\n  %s' % '\n  '.join(conflicts))
+        return merged
+
+    def _read(self, path: str) -> Change:
+        """The file at ``path``, as long as it is the one the plan was made against."""
+        try:
+            change = Change(path)
+        except FileNotFoundError:
+            raise PlanError('%s: deleted since the plan was made' % path) from None
+        if content_hash(change.source.data) != self.hashes[path]:
+            raise PlanError('%s: changed since the plan was made' % path)
+        return change
+
+    def diff(self, context: int = CONTEXT) -> Iterator[str]:
+        """The plan as a unified diff, line by line; each hunk names its transforms."""
+        for path, edits in self.files().items():
+            data = self._read(path).source.data
+            changes = list(_changes(data, edits))
+            if changes:
+                yield '--- a/%s\n' % path
+                yield '+++ b/%s\n' % path
+                yield from _hunks(data, changes, context)
+
+    def changes(self) -> List[Change]:
+        """One ``Change`` per file, with the edits as splices of its text."""
+        changes = []
+        for path, edits in self.files().items():
+            change = self._read(path)
+            char = change.source.char_offset
+            change.splices = [(char(e.start), char(e.end), e.replacement) for e in edits]
+            changes.append(change)
+        return changes
+
+    def apply(self, journal: bool = True) -> Optional[Journal]:
+        """Write the plan (see ``codemods.apply.write_changes``); return the journal."""
+        return write_changes(self.changes(), journal)
+
+    def as_dict(self) -> dict:
+        return {'format': PLAN_FORMAT, 'files': {
+            path: {'hash': self.hashes[path],
+                   'edits': [[e.start, e.end, e.replacement, e.transform] for e in edits]}
+            for path, edits in self.files().items()}}
+
+    def save(self, path) -> None:
+        atomic_write(path, json.dumps(self.as_dict(), ensure_ascii=False, separators=(',', ':')))
+
+    @classmethod
+    def load(cls, path) -> 'Plan':
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except OSError as e:
+            raise PlanError('cannot read plan %s: %s' % (path, e.strerror)) from None
+        except ValueError as e:
+            raise PlanError('plan %s is corrupt: %s' % (path, e)) from None
+        if not isinstance(data, dict) or data.get('format') != PLAN_FORMAT:
+            raise PlanError('plan %s has an unknown format' % path)
+        plan = cls()
+        for name, entry in data['files'].items():
+            plan.hashes[name] = entry['hash']
+            plan.edits.extend(PlanEdit(name, start, end, replacement, transform)
+                              for start, end, replacement, transform in entry['edits'])
+        return plan
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m codemods.plan',
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument('plans', nargs='+', type=Path,
+                        help='plan files; several are merged into one')
+    parser.add_argument('--diff', action='store_true',
+                        help='print the plan as a unified diff')
+    parser.add_argument('-U', '--context', type=int, default=CONTEXT, metavar='LINES',
+                        help='lines of context in the diff (default: %(default)s)')
+    parser.add_argument('-o', '--output', type=Path, metavar='PATH',
+                        help='save the (merged) plan to PATH')
+    parser.add_argument('--apply', action='store_true',
+                        help='write the plan to the files')
+    parser.add_argument('--no-journal', action='store_true',
+                        help='do not record the writes in .codemod-journal/ for rollback')
+    args = parser.parse_args(argv)
+
+    try:
+        plan = Plan.load(args.plans[0])
+        for other in args.plans[1:]:
+            plan = plan.merge(Plan.load(other))
+        if args.output:
+            plan.save(args.output)
+        if args.diff:
+            try:
+                sys.stdout.writelines(plan.diff(args.context))
+                sys.stdout.flush()
+            except BrokenPipeError:  # "| head" stopped reading: nothing left to show
+                devnull = os.open(os.devnull, os.O_WRONLY)
+                os.dup2(devnull, sys.stdout.fileno())
+                return 1
+        elif not args.apply:
+            for path, edits in plan.files().items():
+                counts: Dict[str, int] = {}
+                for edit in edits:
+                    counts[edit.transform] = counts.get(edit.transform, 0) + 1
+                print('%s (%s)' % (path, ', '.join('%d %s' % (n, t) for t, n in counts.items())))
+        if args.apply:
+            journal = plan.apply(journal=not args.no_journal)
+            print('%d edits written to %d files' % (len(plan), len(plan.files())))
+            if journal:
+                print('undo with: python -m codemods.journal --rollback %s' % journal.run)
+    except (PlanError, BalanceError, VerifyError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
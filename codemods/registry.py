@@ -0,0 +1,76 @@
+"""
+Combined trigger matcher for the codemod transforms.
+
+Each transform declares its triggers as ``(name, regex)`` pairs.  A
+``Registry`` folds every trigger of every selected transform into one
+alternation, compiled once, with an empty named group closing each
+alternative to tell which one matched, so finding the work for N transforms
+costs a single scan of the file.  The resulting ``Hit`` list says
+which trigger of which transform fired where; transforms receive their own
+hits and start from those offsets instead of searching the file again.
+
+Trigger patterns must not define capturing groups of their own; use
+``(?:...)``.  When two triggers could match at the same offset, the one
+registered first wins.
+"""
+
+import re
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+
+class Hit(NamedTuple):
+    transform: str
+    trigger: str
+    start: int
+    end: int
+
+
+class Registry:
+    def __init__(self, triggers: Mapping[str, Sequence[Tuple[str, str]]]):
+        """``triggers`` maps a transform name to its ``(name, regex)`` pairs."""
+        self._groups: Dict[str, Tuple[str, str]] = {}
+        # (transform, trigger) -> pattern, for timing the triggers one by one
+        self.triggers: Dict[Tuple[str, str], str] = {}
+        alternatives = []
+        for transform, pairs in triggers.items():
+            for trigger, pattern in pairs:
+                group = '_%d' % len(self._groups)
+                self._groups[group] = (transform, trigger)
+                self.triggers[(transform, trigger)] = pattern
+                # The empty marker group goes last, so that every alternative
+                # still starts with its literal and re can skip ahead to the
+                # next possible first character instead of trying each offset
+                alternatives.append('(?:%s)(?P<%s>)' % (pattern, group))
+        self.transforms = tuple(triggers)
+        self.pattern = re.compile('|'.join(alternatives)) if alternatives else None
+
+    def scan(self, text: str, pos: int = 0, endpos: Optional[int] = None) -> List[Hit]:
+        """Return every trigger hit in ``text[pos:endpos]``, in order."""
+        if self.pattern is None:
+            return []
+        if endpos is None:
+            endpos = len(text)
+        groups = self._groups
+        hits = []
+        for m in self.pattern.finditer(text, pos, endpos):
+            transform, trigger = groups[m.lastgroup]
+            hits.append(Hit(transform, trigger, m.start(), m.end()))
+        return hits
+
+    def first(self, text: str) -> Optional[Hit]:
+        """The first hit in ``text``, or ``None``: a cheap "anything to do?"."""
+        if self.pattern is None:
+            return None
+        m = self.pattern.search(text)
+        if m is None:
+            return None
+        transform, trigger = self._groups[m.lastgroup]
+        return Hit(transform, trigger, m.start(), m.end())
+
+
+def by_transform(hits: Iterable[Hit]) -> Dict[str, List[Hit]]:
+    """Group ``hits`` by transform name, keeping their order."""
+    grouped: Dict[str, List[Hit]] = {}
+    for hit in hits:
+        grouped.setdefault(hit.transform, []).append(hit)
+    return grouped
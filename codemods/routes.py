@@ -0,0 +1,220 @@
+"""
+Route table of the Express server.
+
+Usage (from the repository root)::
+
+    python -m codemods.routes                           # every route in server/routes.ts
+    python -m codemods.routes -m post -p /admin/api     # POST routes under a path prefix
+    python -m codemods.routes --calls cieloService      # routes calling a service
+    python -m codemods.routes --json - server/routes/chat.ts
+
+The scanner tokenizes the file as plain TypeScript (``jsx=False``) and one
+pass over the tokens finds every ``app.<method>(path, ...middleware,
+handler)`` call (``router.<method>`` too) and records its method, path,
+middleware chain, line span and the storage and service calls made inside
+it: member calls on ``storage``, ``supabaseStorage`` or any receiver whose
+name ends in ``Service`` (``cieloService.createPixPayment``).  Tables are
+kept in ``.codemod-routes.json`` keyed by size, mtime and content hash, like
+the content cache, so repeated queries do not read the file again.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from .cache import content_hash
+from .scanner import NAME, PUNCT, tokenize
+from .source import read_source
+from .store import REPO_ROOT, JsonStore, display
+
+DEFAULT_FILE = REPO_ROOT / 'server' / 'routes.ts'
+TABLE_FILE = REPO_ROOT / '.codemod-routes.json'
+TABLE_FORMAT = 1  # bump when extract_routes finds something new, to drop old tables
+
+ROUTERS = frozenset(('app', 'router'))
+METHODS = frozenset(('get', 'post', 'put', 'delete', 'patch', 'all'))
+# Receivers whose member calls are listed for each route
+SERVICE = re.compile(r'^(?:storage|supabaseStorage|supabase|[\w$]*[Ss]ervice)$')
+
+_OPENERS = frozenset(('(', '[', '{'))
+_CLOSERS = frozenset((')', ']', '}'))
+
+
+class Route(NamedTuple):
+    method: str
+    path: str
+    middleware: List[str]
+    line: int       # 1-based line of the call
+    end_line: int   # line of its closing parenthesis
+    start: int      # offsets of the call, from the router name to ")"
+    end: int
+    calls: List[str]  # "receiver.member", in order of first use
+
+
+class _Call:
+    """A route call whose closing parenthesis has not been reached yet."""
+    __slots__ = ('method', 'start', 'line', 'level', 'args', 'arg_start', 'calls')
+
+    def __init__(self, method: str, start: int, line: int, level: int, arg_start: int):
+        self.method = method
+        self.start = start
+        self.line = line
+        self.level = level  # nesting level inside the call's "("
+        self.args: List[tuple] = []
+        self.arg_start = arg_start
+        self.calls: Dict[str, None] = {}
+
+
+def _literal(text: str) -> Optional[str]:
+    if len(text) >= 2 and text[0] in '\'"`' and text[-1] == text[0]:
+        return text[1:-1]
+    return None
+
+
+def extract_routes(text: str) -> List[Route]:
+    """Every route registration in the TypeScript ``text``, in source order."""
+    routes = []
+    open_calls: List[_Call] = []
+    level = 0
+    line, line_pos = 1, 0
+    # the last three significant tokens, as (kind, value, start)
+    window = [(None, None, 0)] * 3
+    for token in tokenize(text, jsx=False):
+        kind, start, end = token.kind, token.start, token.end
+        value = text[start:end] if kind in (NAME, PUNCT) else None
+        if kind == PUNCT and value in _OPENERS:
+            (k1, router, router_start), (k2, dot, _), (k3, method, _) = window
+            if (value == '(' and k1 == NAME and router in ROUTERS and dot == '.'
+                    and k3 == NAME and method in METHODS):
+                line += text.count('\n', line_pos, router_start)
+                line_pos = router_start
+                open_calls.append(_Call(method, router_start, line, level + 1, end))
+            level += 1
+        elif kind == PUNCT and value in _CLOSERS:
+            level -= 1
+            call = open_calls[-1] if open_calls else None
+            if call is not None and level == call.level - 1:
+                open_calls.pop()
+                call.args.append((call.arg_start, start))
+                route = _finish(text, call, end)
+                if route is not None:
+                    line += text.count('\n', line_pos, start)
+                    line_pos = start
+                    routes.append(route._replace(end_line=line))
+        elif kind == PUNCT and value == ',' and open_calls and level == open_calls[-1].level:
+            call = open_calls[-1]
+            call.args.append((call.arg_start, start))
+            call.arg_start = end
+        elif kind == NAME and open_calls:
+            k1, receiver, _ = window[1]
+            if window[2][1] in ('.', '?.') and k1 == NAME and SERVICE.match(receiver):
+                for call in open_calls:
+                    call.calls.setdefault('%s.%s' % (receiver, value))
+        window = [window[1], window[2], (kind, value, start)]
+    return routes
+
+
+def _finish(text: str, call: _Call, end: int) -> Optional[Route]:
+    args = [text[s:e].strip() for s, e in call.args]
+    args = [a for a in args if a]  # a trailing comma leaves an empty one
+    if len(args) < 2:
+        return None  # app.get("setting") reads a setting, it is not a route
+    path = _literal(args[0])
+    if path is None:
+        return None
+    middleware = [' '.join(a.split()) for a in args[1:-1]]
+    return Route(call.method.upper(), path, middleware, call.line, call.line,
+                 call.start, end, list(call.calls))
+
+
+class RouteTable(JsonStore):
+    """Route tables per file, kept on disk between runs."""
+    FORMAT = TABLE_FORMAT
+
+    def __init__(self, path: Path = TABLE_FILE):
+        super().__init__(path)
+
+    def routes(self, path: str) -> List[Route]:
+        """The routes of ``path``, from the table when the file is unchanged."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        entry = self.files.get(path)
+        if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+            return [Route(*r) for r in entry['routes']]
+        source = read_source(path)
+        digest = content_hash(source.data)
+        if entry and entry['hash'] == digest:
+            routes = [Route(*r) for r in entry['routes']]
+        else:
+            routes = extract_routes(source.text)
+        self.files[path] = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size,
+                            'hash': digest, 'routes': [list(r) for r in routes]}
+        self.dirty = True
+        return routes
+
+    def save(self) -> None:
+        self.evict_missing()
+        super().save()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m codemods.routes',
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument('files', nargs='*', type=Path,
+                        help='route files (default: %s)' % display(str(DEFAULT_FILE)))
+    parser.add_argument('-p', '--prefix', default='',
+                        help='only routes whose path starts with PREFIX')
+    parser.add_argument('-m', '--method', action='append', type=str.upper,
+                        help='only routes with this HTTP method; repeatable')
+    parser.add_argument('--calls', metavar='NAME',
+                        help="only routes calling NAME (a receiver such as 'storage' "
+                             "or a call such as 'storage.getAllClients')")
+    parser.add_argument('--json', metavar='PATH',
+                        help="write the matching routes as JSON ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    table = RouteTable()
+    found = []
+    for path in args.files or [DEFAULT_FILE]:
+        for route in table.routes(str(path)):
+            if not route.path.startswith(args.prefix):
+                continue
+            if args.method and route.method not in args.method:
+                continue
+            if args.calls and not any(c == args.calls or c.startswith(args.calls + '.')
+                                      for c in route.calls):
+                continue
+            found.append((display(os.path.abspath(path)), route))
+    table.save()
+
+    try:
+        if args.json:
+            data = [dict(route._asdict(), file=path) for path, route in found]
+            if args.json == '-':
+                json.dump(data, sys.stdout, indent=2)
+                print()
+            else:
+                with open(args.json, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2)
+            return 0
+        for path, route in found:
+            middleware = ' [%s]' % ', '.join(route.middleware) if route.middleware else ''
+            print('%s:%d-%d: %-6s %s%s' % (path, route.line, route.end_line, route.method,
+                                           route.path, middleware))
+            for call in route.calls:
+                print('    %s' % call)
+        print('%d routes' % len(found))
+        sys.stdout.flush()
+    except BrokenPipeError:  # "| head" stopped reading: nothing left to show
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,417 @@
+"""
+Apply codemod transforms across every TSX file under ``client/src``.
+
+Usage (from the repository root)::
+
+    python -m codemods.runner                     # default transforms, all pages
+    python -m codemods.runner -t fragments --check
+    python -m codemods.runner -t collapsible client/src/pages/telemedicine.tsx
+    python -m codemods.runner client/src/pages/checkout.tsx
+    python -m codemods.runner --hits              # which trigger fired where
+    python -m codemods.runner --stats             # per-transform timings and counts
+    python -m codemods.runner --profile run.prof  # cProfile of scanning + transforms
+    python -m codemods.runner --no-index          # scan every file, not just indexed ones
+    python -m codemods.runner --timeout 5 --memory 512  # tighter per-file budgets
+    python -m codemods.runner --diff              # what would change, as a unified diff
+    python -m codemods.runner --plan run.json     # the same as an edit plan, to apply later
+    python -m codemods.runner --affected-by client/src/components/ui/copy-button.tsx
+    python -m codemods.journal --rollback         # undo the last run
+
+Files are first scanned once in this process with the combined trigger
+matcher of the selected transforms; only the files that can change are handed to a process pool sized
+to the CPU count.  When nothing matches, no pool is started at all.  Each
+file gets a time and memory budget in its worker (``--timeout``,
+``--memory``); a file over budget has its worker killed, is reported as an
+error and left alone, and the rest of the batch carries on.  Files
+whose content a transform already left unchanged are remembered in
+``.codemod-cache.json`` and skipped on later runs without being read.
+When every selected transform declares its symbols, files that contain none
+of them are skipped by a lookup in the symbol index (``codemods.symbols``).
+A transform that depends on what a file imports (``Transform.imports``) is
+remembered as clean for the file's content together with the content of
+those imports, followed through the import graph (``codemods.imports``): a
+change to a shared component re-runs it on the files that import the
+component and nowhere else.  ``--affected-by`` limits a run to the files
+that import the given ones, directly or not.
+
+Files are read as bytes and changes are spliced into those bytes (see
+``codemods.source``), so line endings, a BOM and everything outside the
+edited spans are written back exactly as they were read.  The transforms of
+a file are chained as splice lists over its original text where they do not
+interact (see ``codemods.pipeline``), and the output is written in pieces.
+Changed files are written together at the end of the run, each atomically
+(see ``codemods.output``), and only when their tags and brackets still pair up
+at least as well as before (see ``codemods.balance``) and their tokens
+outside the transforms' edits are unchanged (see ``codemods.verify``);
+otherwise the file is reported as an error and left alone.  Every run that
+writes records its edits in an undo journal (see ``codemods.journal``).
+With ``--plan`` or ``--diff`` nothing is written: the edits are collected
+in an edit plan, saved for review or printed as a diff (see
+``codemods.plan``).
+"""
+
+import argparse
+import json
+import os
+import sys
+from contextlib import nullcontext
+from pathlib import Path
+from time import perf_counter
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from . import instrument
+from .balance import check_balance
+from .cache import ContentCache, content_hash
+from .imports import ImportGraph, load_graph
+from .journal import Journal
+from .output import WriteBatch
+from .patch import iter_splices
+from .pipeline import Pipeline
+from .plan import Plan
+from .registry import Hit, by_transform
+from .source import Source, changed_span, read_source
+from .store import discover, display
+from .symbols import SymbolIndex
+from .transforms import TRANSFORMS, default_names, registry
+from .verify import check_edits
+
+DEFAULT_GLOB = 'client/src/**/*.tsx'
+
+# Below this many candidate files the pool start-up costs more than it saves,
+# unless files have a time or memory budget, which only a worker process can
+# enforce
+MIN_PARALLEL_FILES = 4
+# Per-file budgets in the worker processes: seconds, and MiB of address space
+TIME_BUDGET = 20.0
+MEMORY_BUDGET = 2048
+# Below this many files named on the command line, loading the symbol index
+# costs more than scanning them
+INDEX_MIN_FILES = 32
+
+
+class FileResult(NamedTuple):
+    path: str
+    status: str                    # 'changed', 'unchanged', 'skipped', 'cached' or 'error'
+    transforms: Sequence[str] = ()  # transforms that changed the file
+    content: Optional[bytes] = None  # new content, when changed...
+    splices: Optional[list] = None   # ...or its splices against the original text
+    origins: Optional[list] = None   # the transform of each splice
+    error: Optional[str] = None
+    stats: Optional[dict] = None   # a worker's instrument.Recorder, when recording
+
+
+def _transform_file(path: str, source: Source, names: Sequence[str], hits: Sequence[Hit],
+                    record: bool = False) -> FileResult:
+    if record and instrument.active() is None:  # in a worker: record here, report back
+        with instrument.recording() as recorder:
+            result = _transform_file(path, source, names, hits)
+        return result._replace(stats=recorder.as_dict())
+    grouped = by_transform(hits)
+    pipeline = Pipeline(source.text)
+    try:
+        for name in names:
+            pipeline.add(name, grouped.get(name, ()))
+        if pipeline.applied:
+            # never hand back output that pairs worse than the input, or
+            # that changed code outside what the transforms meant to change
+            new = pipeline.text()
+            jsx = not path.endswith('.ts')
+            check_balance(source.text, new, jsx=jsx)
+            check_edits(source.text, new, pipeline.spans, jsx=jsx)
+    except Exception as e:  # a broken file must not take the batch down
+        message = '%s: %s' % (type(e).__name__, e) if str(e) else type(e).__name__
+        return FileResult(path, 'error', error=message)
+    if not pipeline.applied:
+        return FileResult(path, 'unchanged')
+    if pipeline.materialized:
+        return FileResult(path, 'changed', pipeline.applied, source.with_text(new))
+    # only the splices travel back; the output is pieced together when written
+    return FileResult(path, 'changed', pipeline.applied, splices=pipeline.splices,
+                      origins=pipeline.origins)
+
+
+def run(paths: Sequence[Path], names: Sequence[str], write: bool = True,
+        jobs: Optional[int] = None, cache: Optional[ContentCache] = None,
+        recorder: Optional[instrument.Recorder] = None,
+        index: Optional[SymbolIndex] = None, timeout: Optional[float] = TIME_BUDGET,
+        memory: Optional[int] = MEMORY_BUDGET,
+        journal: Optional[Journal] = None, plan: Optional[Plan] = None,
+        graph: Optional[ImportGraph] = None) -> List[FileResult]:
+    """Apply the transforms ``names`` to ``paths`` and return one result each.
+
+    With a ``recorder``, scanning and transforming are instrumented (see
+    ``codemods.instrument``), in the worker processes too.  With an
+    ``index``, it is refreshed for ``paths`` and files holding none of the
+    transforms' symbols are skipped without being scanned.  The cache keys
+    of transforms with ``imports`` come from the import ``graph``, which is
+    loaded when not given.
+
+    Files are transformed in worker processes (see ``codemods.workers``)
+    whenever there is a ``timeout`` or ``memory`` budget, with ``jobs`` 1
+    too, or more than one job and enough files to be worth it; a file that
+    takes longer than ``timeout`` seconds or more than ``memory`` MiB is
+    reported as an error and left alone.  Without either budget, a single
+    job runs in this process.
+    The edits of the files written are recorded in ``journal``, which is
+    saved at the end of the run (see ``codemods.journal``).  With a ``plan``,
+    the edits of changed files are added to it instead of being written.
+    """
+    keys = {n: TRANSFORMS[n].cache_key for n in names}
+    followers = [n for n in names if TRANSFORMS[n].imports]
+    if followers and cache is not None and graph is None:
+        graph = load_graph()
+
+    def file_keys(path: str) -> dict:
+        """The cache keys of the transforms for ``path``, with its imports' digest."""
+        if not followers or cache is None:
+            return keys
+        return dict(keys, **{n: '%s+%s' % (keys[n], graph.digest(path, TRANSFORMS[n].imports))
+                             for n in followers})
+
+    path_keys = {}
+    paths = [os.path.abspath(p) for p in paths]
+    results = {}
+    work = []
+    candidates = None
+    if index is not None and all(TRANSFORMS[n].symbols for n in names):
+        index.refresh(paths)
+        index.save()
+        candidates = set(index.files_with(s for n in names for s in TRANSFORMS[n].symbols))
+    for path in paths:
+        if candidates is not None and path not in candidates:
+            results[path] = FileResult(path, 'skipped')
+            continue
+        if cache is not None:
+            st = os.stat(path)
+            fkeys = path_keys[path] = file_keys(path)
+            clean = cache.clean_by_stat(path, st)
+            if clean is not None and clean.issuperset(fkeys.values()):
+                results[path] = FileResult(path, 'cached')
+                continue
+        source = read_source(path)
+        text = source.text
+        pending = names
+        if cache is not None:
+            clean = cache.clean_by_hash(path, st, content_hash(source.data))
+            pending = [n for n in names if fkeys[n] not in clean]
+        hits = []
+        if pending and recorder is None:
+            hits = registry(tuple(pending)).scan(text)
+        elif pending:
+            matcher = registry(tuple(pending))
+            with recorder.profiling():
+                start = perf_counter()
+                hits = matcher.scan(text)
+                recorder.scanned(len(source.data), perf_counter() - start)
+            recorder.time_patterns(matcher.triggers, text)
+        fired = {hit.transform for hit in hits}
+        wanted = [n for n in pending if n in fired]
+        if cache is not None:
+            cache.mark_clean(path, (fkeys[n] for n in pending if n not in fired))
+        if wanted:
+            work.append((path, source, wanted, hits))
+        else:
+            results[path] = FileResult(path, 'skipped' if pending else 'cached')
+
+    jobs = max(1, jobs or os.cpu_count() or 1)
+    if work and (timeout or memory or jobs > 1 and len(work) >= MIN_PARALLEL_FILES):
+        from .workers import TaskFailed, WorkerPool  # multiprocessing: only when a pool runs
+        pool = WorkerPool(_transform_file, min(jobs, len(work)), timeout,
+                          memory << 20 if memory else None)
+        record = recorder is not None
+        for number, r in pool.map(w + (record,) for w in work):
+            if isinstance(r, TaskFailed):
+                r = FileResult(work[number][0], 'error', error=str(r))
+            elif r.stats is not None:
+                recorder.merge(r.stats)
+                r = r._replace(stats=None)
+            results[r.path] = r
+    else:
+        with instrument.recording(recorder) if recorder is not None else nullcontext():
+            results.update((w[0], _transform_file(*w)) for w in work)
+
+    batch = WriteBatch()
+    for path, source, wanted, _ in work:
+        result = results[path]
+        if result.status == 'unchanged' and cache is not None:
+            cache.mark_clean(path, (path_keys[path][n] for n in wanted))
+        elif result.status == 'changed' and plan is not None:
+            if result.splices is not None:
+                plan.add(path, source, result.splices, result.origins)
+            else:
+                new = Source(result.content).text
+                start, old_end, new_end = changed_span(source.text, new)
+                plan.add(path, source, [(start, old_end, new[start:new_end])],
+                         ', '.join(result.transforms))
+        elif result.status == 'changed' and write:
+            if result.splices is not None:  # written piece by piece from the original
+                splices = source.byte_splices(result.splices)
+                batch.add(path, iter_splices(source.data, splices))
+                if journal is not None:
+                    journal.add(path, source.data, splices)
+            else:
+                batch.add(path, result.content)
+                if journal is not None:
+                    journal.add_content(path, source.data, result.content)
+            if cache is not None:
+                cache.forget(path)
+    if batch:
+        try:
+            written = batch.flush()  # every changed file in one rename window
+        except OSError as e:
+            written = getattr(e, 'written', [])  # a FlushError: renamed before the failure
+            for path in batch.pending:
+                results[path] = results[path]._replace(
+                    status='error', error='%s: %s' % (type(e).__name__, e))
+        if journal is not None and written:
+            journal.save(written)
+    if cache is not None:
+        cache.save()
+    if recorder is not None:
+        for result in results.values():
+            recorder.file_status(result.status)
+    return [results[p] for p in paths]
+
+
+def list_hits(paths: Sequence[Path], names: Sequence[str]) -> List[Tuple[str, int, int, Hit]]:
+    """Return ``(path, line, column, hit)`` for every trigger hit in ``paths``."""
+    matcher = registry(tuple(names))
+    found = []
+    for path in paths:
+        text = read_source(path).text
+        line, line_start, pos = 1, 0, 0
+        for hit in matcher.scan(text):
+            line += text.count('\n', pos, hit.start)
+            pos = hit.start
+            line_start = text.rfind('\n', 0, hit.start) + 1
+            found.append((str(path), line, hit.start - line_start + 1, hit))
+    return found
+
+
+def _report(recorder: instrument.Recorder, args: argparse.Namespace) -> None:
+    if args.stats:
+        print()
+        print(recorder.table())
+    if args.stats_json == '-':
+        json.dump(recorder.as_dict(), sys.stdout, indent=2)
+        print()
+    elif args.stats_json:
+        with open(args.stats_json, 'w', encoding='utf-8') as f:
+            json.dump(recorder.as_dict(), f, indent=2)
+    if args.profile:
+        import pstats
+        recorder.profiler.dump_stats(args.profile)
+        print('\nprofile written to %s; top functions by cumulative time:' % args.profile,
+              file=sys.stderr)
+        pstats.Stats(recorder.profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(12)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m codemods.runner',
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument('paths', nargs='*', type=Path,
+                        help='files to process (default: %s)' % DEFAULT_GLOB)
+    parser.add_argument('-t', '--transform', action='append', choices=sorted(TRANSFORMS),
+                        help='transform to apply; repeatable (default: all default transforms)')
+    parser.add_argument('--check', action='store_true',
+                        help='report what would change without writing; exit 1 if anything would')
+    parser.add_argument('--diff', action='store_true',
+                        help='print what would change as a unified diff, without writing')
+    parser.add_argument('--plan', metavar='PATH',
+                        help='save what would change as an edit plan, without writing '
+                             '(apply it with python -m codemods.plan PATH --apply)')
+    parser.add_argument('--affected-by', action='append', type=Path, metavar='FILE',
+                        help='only process the files that import FILE, directly or through '
+                             'other files; repeatable')
+    parser.add_argument('--hits', action='store_true',
+                        help='list which transform trigger fired where, then exit')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='worker processes (default: CPU count)')
+    parser.add_argument('--timeout', type=float, metavar='SECONDS',
+                        help='skip a file whose transforms run longer than this; 0 for no '
+                             'limit (default: %s)' % TIME_BUDGET)
+    parser.add_argument('--memory', type=int, metavar='MIB',
+                        help='skip a file whose transforms need more memory than this; 0 for '
+                             'no limit (default: %s)' % MEMORY_BUDGET)
+    parser.add_argument('--no-cache', action='store_true',
+                        help='ignore and do not update .codemod-cache.json')
+    parser.add_argument('--no-index', action='store_true',
+                        help='scan every file instead of looking candidates up in '
+                             '.codemod-symbols.json')
+    parser.add_argument('--no-journal', action='store_true',
+                        help='do not record the run in .codemod-journal/ for rollback')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='also list unchanged and skipped files')
+    parser.add_argument('--stats', action='store_true',
+                        help='print per-transform and per-pattern timings and counts')
+    parser.add_argument('--stats-json', metavar='PATH',
+                        help="write the same statistics as JSON ('-' for stdout)")
+    parser.add_argument('--profile', metavar='PATH',
+                        help='run cProfile over scanning and transforms in this process, '
+                             'without --timeout and --memory, and write its statistics to PATH')
+    args = parser.parse_args(argv)
+    if args.profile and (args.timeout or args.memory):
+        parser.error('--profile runs in this process, where --timeout and --memory '
+                     'cannot be enforced')
+    if not args.profile:
+        args.timeout = TIME_BUDGET if args.timeout is None else args.timeout
+        args.memory = MEMORY_BUDGET if args.memory is None else args.memory
+
+    names = args.transform or default_names()
+    paths = args.paths or discover((DEFAULT_GLOB,))
+    graph = None
+    if args.affected_by:
+        graph = load_graph()
+        changed = [os.path.abspath(p) for p in args.affected_by]
+        affected = graph.dependents(changed).union(changed)
+        paths = [p for p in paths if os.path.abspath(p) in affected]
+    if args.hits:
+        for path, line, column, hit in list_hits(paths, names):
+            print('%s:%d:%d: %s/%s' % (display(path), line, column, hit.transform, hit.trigger))
+        return 0
+    cache = None if args.no_cache else ContentCache()
+    recorder = None
+    if args.stats or args.stats_json or args.profile:
+        recorder = instrument.Recorder(profile=bool(args.profile))
+    small = args.paths and len(paths) < INDEX_MIN_FILES
+    index = None if args.no_index or small else SymbolIndex()
+    plan = Plan() if args.diff or args.plan else None
+    write = not (args.check or plan is not None)
+    journal = Journal() if write and not args.no_journal else None
+    jobs = 1 if args.profile else args.jobs
+    results = run(paths, names, write=write, jobs=jobs, cache=cache, recorder=recorder,
+                  index=index, timeout=args.timeout, memory=args.memory, journal=journal,
+                  plan=plan, graph=graph)
+    if args.plan:
+        plan.save(args.plan)
+    if args.diff:
+        sys.stdout.writelines(plan.diff())
+
+    counts = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+        if result.status == 'changed':
+            print('changed    %s (%s)' % (display(result.path), ', '.join(result.transforms)))
+        elif result.status == 'error':
+            print('error      %s: %s' % (display(result.path), result.error), file=sys.stderr)
+        elif args.verbose:
+            print('%-10s %s' % (result.status, display(result.path)))
+    print('%d files: %s' % (len(results), ', '.join(
+        '%d %s' % (counts[s], s) for s in ('changed', 'unchanged', 'skipped', 'cached', 'error') if s in counts)))
+    if journal:
+        print('undo with: python -m codemods.journal --rollback %s' % journal.run)
+    if args.plan:
+        print('plan of %d edits saved to %s' % (len(plan), args.plan))
+
+    if recorder is not None:
+        _report(recorder, args)
+
+    if counts.get('error'):
+        return 2
+    if args.check and counts.get('changed'):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
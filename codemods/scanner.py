@@ -0,0 +1,353 @@
+"""
+Single-pass JSX/TSX tokenizer.
+
+The scanner walks the source once, switching between JavaScript, JSX tag and
+JSX children modes on a small stack, and yields ``Token`` tuples.  Runs of
+uninteresting text (whitespace, JSX text, string bodies) are consumed with
+compiled patterns that cannot backtrack, so the cost is linear in the size of
+the scanned range.
+
+The scanner is tolerant: malformed input never raises, it only produces a
+token stream whose depths stop making sense.  Callers that care about balance
+check it themselves.
+
+``scan`` also fills in a ``Layout`` on the way: the indentation and nesting
+depth of every line, so that code inserted by a transform takes its
+indentation from the lines around it instead of a hard-coded string.
+"""
+
+import re
+from bisect import bisect_right
+from collections import Counter
+from typing import Iterator, List, NamedTuple, Optional, Tuple, Union
+
+# Token kinds
+COMMENT = 'comment'
+STRING = 'string'
+TEMPLATE = 'template'
+REGEX = 'regex'
+NAME = 'name'
+NUMBER = 'number'
+PUNCT = 'punct'
+ATTR = 'attr'
+TEXT = 'text'
+TAG_OPEN = 'tag_open'              # "<div", "<motion.div", "<>"
+TAG_END = 'tag_end'                # ">" that ends an opening tag
+TAG_SELF_CLOSE = 'tag_self_close'  # "/>"
+TAG_CLOSE = 'tag_close'            # "</div>", "</>"
+
+# Scanner modes kept on the stack
+_JS = 0        # plain JavaScript, or a "{" block inside it
+_EXPR = 1      # JavaScript inside a JSX "{...}" container
+_TMPL = 2      # JavaScript inside a template literal "${...}"
+_TAG = 3       # inside "<name ...", before ">" or "/>"
+_CHILDREN = 4  # between an opening and a closing JSX tag
+
+# Keywords after which an expression (and so JSX or a regex literal) starts
+_EXPR_KEYWORDS = frozenset((
+    'return', 'yield', 'await', 'case', 'default', 'else', 'do',
+    'typeof', 'void', 'delete', 'in', 'of', 'new', 'throw',
+))
+# Punctuation after which an expression can *not* start
+_EXPR_END_PUNCT = frozenset((')', ']', '}', '>'))
+
+_JS_TOKEN = re.compile(r'''
+    (?P<ws>\s+)
+  | (?P<comment>//[^\n]*|/\*[\s\S]*?(?:\*/|\Z))
+  | (?P<string>'(?:[^'\\\n]|\\.)*'?|"(?:[^"\\\n]|\\.)*"?)
+  | (?P<template>`)
+  | (?P<name>(?:[^\W\d]|\$)[\w$]*)
+  | (?P<number>\.?\d[\w.]*)
+  | (?P<punct>=>|===|!==|==|!=|&&|\|\||\?\?|\?\.(?!\d)|\.\.\.|[\s\S])
+''', re.X)
+
+_TAG_TOKEN = re.compile(r'''
+    (?P<ws>\s+)
+  | (?P<comment>//[^\n]*|/\*[\s\S]*?(?:\*/|\Z))
+  | (?P<end>/?>)
+  | (?P<string>"[^"]*"?|'[^']*'?)
+  | (?P<attr>[^\s=/>{}'"<]+)
+  | (?P<punct>[\s\S])
+''', re.X)
+
+_TEMPLATE_HEAD = re.compile(r'`(?:[^`\\$]|\\[\s\S]|\$(?!\{))*(?:`|\$\{|\Z)')
+_TEMPLATE_TAIL = re.compile(r'\}(?:[^`\\$]|\\[\s\S]|\$(?!\{))*(?:`|\$\{|\Z)')
+_REGEX_LITERAL = re.compile(
+    r'/(?![*/])(?:[^/\\\n\[]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*'
+)
+_OPEN_TAG = re.compile(r'<(?:>|\s*(?:[^\W\d]|\$)[\w$.:-]*)')
+# "<T extends ...>" / "<T,>" in a .tsx file opens type parameters, not JSX
+_TYPE_PARAMS = re.compile(r'<\s*[\w$]+\s*(?:extends\b|,)')
+_CLOSE_TAG = re.compile(r'</\s*(?:(?:[^\W\d]|\$)[\w$.:-]*\s*)?>')
+_TEXT = re.compile(r'[^<{]+')
+_INDENT = re.compile(r'[ \t]*')
+_INDENT_BYTES = re.compile(rb'[ \t]*')
+
+
+class Token(NamedTuple):
+    """A lexical token: ``kind`` plus the ``[start, end)`` span in the text.
+
+    ``depth`` is the nesting level of JSX elements, ``{}`` blocks and
+    template substitutions.  An opening token and its closing token report
+    the same depth; tokens between them report a deeper one.
+    """
+    kind: str
+    start: int
+    end: int
+    depth: int
+
+
+def _expression_may_start(kind: Optional[str], value: Optional[str]) -> bool:
+    if kind is None:
+        return True
+    if kind == PUNCT:
+        return value not in _EXPR_END_PUNCT
+    if kind == NAME:
+        return value in _EXPR_KEYWORDS
+    # Sibling JSX roots are invalid, but they are what the fixers repair
+    return kind in (TAG_CLOSE, TAG_SELF_CLOSE)
+
+
+def tokenize(text: str, pos: int = 0, endpos: Optional[int] = None,
+             jsx: bool = True) -> Iterator[Token]:
+    """Yield the tokens of ``text[pos:endpos]``, starting in JavaScript mode.
+
+    Whitespace is skipped; JSX text that is only whitespace is skipped too.
+    Pass ``jsx=False`` for plain ``.ts`` sources, where ``<`` never opens a tag.
+    """
+    if endpos is None:
+        endpos = len(text)
+    stack = [_JS]
+    prev_kind = prev_value = None  # last significant JavaScript token
+
+    while pos < endpos:
+        mode = stack[-1]
+
+        if mode == _CHILDREN:
+            char = text[pos]
+            if char == '{':
+                yield Token(PUNCT, pos, pos + 1, len(stack) - 1)
+                stack.append(_EXPR)
+                prev_kind, prev_value = PUNCT, '{'
+                pos += 1
+            elif char == '<':
+                m = _CLOSE_TAG.match(text, pos)
+                if m:
+                    if len(stack) > 1:
+                        stack.pop()
+                    yield Token(TAG_CLOSE, pos, m.end(), len(stack) - 1)
+                    prev_kind, prev_value = TAG_CLOSE, None
+                    pos = m.end()
+                    continue
+                m = _OPEN_TAG.match(text, pos)
+                if m:
+                    yield Token(TAG_OPEN, pos, m.end(), len(stack) - 1)
+                    stack.append(_CHILDREN if m.group() == '<>' else _TAG)
+                    pos = m.end()
+                else:
+                    yield Token(TEXT, pos, pos + 1, len(stack) - 1)
+                    pos += 1
+            else:
+                m = _TEXT.match(text, pos)
+                end = m.end()
+                if not text[pos:end].isspace():
+                    yield Token(TEXT, pos, end, len(stack) - 1)
+                pos = end
+            continue
+
+        if mode == _TAG:
+            m = _TAG_TOKEN.match(text, pos)
+            kind = m.lastgroup
+            end = m.end()
+            if kind == 'end':
+                if end - pos == 2:
+                    if len(stack) > 1:
+                        stack.pop()
+                    yield Token(TAG_SELF_CLOSE, pos, end, len(stack) - 1)
+                    prev_kind, prev_value = TAG_SELF_CLOSE, None
+                else:
+                    stack[-1] = _CHILDREN
+                    yield Token(TAG_END, pos, end, len(stack) - 1)
+            elif kind == 'punct':
+                yield Token(PUNCT, pos, end, len(stack) - 1)
+                if text[pos] == '{':
+                    stack.append(_EXPR)
+                    prev_kind, prev_value = PUNCT, '{'
+            elif kind == 'attr':
+                yield Token(ATTR, pos, end, len(stack) - 1)
+            elif kind != 'ws':
+                yield Token(kind, pos, end, len(stack) - 1)
+            pos = end
+            continue
+
+        # JavaScript: _JS, _EXPR or _TMPL
+        m = _JS_TOKEN.match(text, pos)
+        kind = m.lastgroup
+        end = m.end()
+        if kind == 'ws':
+            pos = end
+            continue
+        depth = len(stack) - 1
+
+        if kind == 'punct':
+            value = m.group()
+            if value == '{':
+                yield Token(PUNCT, pos, end, depth)
+                stack.append(_JS)
+            elif value == '}':
+                top = stack.pop() if len(stack) > 1 else _JS
+                depth = len(stack) - 1
+                if top == _TMPL:
+                    m = _TEMPLATE_TAIL.match(text, pos)
+                    end = m.end()
+                    yield Token(TEMPLATE, pos, end, depth)
+                    if text.startswith('${', end - 2):
+                        stack.append(_TMPL)
+                    prev_kind, prev_value = TEMPLATE, None
+                    pos = end
+                    continue
+                yield Token(PUNCT, pos, end, depth)
+            elif value == '<' and jsx and _expression_may_start(prev_kind, prev_value):
+                tag = _OPEN_TAG.match(text, pos)
+                if tag and not _TYPE_PARAMS.match(text, pos):
+                    end = tag.end()
+                    yield Token(TAG_OPEN, pos, end, depth)
+                    stack.append(_CHILDREN if tag.group() == '<>' else _TAG)
+                    pos = end
+                    continue
+                yield Token(PUNCT, pos, end, depth)
+            elif value == '/' and _expression_may_start(prev_kind, prev_value):
+                literal = _REGEX_LITERAL.match(text, pos)
+                if literal:
+                    end = literal.end()
+                    yield Token(REGEX, pos, end, depth)
+                    prev_kind, prev_value = REGEX, None
+                    pos = end
+                    continue
+                yield Token(PUNCT, pos, end, depth)
+            else:
+                yield Token(PUNCT, pos, end, depth)
+            prev_kind, prev_value = PUNCT, value
+        elif kind == 'template':
+            m = _TEMPLATE_HEAD.match(text, pos)
+            end = m.end()
+            yield Token(TEMPLATE, pos, end, depth)
+            if text.startswith('${', end - 2):
+                stack.append(_TMPL)
+            prev_kind, prev_value = TEMPLATE, None
+        elif kind == 'comment':
+            yield Token(COMMENT, pos, end, depth)
+        elif kind == 'name':
+            yield Token(NAME, pos, end, depth)
+            prev_kind, prev_value = NAME, m.group()
+        else:
+            yield Token(kind, pos, end, depth)
+            prev_kind, prev_value = kind, None
+        pos = end
+
+
+def newline_at(text: str, pos: int) -> str:
+    """The line ending of the line holding ``pos`` (files may mix CRLF and LF)."""
+    end = text.find('\n', pos)
+    return '\r\n' if end > 0 and text[end - 1] == '\r' else '\n'
+
+
+class Layout:
+    """Per-line indentation and nesting depth of a text.
+
+    ``indent(line)`` is the leading whitespace of a 0-based line; a blank
+    line takes that of the next line that is not blank, which is where a
+    line inserted there belongs.  ``depth(line)`` is the depth of the first
+    token that starts on the line (``None`` for lines without one); depths
+    are only known for a layout built by ``scan``, in the same pass as the
+    tokens.  ``text`` may also be bytes, for indentation only.
+    """
+    __slots__ = ('text', 'starts', 'indents', 'depths', '_unit')
+
+    def __init__(self, text: Union[str, bytes]):
+        self.text = text
+        binary = not isinstance(text, str)
+        newline = b'\n' if binary else '\n'
+        starts = [0]
+        pos = text.find(newline)
+        while pos >= 0:
+            starts.append(pos + 1)
+            pos = text.find(newline, pos + 1)
+        self.starts = starts
+        match = (_INDENT_BYTES if binary else _INDENT).match
+        bom = 3 if binary and text.startswith(b'\xef\xbb\xbf') else \
+            int(not binary and text.startswith('\ufeff'))
+        indents = [match(text, start + (bom if number == 0 else 0)).group()
+                   for number, start in enumerate(starts)]
+        ends = starts[1:] + [len(text)]
+        following = b'' if binary else ''
+        for number in range(len(starts) - 1, -1, -1):
+            if text[starts[number] + len(indents[number]):ends[number]].strip():
+                following = indents[number]
+            else:
+                indents[number] = following
+        self.indents = indents
+        self.depths: List[Optional[int]] = [None] * len(starts)
+        self._unit = None
+
+    def line_of(self, pos: int) -> int:
+        """The 0-based line holding offset ``pos``."""
+        return bisect_right(self.starts, pos) - 1
+
+    def line_start(self, line: int) -> int:
+        return self.starts[line]
+
+    def indent(self, line: int) -> Union[str, bytes]:
+        return self.indents[line]
+
+    def depth(self, line: int) -> Optional[int]:
+        return self.depths[line]
+
+    def indent_at(self, pos: int) -> Union[str, bytes]:
+        """The indentation of the line holding offset ``pos``."""
+        return self.indents[self.line_of(pos)]
+
+    @property
+    def unit(self) -> Union[str, bytes]:
+        """One level of indentation: the most common step into a deeper line.
+
+        With depths, only steps between lines one nesting level apart are
+        counted.  Two spaces when the text has no nested lines.
+        """
+        if self._unit is None:
+            steps = Counter()
+            known = any(d is not None for d in self.depths)
+            for number in range(1, len(self.indents)):
+                outer, inner = self.indents[number - 1], self.indents[number]
+                if len(inner) <= len(outer) or not inner.startswith(outer):
+                    continue
+                if known and (self.depths[number] is None or self.depths[number - 1] is None
+                              or self.depths[number] != self.depths[number - 1] + 1):
+                    continue
+                steps[inner[len(outer):]] += 1
+            binary = not isinstance(self.text, str)
+            self._unit = steps.most_common(1)[0][0] if steps else (b'  ' if binary else '  ')
+        return self._unit
+
+    def indent_for(self, line: int, level: int = 0) -> Union[str, bytes]:
+        """The indentation ``level`` steps deeper (or shallower) than ``line``'s."""
+        indent = self.indents[line]
+        if level >= 0:
+            return indent + self.unit * level
+        return indent[:max(0, len(indent) + level * len(self.unit))]
+
+
+def scan(text: str, jsx: bool = True) -> Tuple[List[Token], Layout]:
+    """All tokens of ``text`` and its ``Layout``, with depths, in one pass."""
+    layout = Layout(text)
+    starts, depths = layout.starts, layout.depths
+    last = len(starts) - 1
+    line = 0
+    tokens = []
+    for tok in tokenize(text, jsx=jsx):
+        tokens.append(tok)
+        while line < last and starts[line + 1] <= tok.start:
+            line += 1
+        if depths[line] is None:
+            depths[line] = tok.depth
+    return tokens, layout
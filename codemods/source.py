@@ -0,0 +1,120 @@
+"""
+Byte-exact source files.
+
+``Source`` keeps a file's bytes as they were read.  The scanner and the
+transforms work on ``text`` (the content decoded once, without the BOM) and
+describe their changes as splices with ``str`` offsets; ``Source.splice``
+maps those offsets to byte offsets and rebuilds the file from ``memoryview``
+slices of the original.  Everything outside the edited spans (CRLF or LF
+line endings, the BOM, even bytes that are not valid UTF-8) is copied
+through as it was, never decoded and re-encoded.
+"""
+
+import re
+from bisect import bisect_left
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+from .patch import iter_splices, rebuild
+
+BOM = b'\xef\xbb\xbf'
+
+_NON_ASCII = re.compile(r'[^\x00-\x7f]')
+
+
+def changed_span(old: str, new: str) -> Tuple[int, int, int]:
+    """``(start, old_end, new_end)`` of the one span where ``old`` and ``new`` differ.
+
+    Prefix and suffix are found by bisection over slice comparisons, which
+    run at memcmp speed instead of a character loop.
+    """
+    limit = min(len(old), len(new))
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[:mid] == new[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    start = lo
+    lo, hi = 0, limit - start
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[len(old) - mid:] == new[len(new) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return start, len(old) - lo, len(new) - lo
+
+
+class Source:
+    """The bytes of a file and their decoded text."""
+    __slots__ = ('data', 'bom', 'text', '_positions', '_extra', '_byte_positions')
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.bom = BOM if data.startswith(BOM) else b''
+        # surrogateescape: bytes that are not UTF-8 survive as lone surrogates
+        self.text = str(memoryview(data)[len(self.bom):], 'utf-8', 'surrogateescape')
+        self._positions: Optional[List[int]] = None
+        self._extra: List[int] = []
+        self._byte_positions: Optional[List[int]] = None
+
+    def _index(self) -> None:
+        if self._positions is None:
+            # Each non-ASCII character is followed by the running count of
+            # bytes it and the ones before it take beyond one
+            self._positions = []
+            extra = 0
+            for m in _NON_ASCII.finditer(self.text):
+                extra += len(m.group().encode('utf-8', 'surrogateescape')) - 1
+                self._positions.append(m.start())
+                self._extra.append(extra)
+
+    def byte_offset(self, pos: int) -> int:
+        """The offset in ``data`` of character ``pos`` of ``text``."""
+        if len(self.text) + len(self.bom) == len(self.data):  # all ASCII
+            return len(self.bom) + pos
+        self._index()
+        before = bisect_left(self._positions, pos)
+        return len(self.bom) + pos + (self._extra[before - 1] if before else 0)
+
+    def char_offset(self, offset: int) -> int:
+        """The character of ``text`` at ``offset`` in ``data``; the inverse of ``byte_offset``."""
+        offset = max(0, offset - len(self.bom))
+        if len(self.text) + len(self.bom) == len(self.data):
+            return offset
+        self._index()
+        if self._byte_positions is None:
+            extra = [0] + self._extra
+            self._byte_positions = [p + extra[i] for i, p in enumerate(self._positions)]
+        before = bisect_left(self._byte_positions, offset)
+        return offset - (self._extra[before - 1] if before else 0)
+
+    def byte_splices(self, splices: Sequence[Tuple[int, int, str]]) -> List[Tuple[int, int, bytes]]:
+        """``splices`` of ``text`` as ``(start, end, bytes)`` splices of ``data``."""
+        offset = self.byte_offset
+        return [(offset(start), offset(end), replacement.encode('utf-8', 'surrogateescape'))
+                for start, end, replacement in splices]
+
+    def splice(self, splices: Sequence[Tuple[int, int, str]]) -> bytes:
+        """``data`` with each ``(start, end, text)`` span of ``text`` replaced."""
+        if not splices:
+            return self.data
+        # not counted again: the transform already recorded these splices
+        return rebuild(self.data, self.byte_splices(splices))
+
+    def iter_splice(self, splices: Sequence[Tuple[int, int, str]]) -> Iterator[Union[bytes, memoryview]]:
+        """The bytes of ``splice(splices)`` as pieces, without joining them."""
+        return iter_splices(self.data, self.byte_splices(splices))
+
+    def with_text(self, text: str) -> bytes:
+        """``data`` for the new content ``text``, copying the unchanged ends."""
+        if text == self.text:
+            return self.data
+        start, old_end, new_end = changed_span(self.text, text)
+        return self.splice([(start, old_end, text[start:new_end])])
+
+
+def read_source(path) -> Source:
+    with open(path, 'rb') as f:
+        return Source(f.read())
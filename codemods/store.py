@@ -0,0 +1,84 @@
+"""
+Repository paths and the JSON files the codemod tools keep between runs.
+
+``REPO_ROOT``, ``display`` and ``discover`` are what every command needs
+to find and name files; this module imports nothing of the runner, so a
+command that only reads files does not load it.
+
+The content cache, the symbol index, the import graph and the route table
+each keep per-file entries in a JSON file at the repository root, written
+as ``{"format": N, "files": {path: entry}}`` (plus whatever else the store
+needs).  ``JsonStore`` is that part of them: the file is loaded when the
+store is created, a missing or corrupt one, or one of another format, is
+an empty store, ``dirty`` says whether anything changed since, and ``save``
+only writes then, atomically (see ``codemods.output``).
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from .output import atomic_write
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def display(path: str) -> str:
+    """``path`` relative to the repository root, or as it is when outside it."""
+    try:
+        return str(Path(path).relative_to(REPO_ROOT))
+    except ValueError:
+        return path
+
+
+def discover(patterns: Iterable[str], root: Path = REPO_ROOT) -> List[Path]:
+    """Return the files matching any of the glob ``patterns`` under ``root``, sorted."""
+    return sorted({p for pattern in patterns for p in root.glob(pattern) if p.is_file()})
+
+
+class JsonStore:
+    """Per-file entries, kept on disk between runs in the JSON file ``path``.
+
+    Subclasses set ``FORMAT``, bumped whenever their entries change shape so
+    files of an older format are discarded, and extend ``load`` and ``dump``
+    when they keep more than ``files``.
+    """
+    FORMAT = 1
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.files: Dict[str, dict] = {}
+        self.dirty = False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format') == self.FORMAT:
+                self.load(data)
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass  # a missing or corrupt store is an empty one
+
+    def load(self, data: dict) -> None:
+        """Take the entries from ``data``, as read; raise ``KeyError`` if one is missing."""
+        self.files = data['files']
+
+    def dump(self) -> dict:
+        """What ``save`` writes, besides the format."""
+        return {'files': self.files}
+
+    def forget(self, path: str) -> None:
+        """Drop the entry of ``path``, if there is one."""
+        if self.files.pop(path, None) is not None:
+            self.dirty = True
+
+    def evict_missing(self) -> None:
+        """Drop the entries of files that no longer exist."""
+        for path in [p for p in self.files if not os.path.exists(p)]:
+            self.forget(path)
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        atomic_write(self.path, json.dumps(dict(self.dump(), format=self.FORMAT),
+                                           separators=(',', ':'), sort_keys=True))
+        self.dirty = False
@@ -0,0 +1,161 @@
+"""
+Persistent inverted index of the identifiers and JSX elements in client/src.
+
+Usage (from the repository root)::
+
+    python -m codemods.symbols motion.div              # where <motion.div> opens
+    python -m codemods.symbols ChevronUp pixPaymentStatus
+    python -m codemods.symbols --files setContractsExpanded
+
+Every ``.ts``/``.tsx`` file is tokenized with the codemod scanner; each
+identifier (``NAME`` token) and each opening JSX element name (``motion.div``
+for ``<motion.div``) maps to the files and character offsets where it
+occurs.  The index lives in ``.codemod-symbols.json`` and is refreshed
+incrementally like the content cache: files whose size and mtime are
+unchanged are not read, files whose content hash is unchanged are not
+tokenized again, and only the postings of the files that really changed are
+replaced.  The runner uses it to pick the files a transform can apply to
+(see ``Transform.symbols``) instead of scanning the whole tree.
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from .cache import content_hash
+from .scanner import NAME, TAG_OPEN, tokenize
+from .source import read_source
+from .store import REPO_ROOT, JsonStore, discover, display
+
+INDEX_FILE = REPO_ROOT / '.codemod-symbols.json'
+INDEX_FORMAT = 1
+SOURCE_GLOBS = ('client/src/**/*.tsx', 'client/src/**/*.ts')
+
+
+def file_symbols(text: str, jsx: bool = True) -> Dict[str, List[int]]:
+    """Map every identifier and opening JSX element in ``text`` to its offsets."""
+    symbols: Dict[str, List[int]] = {}
+    for token in tokenize(text, jsx=jsx):
+        if token.kind == NAME:
+            name = text[token.start:token.end]
+        elif token.kind == TAG_OPEN:
+            name = text[token.start + 1:token.end].strip()
+            if not name:  # "<>"
+                continue
+        else:
+            continue
+        symbols.setdefault(name, []).append(token.start)
+    return symbols
+
+
+class SymbolIndex(JsonStore):
+    """``symbol -> {path: [offset, ...]}``, kept on disk between runs."""
+    FORMAT = INDEX_FORMAT
+
+    def __init__(self, path: Path = INDEX_FILE):
+        # files: path -> {'mtime_ns', 'size', 'hash', 'names'}; 'names' lists
+        # the symbols with a posting for the file, so it can be taken out again
+        self.postings: Dict[str, Dict[str, List[int]]] = {}
+        super().__init__(path)
+
+    def load(self, data: dict) -> None:
+        self.files, self.postings = data['files'], data['symbols']
+
+    def dump(self) -> dict:
+        return {'files': self.files, 'symbols': self.postings}
+
+    def forget(self, path: str) -> None:
+        entry = self.files.pop(path, None)
+        if entry is None:
+            return
+        for name in entry['names']:
+            postings = self.postings.get(name)
+            if postings is not None:
+                postings.pop(path, None)
+                if not postings:
+                    del self.postings[name]
+        self.dirty = True
+
+    def update(self, path: str) -> bool:
+        """Bring the postings of ``path`` up to date; ``True`` if it was tokenized."""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self.forget(path)
+            return False
+        entry = self.files.get(path)
+        if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+            return False
+        source = read_source(path)
+        digest = content_hash(source.data)
+        self.dirty = True
+        if entry and entry['hash'] == digest:
+            entry['mtime_ns'], entry['size'] = st.st_mtime_ns, st.st_size
+            return False
+        self.forget(path)
+        symbols = file_symbols(source.text, jsx=not path.endswith('.ts'))
+        for name, offsets in symbols.items():
+            self.postings.setdefault(name, {})[path] = offsets
+        self.files[path] = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size,
+                            'hash': digest, 'names': sorted(symbols)}
+        return True
+
+    def refresh(self, paths: Iterable) -> int:
+        """Update the index for ``paths``; return how many files were tokenized.
+
+        Entries of files that no longer exist are dropped.
+        """
+        tokenized = sum(self.update(os.path.abspath(p)) for p in paths)
+        self.evict_missing()
+        return tokenized
+
+    def lookup(self, name: str) -> Dict[str, List[int]]:
+        """The files ``name`` occurs in, each with its offsets."""
+        return self.postings.get(name, {})
+
+    def files_with(self, names: Iterable[str]) -> List[str]:
+        """The files in which any of ``names`` occurs, sorted."""
+        found = set()
+        for name in names:
+            found.update(self.postings.get(name, ()))
+        return sorted(found)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m codemods.symbols',
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument('names', nargs='+', help='identifiers or JSX element names to look up')
+    parser.add_argument('--files', action='store_true',
+                        help='list only the files that contain any of the names')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='discard .codemod-symbols.json and index every file again')
+    args = parser.parse_args(argv)
+
+    index = SymbolIndex()
+    if args.rebuild:
+        index.files, index.postings = {}, {}
+    index.refresh(discover(SOURCE_GLOBS))
+    index.save()
+
+    if args.files:
+        for path in index.files_with(args.names):
+            print(display(path))
+        return 0
+    found = False
+    for name in args.names:
+        for path, offsets in sorted(index.lookup(name).items()):
+            text = read_source(path).text
+            line, pos = 1, 0
+            for offset in offsets:
+                line += text.count('\n', pos, offset)
+                pos = offset
+                column = offset - text.rfind('\n', 0, offset)
+                print('%s:%d:%d: %s' % (display(path), line, column, name))
+                found = True
+    return 0 if found else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
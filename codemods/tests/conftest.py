@@ -0,0 +1,15 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def failing_replace(monkeypatch):
+    """Make ``os.replace`` fail for paths ending in ``b.tsx``."""
+    replace = os.replace
+
+    def fake(src, dst):
+        if os.fspath(dst).endswith('b.tsx'):
+            raise PermissionError(13, 'Permission denied')
+        replace(src, dst)
+    monkeypatch.setattr(os, 'replace', fake)
@@ -0,0 +1,6 @@
+"""A transform plugin that reads the buttons a file imports, for the import graph tests."""
+
+from codemods.transforms import Transform
+
+TRANSFORM = Transform('follower', (('button', r'\bButton\b'),), lambda text, hits: text,
+                      imports=('*/button.tsx',))
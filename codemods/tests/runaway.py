@@ -0,0 +1,16 @@
+"""A transform plugin that runs away on some files, for the budget tests."""
+
+from codemods.transforms import Transform
+
+
+def _apply(text, hits):
+    if 'SPIN' in text:
+        while True:
+            pass
+    if 'HOG' in text:
+        hog = bytearray(1 << 32)  # over any budget the tests set
+        return text + str(len(hog))
+    return text.replace('OLD', 'NEW')
+
+
+TRANSFORM = Transform('runaway', (('spin', r'SPIN'), ('hog', r'HOG'), ('old', r'OLD')), _apply)
@@ -0,0 +1,19 @@
+"""A transform plugin whose splice breaks the code after it, for the verify tests."""
+
+from codemods.transforms import Transform
+
+
+def _splices(text, hits):
+    # a stray backtick: everything after it turns into a template literal
+    return [(hit.start, hit.end, 'STRAY`') for hit in hits]
+
+
+def _apply(text, hits):
+    for hit in reversed(hits):
+        text = text[:hit.start] + 'STRAY`' + text[hit.end:]
+    return text
+
+
+TRANSFORM = Transform('stray', (('stray', r'STRAY\b(?!`)'),), _apply,
+                      extents=lambda text, hits: {h.start: h.end for h in hits},
+                      splices=_splices)
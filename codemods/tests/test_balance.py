@@ -0,0 +1,89 @@
+import pytest
+
+from codemods.balance import (
+    BRACE, BRACKET, ELEMENT, FRAGMENT, PAREN, SUBSTITUTION, BalanceError, PairIndex,
+    check_balance,
+)
+
+PAGE = '''export const Card = ({ items }) => (
+  <div className={`card ${items.length ? 'full' : ''}`}>
+    <>
+      {items.map((item) => <Item key={item.id} {...item} />)}
+    </>
+  </div>
+);
+'''
+
+
+def _pair(index, text, opening):
+    return index.closer(text.index(opening))
+
+
+def test_elements_fragments_substitutions_and_brackets_pair_up():
+    index = PairIndex(PAGE)
+    assert index.balanced
+    div = _pair(index, PAGE, '<div')
+    assert (div.kind, div.name, div.open_line, div.close_line) == (ELEMENT, 'div', 2, 6)
+    assert PAGE[div.close_start:div.close_end] == '</div>'
+    assert (_pair(index, PAGE, '<>').kind, _pair(index, PAGE, '<>').close_line) == (FRAGMENT, 5)
+    assert _pair(index, PAGE, '${').kind == SUBSTITUTION
+    item = _pair(index, PAGE, '<Item')
+    assert PAGE[item.close_start:item.close_end] == '/>'
+    assert _pair(index, PAGE, '{ items }').kind == BRACE
+    body = index.closer(PAGE.index('(\n'))
+    assert (body.kind, body.close_line) == (PAREN, 7)
+    assert index.opener(PAGE.index('</>')).open_line == 3
+
+
+def test_brackets_and_closing_line():
+    text = 'const a = [\n  f(1),\n  { b: [2] },\n];\n'
+    index = PairIndex(text, jsx=False)
+    assert index.balanced
+    assert _pair(index, text, '[').kind == BRACKET and index.closing_line(1) == 4
+    assert [p.kind for p in index.opened_on(3)] == [BRACE, BRACKET]
+
+
+def test_stray_closing_tag_in_plain_code():
+    index = PairIndex('const a = 1;\n</x>\n')
+    assert [(p.line, p.message) for p in index.problems] == [(2, 'unmatched closing </x>')]
+
+
+@pytest.mark.parametrize('text, message', [
+    ('<div>\n  <p>\n</div>\n', 'unclosed <p>'),
+    ('f(a]\n', 'unmatched closing ]'),
+    ('const s = `${a`;\n', 'unclosed ${'),
+])
+def test_unpaired_nodes_are_problems(text, message):
+    assert message in [p.message for p in PairIndex(text).problems]
+
+
+def test_an_unbalanced_input_is_held_to_its_own_count():
+    before = '<div>\n  <p>\n</div>\n'  # already one unclosed <p>
+    check_balance(before, before.replace('<div>', '<section>').replace('</div>', '</section>'))
+    with pytest.raises(BalanceError,
+                       match=r'^line 1: unclosed \( \(2 unpaired, 1 before the change\)'):
+        check_balance(before, 'f(\n' + before)
+
+
+@pytest.mark.parametrize('body', [
+    '    <p>a</p>\n    <p>b</p>\n',
+    '    {items.map((i) => <p>{i}</p>)}\n    <p>b</p>\n',
+])
+def test_several_roots_in_a_conditional_are_refused(body):
+    # the shape the collapsible transform once wrote: "{x && ( ...roots )}"
+    original = '<div>\n  <h3>T</h3>\n%s</div>\n' % body
+    wrapped = '<div>\n  <h3>T</h3>\n  {open && (\n%s  )}\n</div>\n' % body.replace('\n    ', '\n      ')
+    with pytest.raises(BalanceError, match='^line 5: '):
+        check_balance(original, wrapped)
+    fragment = wrapped.replace('(\n', '(\n    <>\n').replace('  )}', '    </>\n  )}')
+    check_balance(original, fragment)
+
+
+@pytest.mark.parametrize('text', [
+    '{a ? <b /> : <i />}',
+    'const x = [<a key="1" />, <b key="2" />];',
+    '<div><a /><b /></div>',
+    'return (<><a /><b /></>);',
+])
+def test_single_roots_and_children_are_fine(text):
+    assert PairIndex(text).balanced
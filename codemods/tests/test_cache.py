@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+from codemods import runner
+from codemods.cache import ContentCache
+from codemods.transforms import TRANSFORMS
+
+
+@pytest.fixture
+def runaway(monkeypatch):
+    monkeypatch.setitem(TRANSFORMS.modules, 'runaway', 'codemods.tests.runaway')
+    return 'runaway'
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """The files the runner reads and the transform sets it scans with."""
+    seen = {'read': [], 'scanned': []}
+    read_source, registry = runner.read_source, runner.registry
+
+    def read(path):
+        seen['read'].append(os.path.basename(path))
+        return read_source(path)
+
+    def scan(names):
+        seen['scanned'].append(names)
+        return registry(names)
+    monkeypatch.setattr(runner, 'read_source', read)
+    monkeypatch.setattr(runner, 'registry', scan)
+    return seen
+
+
+def _run(paths, names, cache_file, calls):
+    for seen in calls.values():
+        seen.clear()
+    cache = ContentCache(cache_file)
+    results = runner.run(paths, names, jobs=1, timeout=None, memory=None, cache=cache)
+    cache.save()
+    return [r.status for r in results]
+
+
+def test_same_stat_is_not_read(runaway, tmp_path, calls):
+    page = tmp_path / 'page.tsx'
+    page.write_text('export const a = 1;\n')
+    assert _run([page], [runaway], tmp_path / 'cache.json', calls) == ['skipped']
+    assert calls['read'] == ['page.tsx']
+    assert _run([page], [runaway], tmp_path / 'cache.json', calls) == ['cached']
+    assert calls == {'read': [], 'scanned': []}
+
+
+def test_touched_with_the_same_hash_is_not_scanned(runaway, tmp_path, calls):
+    page = tmp_path / 'page.tsx'
+    page.write_text('export const a = 1;\n')
+    _run([page], [runaway], tmp_path / 'cache.json', calls)
+    os.utime(page, ns=(1, 1))
+    assert _run([page], [runaway], tmp_path / 'cache.json', calls) == ['cached']
+    assert calls == {'read': ['page.tsx'], 'scanned': []}
+    page.write_text('export const a = 2;\n')
+    assert _run([page], [runaway], tmp_path / 'cache.json', calls) == ['skipped']
+    assert calls['scanned'] == [(runaway,)]
+
+
+def test_a_version_bump_invalidates_the_entry(runaway, tmp_path, calls, monkeypatch):
+    page = tmp_path / 'page.tsx'
+    page.write_text('export const a = 1;\n')
+    _run([page], [runaway], tmp_path / 'cache.json', calls)
+    monkeypatch.setitem(TRANSFORMS._loaded, runaway, TRANSFORMS[runaway]._replace(version=2))
+    assert _run([page], [runaway], tmp_path / 'cache.json', calls) == ['skipped']
+    assert calls['scanned'] == [(runaway,)]
+    assert _run([page], [runaway], tmp_path / 'cache.json', calls) == ['cached']
+
+
+def test_deleted_files_are_evicted(runaway, tmp_path, calls):
+    pages = [tmp_path / 'a.tsx', tmp_path / 'b.tsx']
+    for page in pages:
+        page.write_text('export const a = 1;\n')
+    _run(pages, [runaway], tmp_path / 'cache.json', calls)
+    assert sorted(ContentCache(tmp_path / 'cache.json').files) == [str(p) for p in pages]
+    pages[1].unlink()
+    _run(pages[:1], [runaway], tmp_path / 'cache.json', calls)
+    assert list(ContentCache(tmp_path / 'cache.json').files) == [str(pages[0])]
@@ -0,0 +1,119 @@
+import pytest
+
+from codemods.collapsible import make_collapsible
+
+PAGE = '''import { useState } from "react";
+import { motion } from "framer-motion";
+
+export default function Page() {
+  const [step, setStep] = useState(1);
+
+  return (
+    <div>
+      {/* Dados do Pet */}
+      <motion.div className="mb-8">
+        <h3 className="text-lg mb-4">Dados do Pet</h3>
+%s      </motion.div>
+    </div>
+  );
+}
+'''
+
+LITERAL = '''{`Nome:
+  Rex
+    Idade: ${step}`}'''
+TITLE = '''"Nome
+  do pet"'''
+
+
+def test_a_section_is_made_collapsible():
+    new = make_collapsible(PAGE % '        <p>Rex</p>\n')
+    assert 'const [dadosDoPetExpanded, setDadosDoPetExpanded] = useState(true);' in new
+    assert '        {dadosDoPetExpanded && (\n          <p>Rex</p>\n        )}\n' in new
+    assert 'import { ChevronUp, ChevronDown } from "lucide-react";' in new
+
+
+def test_running_twice_is_a_no_op():
+    once = make_collapsible(PAGE % '        <p>Rex</p>\n')
+    assert make_collapsible(once) == once
+
+
+@pytest.mark.parametrize('body, moved', [
+    # one root: moved one step in
+    ('        <pre>%s</pre>\n' % LITERAL, '          <pre>%s</pre>\n' % LITERAL),
+    # two roots: moved two steps in, inside a fragment
+    ('        <pre>%s</pre>\n        <p title=%s>Rex</p>\n' % (LITERAL, TITLE),
+     '            <pre>%s</pre>\n            <p title=%s>Rex</p>\n' % (LITERAL, TITLE)),
+])
+def test_lines_inside_literals_are_not_reindented(body, moved):
+    assert moved in make_collapsible(PAGE % body)
+
+
+# A section of customer-financial.tsx before and after restore_and_fix_collapsible.py,
+# which wrote the collapsible markup out by hand ("<div " lost its trailing space)
+PLAIN_SECTION = '''\
+          {/* Active Contracts Section */}
+          <motion.div
+            initial={{ opacity: 0, y: 20 }}
+            animate={{ opacity: 1, y: 0 }}
+            transition={{ delay: 0.2 }}
+            className="mb-8 bg-white rounded-xl shadow-lg p-6"
+          >
+            <h3 className="text-lg font-semibold mb-4" style={{ color: 'var(--text-dark-primary)' }}>
+              Contratos
+            </h3>
+            <div className="space-y-4">
+              {contracts.length > 0 ? (
+                <ContractList contracts={contracts} />
+              ) : (
+                <div className="p-6 text-center" style={{ background: 'var(--bg-cream-light)' }}>
+                  <FileText className="w-12 h-12 mx-auto mb-4" style={{ color: 'var(--text-dark-secondary)' }} />
+                  <p style={{ color: 'var(--text-dark-secondary)' }}>Nenhum contrato encontrado.</p>
+                </div>
+              )}
+            </div>
+          </motion.div>
+'''
+
+LEGACY_SECTION = '''\
+          {/* Active Contracts Section */}
+          <motion.div
+            initial={{ opacity: 0, y: 20 }}
+            animate={{ opacity: 1, y: 0 }}
+            transition={{ delay: 0.2 }}
+            className="mb-8 bg-white rounded-xl shadow-lg p-6"
+          >
+            <div
+              className="flex items-center justify-between mb-4 cursor-pointer"
+              onClick={() => setContractsExpanded(!contractsExpanded)}
+            >
+              <h3 className="text-lg font-semibold" style={{ color: 'var(--text-dark-primary)' }}>
+                Contratos
+              </h3>
+              {contractsExpanded ? (
+                <ChevronUp className="w-5 h-5" style={{ color: 'var(--text-dark-secondary)' }} />
+              ) : (
+                <ChevronDown className="w-5 h-5" style={{ color: 'var(--text-dark-secondary)' }} />
+              )}
+            </div>
+            {contractsExpanded && (
+              <div className="space-y-4">
+                {contracts.length > 0 ? (
+                  <ContractList contracts={contracts} />
+                ) : (
+                  <div className="p-6 text-center" style={{ background: 'var(--bg-cream-light)' }}>
+                    <FileText className="w-12 h-12 mx-auto mb-4" style={{ color: 'var(--text-dark-secondary)' }} />
+                    <p style={{ color: 'var(--text-dark-secondary)' }}>Nenhum contrato encontrado.</p>
+                  </div>
+                )}
+              </div>
+            )}
+          </motion.div>
+'''
+
+
+def test_output_matches_the_legacy_script():
+    page = 'export default function Page() {\n  return (\n    <div>\n      <div>\n%s' \
+           '      </div>\n    </div>\n  );\n}\n'
+    new = make_collapsible(page % PLAIN_SECTION, names={'Active Contracts Section': 'contracts'})
+    assert LEGACY_SECTION in new
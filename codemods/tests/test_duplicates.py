@@ -0,0 +1,57 @@
+from codemods.duplicates import (
+    consolidation_plan, estimate, fingerprint, similar_pairs,
+)
+
+BUTTON = ''.join('''export function Button%d({ label, onClick }: Props) {
+  const [busy, setBusy] = useState(false);
+  return <button className="btn-%d" disabled={busy} onClick={onClick}>{label}</button>;
+}
+''' % (i, i) for i in range(20))
+# The same code, reformatted and commented
+COPY = '// admin copy\n' + BUTTON.replace('  const', '    /* state */ const').replace('\n}', '\n  }')
+# A fork: a few of its components changed
+FORK = BUTTON.replace('disabled={busy}', 'aria-busy={busy}', 3)
+OTHER = 'export const schema = { id: 1, name: "pet" };\n' * 3
+
+
+def _prints(tmp_path, files):
+    prints = []
+    for name, text in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+        prints.append(fingerprint(str(path), text))
+    return prints
+
+
+def test_formatting_and_comments_do_not_count():
+    assert fingerprint('a.tsx', BUTTON).digest == fingerprint('b.tsx', COPY).digest
+    assert fingerprint('a.tsx', BUTTON).digest != fingerprint('c.tsx', FORK).digest
+
+
+def test_candidates_from_sketches_confirmed_by_exact_jaccard(tmp_path):
+    prints = _prints(tmp_path, {'admin/ui/button.tsx': COPY, 'components/ui/button.tsx': BUTTON,
+                                'pages/fork.tsx': FORK, 'shared/schema.tsx': OTHER})
+    copy, button, fork, other = prints
+    exact = len(button.shingles & fork.shingles) / len(button.shingles | fork.shingles)
+    assert 0.8 < exact < 1
+    assert abs(estimate(button, fork) - exact) < 0.1
+    pairs = similar_pairs(prints, threshold=0.8)
+    assert {(p.first, p.second): (p.similarity, p.identical) for p in pairs} == {
+        (copy.path, button.path): (1.0, True),
+        (copy.path, fork.path): (exact, False),
+        (button.path, fork.path): (exact, False),
+    }
+    assert similar_pairs(prints, threshold=exact + 0.01) == pairs[:1]
+    assert estimate(button, other) == 0
+
+
+def test_components_ui_is_the_canonical_file(tmp_path):
+    prints = _prints(tmp_path, {'admin/ui/button.tsx': COPY, 'components/ui/button.tsx': BUTTON,
+                                'pages/fork.tsx': FORK})
+    plan = consolidation_plan(similar_pairs(prints, threshold=0.8))
+    assert len(plan) == 1
+    assert plan[0]['canonical'] == str(tmp_path / 'components/ui/button.tsx')
+    assert [(c['path'], c['action']) for c in plan[0]['copies']] == [
+        (str(tmp_path / 'admin/ui/button.tsx'), 'reexport'),
+        (str(tmp_path / 'pages/fork.tsx'), 'merge')]
@@ -0,0 +1,53 @@
+import importlib.util
+import re
+
+from codemods.bench import _LEGACY_PATTERNS, generate_checkout
+from codemods.fragments import wrap_ternary_fragments
+from codemods.store import REPO_ROOT
+
+
+def _own_lines(page, opener, closer, indent):
+    """``page`` with "<>" on a line of its own after each ``opener`` and "</>"
+    on one before the line starting with ``closer``, both at ``indent``."""
+    assert page.count(opener) == page.count(closer) > 0
+    page = page.replace(opener, '%s%s<>\n' % (opener, indent))
+    return page.replace(closer, '%s</>\n%s' % (indent, closer))
+
+
+def test_inline_and_line_placements_match_their_documented_layout():
+    page = generate_checkout(300)
+    # INLINE: the isLoading branches get exactly what the legacy regex gave them
+    expected = re.sub(_LEGACY_PATTERNS[0], r'\1<>\2</>\3', page, flags=re.DOTALL)
+    assert expected != page
+    # LINE: "<>" and "</>" on lines of their own, indented like the first root
+    expected = _own_lines(expected, '{isCopying ? (\n',
+                          '                ) : (\n                  <Copy', ' ' * 18)
+    expected = _own_lines(expected, '// Payment Confirmed State\n',
+                          "              ) : pixPaymentStatus === 'rejected'", ' ' * 20)
+    assert wrap_ternary_fragments(page) == expected
+
+
+def test_multi_root_branches_get_fragments_on_their_own_lines():
+    page = generate_checkout(300)
+    new = wrap_ternary_fragments(page)
+    assert new.count('{isCopying ? (\n                  <>\n') == page.count('{isCopying ? (')
+    assert '// Payment Confirmed State\n                    <>\n' in new
+    assert wrap_ternary_fragments(new) == new
+
+
+def _script(relative):
+    spec = importlib.util.spec_from_file_location('script', REPO_ROOT / relative)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_client_script_reports_the_branches_it_wrapped(tmp_path, capsys):
+    page = tmp_path / 'checkout.tsx'
+    page.write_text(generate_checkout(300))
+    script = _script('client/fix_jsx_fragments.py')
+    wrapped = script.fix_page(page, journal=False)
+    assert wrapped == page.read_text().count('</>') > 0
+    assert capsys.readouterr().out.endswith(
+        'JSX Fragment corrections applied: %d branch(es) wrapped.\n' % wrapped)
+    assert script.fix_page(page, journal=False) == 0
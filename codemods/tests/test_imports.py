@@ -0,0 +1,117 @@
+import os
+
+import pytest
+
+from codemods import runner
+from codemods.cache import ContentCache
+from codemods.imports import ImportGraph, file_imports, resolve
+from codemods.transforms import TRANSFORMS
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """A small client/src + shared tree: page -> card -> button, page -> schema."""
+    files = {
+        'client/src/pages/page.tsx': (
+            'import { Card } from "@/components/card";\n'
+            'import { schema } from "@shared/schema";\n'
+            'import React from "react";\n'
+            'export default () => <Card />;\n'),
+        'client/src/pages/about.tsx': 'import { Button } from "../components/ui/button";\n',
+        'client/src/components/card.tsx': 'export { Button as Card } from "./ui/button.js";\n',
+        'client/src/components/ui/button.tsx': 'export const Button = () => <button />;\n',
+        'client/src/lib/index.ts': 'export const lazy = () => import("../pages/page");\n',
+        'shared/schema.ts': 'export const schema = {};\n',
+    }
+    for name, content in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return tmp_path
+
+
+def _path(tree, name):
+    return str(tree / name)
+
+
+def test_specifiers_from_the_token_stream():
+    text = ('import a from "./a";\nexport * from \'./b\';\nimport "./c.css";\n'
+            'const d = await import("./d");\nconst e = x.from("./e");\n// import f from "./f"\n')
+    assert file_imports(text) == ['./a', './b', './c.css', './d']
+
+
+def test_relative_and_aliased_specifiers_resolve_to_files(tree):
+    page = _path(tree, 'client/src/pages/page.tsx')
+    card = _path(tree, 'client/src/components/card.tsx')
+    button = _path(tree, 'client/src/components/ui/button.tsx')
+    assert resolve('@/components/card', page, tree) == card
+    assert resolve('@shared/schema', page, tree) == _path(tree, 'shared/schema.ts')
+    assert resolve('../components/ui/button', page, tree) == button
+    assert resolve('./ui/button.js', card, tree) == button  # .js names the .ts/.tsx file
+    assert resolve('../lib', page, tree) == _path(tree, 'client/src/lib/index.ts')
+    assert resolve('react', page, tree) is None
+    assert resolve('./missing', page, tree) is None
+
+
+def _graph(tree, monkeypatch):
+    # aliases resolve against the repository root; point it at the tree
+    import codemods.imports as imports
+    monkeypatch.setattr(imports, 'resolve',
+                        lambda specifier, importer, root=tree: resolve(specifier, importer, root))
+    return ImportGraph(tree / 'graph.json')
+
+
+def _sources(tree):
+    return sorted(str(p) for pattern in ('client/src/**/*.ts*', 'shared/**/*.ts')
+                  for p in tree.glob(pattern))
+
+
+def test_refresh_reads_only_what_changed(tree, monkeypatch):
+    graph = _graph(tree, monkeypatch)
+    assert graph.refresh(_sources(tree)) == 6
+    page, button = _path(tree, 'client/src/pages/page.tsx'), \
+        _path(tree, 'client/src/components/ui/button.tsx')
+    assert graph.dependencies(page) == {_path(tree, 'client/src/components/card.tsx'), button,
+                                        _path(tree, 'shared/schema.ts')}
+    assert graph.dependents([button]) == {
+        _path(tree, 'client/src/components/card.tsx'), page,
+        _path(tree, 'client/src/pages/about.tsx'), _path(tree, 'client/src/lib/index.ts')}
+    graph.save()
+
+    graph = _graph(tree, monkeypatch)  # from disk
+    assert graph.refresh(_sources(tree)) == 0
+    os.utime(button, ns=(1, 1))  # touched, same content: read, not tokenized
+    assert graph.refresh(_sources(tree)) == 0
+    (tree / 'client/src/pages/about.tsx').write_text('export const About = 1;\n')
+    assert graph.refresh(_sources(tree)) == 1
+    assert _path(tree, 'client/src/pages/about.tsx') not in graph.importers(button)
+    os.unlink(tree / 'shared/schema.ts')
+    graph.refresh(_sources(tree))
+    assert _path(tree, 'shared/schema.ts') not in graph.files
+    graph.digest(page, ['*'])  # page still names it until it is read again
+
+
+def test_cache_key_follows_transitive_imports(tree, monkeypatch):
+    monkeypatch.setitem(TRANSFORMS.modules, 'follower', 'codemods.tests.follower')
+    graph = _graph(tree, monkeypatch)
+    cache = ContentCache(tree / 'cache.json')
+    pages = [tree / 'client/src/pages/page.tsx', tree / 'client/src/pages/about.tsx',
+             tree / 'shared/schema.ts']
+    (tree / 'client/src/pages/page.tsx').write_text(
+        (tree / 'client/src/pages/page.tsx').read_text() + '// Button\n')
+
+    def statuses():
+        graph.refresh(_sources(tree))
+        results = runner.run(pages, ['follower'], jobs=1, timeout=None, memory=None,
+                             cache=cache, graph=graph)
+        return [r.status for r in results]
+
+    assert statuses() == ['unchanged', 'unchanged', 'skipped']
+    assert statuses() == ['cached', 'cached', 'cached']
+    # page imports the button through card; schema imports nothing
+    (tree / 'client/src/components/ui/button.tsx').write_text('export const Button = 2;\n')
+    assert statuses() == ['unchanged', 'unchanged', 'cached']
+    assert statuses() == ['cached', 'cached', 'cached']
+    (tree / 'client/src/components/card.tsx').write_text(
+        'export { Button as Card } from "./ui/button.js";\n// edited\n')
+    assert statuses() == ['cached', 'cached', 'cached']  # not a */button.tsx file
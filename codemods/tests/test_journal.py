@@ -0,0 +1,86 @@
+import sys
+import types
+
+import pytest
+
+from codemods import journal
+from codemods.journal import Journal, RollbackError
+from codemods.output import atomic_write
+from codemods.source import read_source
+
+
+def _write_run(directory, path, old, new):
+    path.write_bytes(new)
+    record = Journal(directory)
+    record.add_content(path, old, new)
+    record.save()
+    return record.run
+
+
+def test_rollback_defaults_to_the_newest_run_not_rolled_back(tmp_path):
+    directory = tmp_path / 'journal'
+    first, second = tmp_path / 'a.tsx', tmp_path / 'b.tsx'
+    run1 = _write_run(directory, first, b'a\n', b'A\n')
+    run2 = _write_run(directory, second, b'b\n', b'B\n')
+    assert journal.latest(directory) == run2
+    journal.rollback(directory=directory)
+    assert journal.latest(directory) == run1
+    journal.rollback(directory=directory)
+    assert (first.read_bytes(), second.read_bytes()) == (b'a\n', b'b\n')
+    with pytest.raises(RollbackError, match='rolled back already'):
+        journal.rollback(directory=directory)
+
+
+def test_runs_of_one_process_get_their_own_ids(tmp_path):
+    assert len({Journal(tmp_path).run for _ in range(20)}) == 20
+
+
+def test_command_is_recorded_as_typed(monkeypatch):
+    main = types.ModuleType('__main__')
+    main.__spec__ = types.SimpleNamespace(name='codemods.__main__')
+    monkeypatch.setitem(sys.modules, '__main__', main)
+    monkeypatch.setattr(sys, 'argv', ['/repo/codemods/__main__.py', 'run', '--check'])
+    assert Journal().command == 'python -m codemods run --check'
+    main.__spec__ = None
+    monkeypatch.setattr(sys, 'argv', ['/repo/fix_server_logs.py'])
+    assert Journal().command == 'fix_server_logs.py'
+
+
+MIXED = ('import { useState } from "react";\r\n'
+         'export default function Page() {\n'
+         '  return (\r\n'
+         '    <p>Olá</p>\n'
+         '  );\r\n'
+         '}\n').encode('utf-8')
+
+
+def _splice_run(directory, path):
+    source = read_source(path)
+    start = source.text.index('    <p>')
+    splices = [(start, start, '    <span>Carregando</span>\r\n'),
+               (source.text.index('Olá'), source.text.index('Olá') + 3, 'Oi')]
+    record = Journal(directory)
+    record.add(path, source.data, source.byte_splices(splices))
+    atomic_write(path, source.splice(splices))
+    record.save()
+    return record.run
+
+
+def test_rollback_restores_a_mixed_line_ending_file_byte_for_byte(tmp_path):
+    page = tmp_path / 'page.tsx'
+    page.write_bytes(MIXED)
+    run = _splice_run(tmp_path / 'journal', page)
+    written = page.read_bytes()
+    assert b'<span>Carregando</span>\r\n    <p>Oi</p>\n  );\r\n' in written
+    assert journal.rollback(run, tmp_path / 'journal') == [str(page)]
+    assert page.read_bytes() == MIXED
+
+
+def test_rollback_refuses_a_file_changed_since_the_run(tmp_path):
+    page = tmp_path / 'page.tsx'
+    page.write_bytes(MIXED)
+    run = _splice_run(tmp_path / 'journal', page)
+    page.write_bytes(page.read_bytes().replace(b'Oi', b'Ei'))
+    with pytest.raises(RollbackError, match='changed since the run'):
+        journal.rollback(run, tmp_path / 'journal')
+    assert b'Ei' in page.read_bytes()
@@ -0,0 +1,82 @@
+from codemods.__main__ import main
+from codemods.logs import gate_splices, log_splices
+from codemods.patch import apply_splices
+
+ROOT = '/repo'
+ROUTES = '/repo/server/routes.ts'
+
+
+def _lines(text):
+    return text.splitlines(True)
+
+
+def test_statement_and_expression_forms():
+    text = 'console.log("a", x);\nconst f = () => console.log(y);\n'
+    assert apply_splices(text, log_splices(text)) == (
+        'if (logger.debugEnabled) logger.debug("a", x);\n'
+        'const f = () => logger.debugEnabled && logger.debug(y);\n')
+
+
+
+def test_case_and_default_labels_end_a_statement():
+    text = ('switch (status) {\n'
+            '  case "paid":\n'
+            '    console.log(a);\n'
+            '  case (b ? 1 : 2): console.log(b); break;\n'
+            '  default:\n'
+            '    console.log(c);\n'
+            '}\n'
+            'const o = { default: console.log(d), e: f ? console.log(e) : g };\n')
+    assert apply_splices(text, log_splices(text)) == (
+        'switch (status) {\n'
+        '  case "paid":\n'
+        '    if (logger.debugEnabled) logger.debug(a);\n'
+        '  case (b ? 1 : 2): if (logger.debugEnabled) logger.debug(b); break;\n'
+        '  default:\n'
+        '    if (logger.debugEnabled) logger.debug(c);\n'
+        '}\n'
+        'const o = { default: logger.debugEnabled && logger.debug(d),'
+        ' e: f ? logger.debugEnabled && logger.debug(e) : g };\n')
+
+def test_calls_in_strings_and_comments_are_left_alone():
+    text = 'const s = "console.log(1)"; // console.log(2)\nconst t = `${"console.log(3)"}`;\n'
+    assert log_splices(text) == []
+
+
+def test_import_goes_after_the_last_import():
+    text = 'import express from "express";\nimport multer from "multer";\n\nconsole.log(1);\n'
+    new = apply_splices(text, gate_splices(text, ROUTES, ROOT))
+    assert _lines(new)[:3] == ['import express from "express";\n',
+                               'import multer from "multer";\n',
+                               'import { logger } from "./utils/logger.js";\n']
+
+
+def test_import_keeps_line_endings_of_a_mixed_file():
+    # routes.ts mixes CRLF and LF: the line the import goes after ends in LF
+    text = ('import express from "express";\r\n'
+            'import multer from "multer";\n'
+            '\r\n'
+            'app.get("/", () => {\r\n'
+            '  console.log(1);\r\n'
+            '});\r\n')
+    new = apply_splices(text, gate_splices(text, ROUTES, ROOT))
+    lines = _lines(new)
+    assert lines[1] == 'import multer from "multer";\n'
+    assert lines[2] == 'import { logger } from "./utils/logger.js";\n'
+    untouched = [line for line in _lines(text) if 'console.log' not in line]
+    assert [line for line in lines if 'logger' not in line] == untouched
+
+
+def test_import_at_the_top_takes_the_first_line_ending():
+    text = 'console.log(1);\r\nfoo();\n'
+    new = apply_splices(text, gate_splices(text, ROUTES, ROOT))
+    assert new.startswith('import { logger } from "./utils/logger.js";\r\n')
+    assert new.endswith('\r\nfoo();\n')
+
+
+def test_logs_command_reports_without_writing(tmp_path, capsys):
+    page = tmp_path / 'routes.ts'
+    page.write_text('app.get("/", () => {\n  console.log(1);\n  console.log(2);\n});\n')
+    assert main(['logs', '--report', str(page)]) == 0
+    assert capsys.readouterr().out.splitlines()[-1] == '2 console.log calls to gate'
+    assert 'logger' not in page.read_text()
@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+from codemods.output import FlushError, WriteBatch
+
+
+def test_flush_writes_every_file(tmp_path):
+    batch = WriteBatch()
+    for name in ('a.tsx', 'b.tsx'):
+        batch.add(tmp_path / name, 'new %s\n' % name)
+    assert batch.flush() == [str(tmp_path / 'a.tsx'), str(tmp_path / 'b.tsx')]
+    assert (tmp_path / 'b.tsx').read_text() == 'new b.tsx\n'
+    assert not batch.pending
+
+
+def test_pieces_are_written_one_by_one(tmp_path):
+    batch = WriteBatch()
+    batch.add(tmp_path / 'a.tsx', iter([b'one ', memoryview(b'two\n')]))
+    batch.flush()
+    assert (tmp_path / 'a.tsx').read_bytes() == b'one two\n'
+
+
+def test_a_failed_rename_reports_what_was_written(tmp_path, failing_replace):
+    batch = WriteBatch()
+    for name in ('a.tsx', 'b.tsx', 'c.tsx'):
+        (tmp_path / name).write_text('old\n')
+        batch.add(tmp_path / name, 'new\n')
+    with pytest.raises(FlushError) as raised:
+        batch.flush()
+    assert raised.value.written == [str(tmp_path / 'a.tsx')]
+    assert list(batch.pending) == [str(tmp_path / 'b.tsx'), str(tmp_path / 'c.tsx')]
+    assert [(tmp_path / n).read_text() for n in ('a.tsx', 'b.tsx', 'c.tsx')] == \
+        ['new\n', 'old\n', 'old\n']
+    assert sorted(os.listdir(tmp_path)) == ['a.tsx', 'b.tsx', 'c.tsx']  # no temporaries left
@@ -0,0 +1,58 @@
+import pytest
+
+from codemods.patch import (
+    INSERT_BEFORE, REPLACE, Anchor, Edit, apply_edits, apply_splices, iter_splices,
+)
+
+BRANCHES = '''\
+<div>
+  <section>
+    {ok ? (
+          <p>done</p>
+          <p>thanks</p>
+
+    ) : (
+          <p>waiting</p>
+    )}
+  </section>
+</div>
+'''
+
+
+def test_level_is_measured_from_the_anchored_line():
+    new, _ = apply_edits(BRANCHES, [Edit(Anchor(') : ('), INSERT_BEFORE, '</>', level=1)])
+    assert '\n      </>\n    ) : (\n' in new
+
+
+def test_like_takes_the_indentation_of_the_branch_content():
+    first = Anchor('{ok ? (', offset=1)
+    new, _ = apply_edits(BRANCHES, [Edit(Anchor(') : (', offset=-1), REPLACE, '</>',
+                                         expect='', level=0, like=first)])
+    assert '\n          <p>thanks</p>\n          </>\n    ) : (\n' in new
+
+
+def test_splices_apply_in_offset_order_and_insertions_keep_theirs():
+    text = 'const a = 1;\n'
+    splices = [(10, 11, '2'), (0, 0, '// one\n'), (0, 0, '// two\n'), (12, 13, '')]
+    assert apply_splices(text, splices) == '// one\n// two\nconst a = 2;'
+    assert apply_splices(text, []) is text
+
+
+def test_overlapping_splices_are_refused():
+    with pytest.raises(ValueError, match='overlapping splices at offset 1'):
+        apply_splices('abcd', [(0, 2, 'x'), (1, 3, 'y')])
+
+
+def test_bytes_are_spliced_without_decoding():
+    data = 'ação\r\nfim\n'.encode('utf-8')
+    new = apply_splices(data, [(0, 0, b'\xef\xbb\xbf'), (8, 11, 'Fim')])
+    assert new == '\ufeffação\r\nFim\n'.encode('utf-8')
+
+
+def test_iter_splices_yields_what_apply_splices_joins():
+    text = b'<p>a</p>\r\n<p>b</p>\n'
+    splices = [(3, 4, 'x'), (11, 11, b'  '), (14, 15, '')]
+    pieces = list(iter_splices(text, splices))
+    assert b''.join(pieces) == apply_splices(text, splices)
+    assert all(isinstance(piece, (bytes, memoryview)) for piece in pieces)
+    assert b''.join(iter_splices(text, [])) == text
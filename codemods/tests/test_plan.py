@@ -0,0 +1,100 @@
+import subprocess
+import sys
+
+import pytest
+
+from codemods.patch import apply_splices
+from codemods.plan import Plan, PlanConflict, PlanError
+from codemods.source import read_source
+from codemods.store import REPO_ROOT
+
+
+def _page(tmp_path, data, name='page.tsx'):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return path
+
+
+def _plan(path, splices, transform='fragments'):
+    plan = Plan()
+    plan.add(path, read_source(path), splices, transform)
+    return plan
+
+
+LINES = b'one\ntwo\nthree\nfour\n'
+
+
+def test_merge_keeps_both_plans_edits_and_a_shared_one_once(tmp_path):
+    path = _page(tmp_path, LINES)
+    first = _plan(path, [(0, 3, 'ONE'), (8, 13, 'THREE')], 'a')
+    second = _plan(path, [(8, 13, 'THREE'), (14, 18, 'FOUR')], 'b')
+    merged = first.merge(second)
+    assert [(e.start, e.end, e.replacement) for e in merged.edits] == [
+        (0, 3, 'ONE'), (8, 13, 'THREE'), (14, 18, 'FOUR')]
+
+
+@pytest.mark.parametrize('theirs', [
+    (2, 6, 'X'),   # overlaps "one\ntw"
+    (3, 3, '!'),   # touches the end of "one"
+    (0, 0, '// '),  # touches its start
+])
+def test_merge_refuses_overlapping_or_touching_edits(tmp_path, theirs):
+    path = _page(tmp_path, LINES)
+    with pytest.raises(PlanConflict, match='collide'):
+        _plan(path, [(0, 3, 'ONE')], 'a').merge(_plan(path, [theirs], 'b'))
+
+
+def test_merge_refuses_plans_of_different_contents(tmp_path):
+    path = _page(tmp_path, LINES)
+    first = _plan(path, [(0, 3, 'ONE')])
+    path.write_bytes(LINES.replace(b'four', b'FOUR'))
+    second = _plan(path, [(8, 13, 'THREE')])
+    with pytest.raises(PlanConflict, match='different contents'):
+        first.merge(second)
+
+
+@pytest.mark.parametrize('data', [
+    b'<div>\r\n  <p>a</p>\r\n  <p>b</p>\r\n</div>\r\n',
+    '<p>ação</p>\n<p>não</p>\n<p>fim</p>\n'.encode('utf-8'),
+    b'<div>\n  <p>a</p>\n</div>',
+])
+def test_diff_applies_with_git_apply(tmp_path, data):
+    path = _page(tmp_path, data)
+    text = read_source(path).text
+    splices = [(text.index('<p>'), text.index('<p>'), '<>'), (len(text) - 1, len(text), '!')]
+    plan = _plan(path, splices)
+    expected = apply_splices(data, read_source(path).byte_splices(splices))
+    diff = ''.join(plan.diff()).replace('a/%s' % path, 'a/page.tsx').replace(
+        'b/%s' % path, 'b/page.tsx')
+    (tmp_path / 'plan.diff').write_bytes(diff.encode('utf-8'))
+    subprocess.run(['git', 'apply', 'plan.diff'], cwd=tmp_path, check=True, capture_output=True)
+    assert path.read_bytes() == expected
+
+
+def test_apply_refuses_a_file_changed_since_the_plan(tmp_path):
+    path = _page(tmp_path, LINES)
+    plan = _plan(path, [(0, 3, 'ONE')])
+    plan.save(tmp_path / 'plan.json')
+    path.write_bytes(LINES + b'five\n')
+    with pytest.raises(PlanError, match='changed since the plan was made'):
+        Plan.load(tmp_path / 'plan.json').apply(journal=False)
+    assert path.read_bytes() == LINES + b'five\n'
+
+
+def test_apply_writes_a_saved_plan(tmp_path):
+    path = _page(tmp_path, LINES)
+    _plan(path, [(0, 3, 'ONE')]).save(tmp_path / 'plan.json')
+    Plan.load(tmp_path / 'plan.json').apply(journal=False)
+    assert path.read_bytes() == b'ONE\ntwo\nthree\nfour\n'
+
+
+def test_diff_into_a_closed_pipe_exits_quietly(tmp_path):
+    path = _page(tmp_path, b'line\n' * 20000)
+    _plan(path, [(i * 5, i * 5 + 4, 'LINE') for i in range(20000)]).save(tmp_path / 'plan.json')
+    command = [sys.executable, '-m', 'codemods', 'plan', str(tmp_path / 'plan.json'), '--diff']
+    reader = subprocess.Popen(command, cwd=REPO_ROOT, stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE)
+    reader.stdout.readline()
+    reader.stdout.close()
+    assert reader.wait() == 1
+    assert reader.stderr.read() == b''
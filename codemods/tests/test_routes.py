@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+
+from codemods.routes import Route, RouteTable, extract_routes
+from codemods.store import REPO_ROOT
+
+ROUTES = '''import express from "express";
+const router = express.Router();
+app.set("trust proxy", 1);
+const port = app.get("port");
+
+app.get("/api/plans", async (req, res) => {
+  const plans = await storage.getPlans();
+  res.json(plans);
+});
+
+app.post(
+  "/admin/api/login",
+  adminLoginLimiter,
+  requireAuth({ role: "admin" }),
+  async (req, res) => {
+    const user = await supabaseStorage.getUser(req.body.email);
+    const token = await authService.sign(user);
+    await storage.logLogin(user.id);
+    res.json({ token, url: `/admin/${user.id}` });
+  },
+);
+
+router.delete('/api/clients/:id', requireAuth, (req, res) => storage.deleteClient(req.params.id));
+'''
+
+
+def _by_path(routes):
+    return {route.path: route for route in routes}
+
+
+def test_method_path_middleware_and_calls():
+    routes = extract_routes(ROUTES)
+    assert [(r.method, r.path) for r in routes] == [
+        ('GET', '/api/plans'), ('POST', '/admin/api/login'), ('DELETE', '/api/clients/:id')]
+    plans, login, delete = routes
+    assert plans.middleware == [] and plans.calls == ['storage.getPlans']
+    assert (plans.line, plans.end_line) == (6, 9)
+    assert login.middleware == ['adminLoginLimiter', 'requireAuth({ role: "admin" })']
+    assert login.calls == ['supabaseStorage.getUser', 'authService.sign', 'storage.logLogin']
+    assert (login.line, login.end_line) == (11, 21)
+    assert (delete.middleware, delete.calls) == (['requireAuth'], ['storage.deleteClient'])
+    assert ROUTES[delete.start:delete.end].startswith("router.delete(")
+    assert ROUTES[delete.start:delete.end].endswith("req.params.id))")
+
+
+def test_table_reuses_unchanged_files(tmp_path, monkeypatch):
+    path = tmp_path / 'routes.ts'
+    path.write_text(ROUTES)
+    table = RouteTable(tmp_path / 'table.json')
+    first = table.routes(str(path))
+    table.save()
+
+    import codemods.routes as routes
+    monkeypatch.setattr(routes, 'extract_routes', lambda text: [])
+    again = RouteTable(tmp_path / 'table.json').routes(str(path))
+    assert again == first and all(isinstance(r, Route) for r in again)
+    os.utime(path, ns=(1, 1))
+    assert RouteTable(tmp_path / 'table.json').routes(str(path)) == first  # same hash
+    path.write_text(ROUTES.replace('/api/plans', '/api/planos'))
+    assert RouteTable(tmp_path / 'table.json').routes(str(path)) == []
+
+
+def test_output_into_a_closed_pipe_exits_quietly(tmp_path):
+    page = tmp_path / 'routes.ts'
+    page.write_text(ROUTES * 1000)
+    reader = subprocess.Popen([sys.executable, '-m', 'codemods', 'routes', str(page)],
+                              cwd=REPO_ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    reader.stdout.readline()
+    reader.stdout.close()
+    assert reader.wait() == 1
+    assert reader.stderr.read() == b''
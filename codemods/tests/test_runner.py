@@ -0,0 +1,100 @@
+import pytest
+
+from codemods import journal, runner
+from codemods.journal import Journal
+from codemods.symbols import SymbolIndex
+from codemods.transforms import TRANSFORMS
+
+
+@pytest.fixture
+def runaway(monkeypatch):
+    monkeypatch.setitem(TRANSFORMS.modules, 'runaway', 'codemods.tests.runaway')
+    return 'runaway'
+
+
+@pytest.fixture
+def pages(tmp_path):
+    paths = []
+    for name, content in (('spin.tsx', 'SPIN\n'), ('hog.tsx', 'HOG\n'), ('ok.tsx', 'OLD\n')):
+        path = tmp_path / name
+        path.write_text(content)
+        paths.append(path)
+    return paths
+
+
+def _statuses(results):
+    return {r.path.rsplit('/', 1)[-1]: (r.status, r.error) for r in results}
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_budgets_hold_with_any_number_of_jobs(runaway, pages, jobs):
+    results = runner.run(pages, [runaway], write=True, jobs=jobs, timeout=1.0, memory=256)
+    statuses = _statuses(results)
+    assert statuses['spin.tsx'] == ('error', 'over the time budget of 1s')
+    assert statuses['hog.tsx'][0] == 'error' and 'MemoryError' in statuses['hog.tsx'][1]
+    assert statuses['ok.tsx'] == ('changed', None)
+    assert pages[2].read_text() == 'NEW\n'
+    assert pages[0].read_text() == 'SPIN\n'
+
+
+def test_single_job_without_budgets_runs_in_process(runaway, pages, monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError('a pool was started')
+    monkeypatch.setattr('codemods.workers.WorkerPool', no_pool)
+    results = runner.run(pages[2:], [runaway], write=False, jobs=1, timeout=None, memory=None)
+    assert _statuses(results) == {'ok.tsx': ('changed', None)}
+
+
+def test_profile_refuses_budgets():
+    with pytest.raises(SystemExit):
+        runner.main(['--profile', '/dev/null', '--timeout', '5', 'none.tsx'])
+
+
+def test_files_written_before_a_failed_rename_are_journaled(runaway, tmp_path, failing_replace):
+    paths = []
+    for name in ('a.tsx', 'b.tsx'):
+        paths.append(tmp_path / name)
+        paths[-1].write_text('OLD\n')
+    record = Journal(tmp_path / 'journal')
+    results = runner.run(paths, [runaway], jobs=1, timeout=None, memory=None, journal=record)
+    assert [r.status for r in results] == ['changed', 'error']
+    assert 'Permission denied' in results[1].error
+    assert list(record.files) == [str(paths[0])]
+    journal.rollback(directory=tmp_path / 'journal')
+    assert [p.read_text() for p in paths] == ['OLD\n', 'OLD\n']
+
+
+BRANCH = '''export const Pay = () => (
+  <div>
+    {isLoading ? (
+      <span />
+      <b />
+    ) : (
+      <i />
+    )}
+  </div>
+);
+'''
+
+
+def test_index_skips_files_without_the_transforms_symbols(tmp_path, monkeypatch):
+    with_symbol, without = tmp_path / 'pay.tsx', tmp_path / 'plain.tsx'
+    with_symbol.write_text(BRANCH)
+    without.write_text(BRANCH.replace('isLoading', 'busy'))
+    read = []
+    read_source = runner.read_source
+    monkeypatch.setattr(runner, 'read_source', lambda path: read.append(path) or read_source(path))
+
+    def run():
+        read.clear()
+        index = SymbolIndex(tmp_path / 'symbols.json')  # as saved by the previous run
+        results = runner.run([with_symbol, without], ['fragments'], jobs=1, timeout=None,
+                             memory=None, index=index)
+        return [r.status for r in results]
+
+    assert run() == ['changed', 'skipped']
+    assert read == [str(with_symbol)]  # the other file was never scanned
+    assert '<><span />' in with_symbol.read_text()
+    without.write_text(BRANCH)  # the symbol is added since the index was saved
+    assert run() == ['unchanged', 'changed']
+    assert '<><span />' in without.read_text()
@@ -0,0 +1,91 @@
+import pytest
+
+from codemods.scanner import (
+    COMMENT, NAME, NUMBER, PUNCT, REGEX, STRING, TAG_CLOSE, TAG_END, TAG_OPEN, TEMPLATE, TEXT,
+    newline_at, tokenize,
+)
+
+
+def _tokens(text, jsx=True):
+    return [(token.kind, text[token.start:token.end]) for token in tokenize(text, jsx=jsx)]
+
+
+def _kind(text, value, jsx=True):
+    return [kind for kind, found in _tokens(text, jsx) if found == value]
+
+
+@pytest.mark.parametrize('text, value', [
+    ('const r = x.replace(/\\//g, "-");', '/\\//g'),
+    ('return /<div>/.test(s);', '/<div>/'),
+    ('const ok = !/^\\d+$/.test(v);', '/^\\d+$/'),
+    ('items.filter(Boolean).map((s) => s.split(/[,;]/));', '/[,;]/'),
+])
+def test_slash_after_an_operator_or_keyword_starts_a_regex(text, value):
+    assert _kind(text, value) == [REGEX]
+
+
+@pytest.mark.parametrize('text', [
+    'const r = a / b / c;',
+    'const n = (a + b) / 2 / c;',
+    'const h = rows[0] / total;',
+    'const el = <p>{n / 2}</p>;',
+])
+def test_slash_after_an_operand_is_division(text):
+    assert REGEX not in dict(_tokens(text))
+    assert _kind(text, '/') == [PUNCT] * text.count(' / ')
+
+
+def test_templates_nest_through_substitutions():
+    text = 'const t = `a ${`b ${c}`} d ${ {k: 1}.k }`;'
+    assert _tokens(text)[3:] == [
+        (TEMPLATE, '`a ${'), (TEMPLATE, '`b ${'), (NAME, 'c'), (TEMPLATE, '}`'),
+        (TEMPLATE, '} d ${'), (PUNCT, '{'), (NAME, 'k'), (PUNCT, ':'), (NUMBER, '1'),
+        (PUNCT, '}'), (PUNCT, '.'), (NAME, 'k'), (TEMPLATE, '}`'), (PUNCT, ';')]
+
+
+def test_template_in_an_attribute_ends_before_the_tag():
+    text = '<div title={`${a}/${b}`}>{label}</div>'
+    assert _kind(text, '>') == [TAG_END]
+    assert _kind(text, '}/${') == [TEMPLATE]
+    assert _kind(text, '</div>') == [TAG_CLOSE]
+
+
+@pytest.mark.parametrize('text', [
+    'const f = <T,>(x: T) => x;',
+    'const [v, setV] = useState<string | null>(null);',
+    'const m = new Map<string, number>();',
+    'function id<T extends object>(x: T) { return x; }',
+    'const x = y as Array<Item>;',
+])
+def test_generics_are_not_jsx(text):
+    kinds = {kind for kind, _ in _tokens(text)}
+    assert not kinds & {TAG_OPEN, TAG_END, TAG_CLOSE, TEXT}
+
+
+def test_generic_function_returning_jsx():
+    text = 'function id<T extends object>(x: T) { return <div>{x}</div>; }'
+    assert _kind(text, '<') == [PUNCT]
+    assert _kind(text, '<div') == [TAG_OPEN]
+
+
+def test_less_than_in_an_expression_container():
+    text = '{a < b ? <b /> : <i>x</i>}'
+    assert _kind(text, '<') == [PUNCT]
+    assert _kind(text, '<b') == _kind(text, '<i') == [TAG_OPEN]
+
+
+def test_plain_typescript_never_opens_a_tag():
+    assert _kind('const a = b <c> d;', '<', jsx=False) == [PUNCT]
+
+
+def test_jsx_text_is_not_code():
+    text = "<p>Don't // stop</p>"
+    assert _tokens(text) == [(TAG_OPEN, '<p'), (TAG_END, '>'), (TEXT, "Don't // stop"),
+                             (TAG_CLOSE, '</p>')]
+    assert _kind('<a href="x">{/* c */}</a>', '/* c */') == [COMMENT]
+    assert _kind('<a href="x">{/* c */}</a>', '"x"') == [STRING]
+
+
+def test_newline_at_follows_the_line():
+    text = 'a\r\nb\nc'
+    assert [newline_at(text, pos) for pos in (0, 3, 5)] == ['\r\n', '\n', '\n']
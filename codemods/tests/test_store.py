@@ -0,0 +1,45 @@
+import subprocess
+import sys
+
+from codemods.store import REPO_ROOT, JsonStore, discover
+from codemods.symbols import SymbolIndex
+
+
+def test_saved_entries_load_again_and_missing_files_are_evicted(tmp_path):
+    page = tmp_path / 'page.tsx'
+    page.write_text('x')
+    store = JsonStore(tmp_path / 'store.json')
+    store.files = {str(page): {'size': 1}, str(tmp_path / 'gone.tsx'): {'size': 2}}
+    store.dirty = True
+    store.evict_missing()
+    store.save()
+    assert JsonStore(tmp_path / 'store.json').files == {str(page): {'size': 1}}
+
+
+def test_corrupt_or_other_format_is_an_empty_store(tmp_path):
+    path = tmp_path / 'store.json'
+    for content in ('{"format": 1, "fil', '[]', '{"format": 2, "files": {"a": {}}}'):
+        path.write_text(content)
+        store = JsonStore(path)
+        assert store.files == {} and not store.dirty
+
+
+def test_subclass_keeps_its_extra_state(tmp_path):
+    page = tmp_path / 'page.tsx'
+    page.write_text('const a = b;')
+    index = SymbolIndex(tmp_path / 'symbols.json')
+    index.refresh(discover(('*.tsx',), tmp_path))
+    index.save()
+    assert SymbolIndex(tmp_path / 'symbols.json').lookup('b') == {str(page): [10]}
+    page.unlink()
+    index.refresh([])
+    assert index.lookup('b') == {} and index.files == {}
+
+
+def test_read_only_commands_do_not_load_the_runner():
+    code = ('import sys, codemods.routes, codemods.symbols, codemods.imports, codemods.duplicates\n'
+            'print(sorted(m for m in ("codemods.runner", "codemods.pipeline", "codemods.workers")'
+            ' if m in sys.modules))')
+    done = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, capture_output=True,
+                          text=True, check=True)
+    assert done.stdout.strip() == '[]'
@@ -0,0 +1,51 @@
+import pytest
+
+from codemods.patch import apply_splices
+from codemods.verify import VerifyError, check_edits
+
+PAGE = '''const [open, setOpen] = useState(false);
+return (
+  <div className="card">
+    <p>{label}</p>
+  </div>
+);
+'''
+
+
+def _check(splices, new=None):
+    check_edits(PAGE, apply_splices(PAGE, splices) if new is None else new,
+                [(start, end) for start, end, _ in splices])
+
+
+def test_edits_inside_their_spans_pass():
+    label = PAGE.index('{label}')
+    start = PAGE.index('  <div')
+    _check([(start, start, '  {open && (\n'), (label, label + 7, '<>{label}</>')])
+
+
+def test_reindenting_is_not_a_change():
+    check_edits(PAGE, PAGE.replace('\n  ', '\n    '), [])
+
+
+def test_a_change_outside_the_spans_is_reported_with_its_line():
+    label = PAGE.index('{label}')
+    new = apply_splices(PAGE, [(label, label + 7, '{title}')]).replace('"card"', '"box"')
+    with pytest.raises(VerifyError, match='^line 3: '):
+        _check([(label, label + 7, '{title}')], new)
+
+
+def test_a_stray_token_at_either_end_is_reported():
+    for new in ('x' + PAGE, PAGE + ';'):
+        with pytest.raises(VerifyError):
+            check_edits(PAGE, new, [])
+
+
+def test_a_deleted_token_is_reported():
+    with pytest.raises(VerifyError, match='^line 6: '):
+        check_edits(PAGE, PAGE.replace('\n);', '\n)'), [])
+
+
+def test_spans_may_be_replaced_by_nothing():
+    start = PAGE.index('    <p>')
+    end = PAGE.index('  </div>')
+    _check([(start, end, '')])
@@ -0,0 +1,59 @@
+import pytest
+
+from codemods import journal
+from codemods.transforms import TRANSFORMS
+from codemods.watch import Watcher
+
+PAGE = '''export function Button({ isLoading }) {
+  return (
+    <button>
+      {isLoading ? (
+        <span className="spinner" />
+        <span>Processando...</span>
+      ) : (
+        <span>Enviar</span>
+      )}
+    </button>
+  );
+}
+'''
+
+
+@pytest.fixture
+def stray(monkeypatch):
+    monkeypatch.setitem(TRANSFORMS.modules, 'stray', 'codemods.tests.stray')
+    return 'stray'
+
+
+def test_a_save_is_fixed_and_written(tmp_path):
+    path = tmp_path / 'button.tsx'
+    path.write_text(PAGE)
+    Watcher(['fragments'], journal=tmp_path / 'journal').process(str(path))
+    assert path.read_text() == PAGE.replace(
+        '<span className', '<><span className').replace('</span>\n      ) : (', '</span></>\n      ) : (')
+
+
+def test_each_fix_is_journaled_and_rolls_back_newest_first(tmp_path):
+    directory = tmp_path / 'journal'
+    path = tmp_path / 'button.tsx'
+    path.write_text(PAGE)
+    watcher = Watcher(['fragments'], journal=directory)
+    watcher.process(str(path))
+    fixed = path.read_text()
+    path.write_text(PAGE.replace('Enviar', 'Salvar'))
+    watcher.process(str(path))
+    assert len(journal.runs(directory)) == 2
+    journal.rollback(directory=directory)
+    assert path.read_text() == PAGE.replace('Enviar', 'Salvar')
+    path.write_text(fixed)  # as the first fix left it
+    journal.rollback(directory=directory)
+    assert path.read_text() == PAGE
+
+
+def test_output_that_changes_code_outside_its_edits_is_not_written(tmp_path, stray, capsys):
+    path = tmp_path / 'page.tsx'
+    text = 'const a = STRAY;\nconst b = 1;\n'
+    path.write_text(text)
+    Watcher([stray], journal=tmp_path / 'journal').process(str(path))
+    assert path.read_text() == text
+    assert 'VerifyError' in capsys.readouterr().err
@@ -0,0 +1,123 @@
+"""
+Transforms that the runner can apply to any TSX file.
+
+Each transform declares ``(name, regex)`` triggers; ``registry`` folds the
+triggers of the selected transforms into one matcher, so a file is scanned
+once for all of them and files without a hit are skipped without being
+tokenized.  ``apply(text, hits)`` takes the file content and the
+transform's own hits and returns the new content (the same string when
+nothing changed).  ``splices(text, hits)`` returns the same change as
+``(start, end, replacement)`` splices, which lets the runner patch the
+file's bytes directly (see ``codemods.source``).
+``extents(text, hits)``, when given, maps each hit's start to the offset
+where the region the transform looks at for it ends, so watch mode can tell
+which hits an edit may affect; without it any edit after a hit counts.
+``symbols`` names identifiers or JSX elements of which a file needs at least
+one for the triggers to match; the runner then looks its candidate files up
+in the symbol index (see ``codemods.symbols``) instead of scanning every
+file.  Leave it empty when no such set exists.
+``imports`` is for a transform whose output for a file also depends on
+files it imports (a component's props, say): ``fnmatch`` patterns, relative
+to the repository root, of the imported files it reads.  Its cached results
+for a file then also depend on the content of those files, followed through
+the import graph (see ``codemods.imports``), so changing one re-runs the
+transform on the files that import it, and only on those.  Both built-in
+transforms only read the file itself.
+Bump ``version`` whenever a transform's output changes, so cached "already
+clean" results for it are discarded.
+
+Transforms are plugins: a module that defines ``TRANSFORM``.  ``PLUGINS``
+names the module of each built-in one, and ``CODEMOD_PLUGINS`` in the
+environment adds more (``name=package.module``, comma separated).  A
+plugin's module is only imported when its transform is looked up in
+``TRANSFORMS``, so selecting one transform never loads the others and
+listing them loads none.  Only the transforms in ``DEFAULT_TRANSFORMS`` run
+when none is selected; the others change page behaviour and only run when
+selected by name.
+"""
+
+import importlib
+import os
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from .registry import Hit, Registry
+
+# Transform name -> module defining it as TRANSFORM
+PLUGINS: Dict[str, str] = {
+    'fragments': 'codemods.fragments',
+    'collapsible': 'codemods.collapsible',
+}
+DEFAULT_TRANSFORMS = ('fragments',)
+
+
+class Transform(NamedTuple):
+    name: str
+    triggers: Tuple[Tuple[str, str], ...]
+    apply: Callable[[str, Sequence[Hit]], str]
+    version: int = 1
+    extents: Optional[Callable[[str, Sequence[Hit]], Dict[int, int]]] = None
+    splices: Optional[Callable[[str, Sequence[Hit]], List[Tuple[int, int, str]]]] = None
+    symbols: Tuple[str, ...] = ()
+    imports: Tuple[str, ...] = ()
+
+    @property
+    def cache_key(self) -> str:
+        return '%s@%d' % (self.name, self.version)
+
+
+def discover(environ: Mapping[str, str] = os.environ) -> Dict[str, str]:
+    """``PLUGINS`` plus the plugins listed in ``CODEMOD_PLUGINS``."""
+    plugins = dict(PLUGINS)
+    for entry in environ.get('CODEMOD_PLUGINS', '').split(','):
+        name, sep, module = entry.strip().partition('=')
+        if sep and name.strip() and module.strip():
+            plugins[name.strip()] = module.strip()
+    return plugins
+
+
+class Plugins(Mapping[str, Transform]):
+    """Transforms by name, each imported from its module on first lookup."""
+
+    def __init__(self, modules: Dict[str, str]):
+        self.modules = modules
+        self._loaded: Dict[str, Transform] = {}
+
+    def __getitem__(self, name: str) -> Transform:
+        transform = self._loaded.get(name)
+        if transform is None:
+            module = importlib.import_module(self.modules[name])
+            transform = getattr(module, 'TRANSFORM', None)
+            if not isinstance(transform, Transform) or transform.name != name:
+                raise ImportError('%s does not define the transform %r as TRANSFORM'
+                                  % (module.__name__, name))
+            self._loaded[name] = transform
+        return transform
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.modules)
+
+    def __len__(self) -> int:
+        return len(self.modules)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.modules
+
+    @property
+    def loaded(self) -> List[str]:
+        """The names of the transforms imported so far."""
+        return list(self._loaded)
+
+
+TRANSFORMS = Plugins(discover())
+
+
+def default_names() -> List[str]:
+    """The transforms to run when none is selected."""
+    return [name for name in DEFAULT_TRANSFORMS if name in TRANSFORMS]
+
+
+@lru_cache(maxsize=None)
+def registry(names: Tuple[str, ...]) -> Registry:
+    """The combined trigger matcher for the transforms ``names``, compiled once."""
+    return Registry({name: TRANSFORMS[name].triggers for name in names})
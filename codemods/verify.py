@@ -0,0 +1,138 @@
+"""
+Check that an edit changed nothing outside its intended spans.
+
+``check_edits`` is the gate that runs next to ``check_balance`` before a
+file is written: the original and the new text are both tokenized, each
+token is reduced to a hash of its kind and text (with runs of whitespace
+collapsed, so re-indenting is not a change), and the original's tokens
+outside the intended edit spans must appear in the new stream, in order,
+with nothing between them but whatever replaced those spans.
+
+The spans cut the original's token hashes into segments; the first must
+start the new stream and the last must end it, and each one in between is
+looked up with Knuth-Morris-Pratt from where the previous one matched.
+Every token of either file is hashed once and every position of the new
+stream is visited a bounded number of times, so the check is linear in the
+size of the two files whatever the number of spans.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+from .scanner import COMMENT, TEXT, tokenize
+
+# ``(start, end)`` of an intended edit in the original text; ``start ==
+# end`` for an insertion
+Span = Tuple[int, int]
+
+
+class VerifyError(ValueError):
+    """An edit changed tokens outside the spans it was meant to touch."""
+
+
+def token_hashes(text: str, jsx: bool = True) -> Tuple[List[int], List[Span]]:
+    """The hash and the ``(start, end)`` span of every token of ``text``."""
+    hashes, spans = [], []
+    for tok in tokenize(text, jsx=jsx):
+        value = text[tok.start:tok.end]
+        if tok.kind in (TEXT, COMMENT):
+            value = ' '.join(value.split())
+        hashes.append(hash((tok.kind, value)))
+        spans.append((tok.start, tok.end))
+    return hashes, spans
+
+
+def _segments(tokens: Sequence[Span], spans: Sequence[Span]) -> List[Tuple[int, int]]:
+    """``(first, end)`` index ranges of the tokens between the edit spans.
+
+    A token that overlaps a span, or straddles the offset of an insertion,
+    belongs to the edit and to no segment.
+    """
+    segments = []
+    first = i = 0
+    count = len(tokens)
+    for start, end in sorted(spans):
+        while i < count and tokens[i][1] <= start:
+            i += 1
+        segments.append((first, i))
+        while i < count and tokens[i][0] < end:
+            i += 1
+        first = max(first, i)
+    segments.append((first, count))
+    return segments
+
+
+def _failure(pattern: Sequence[int]) -> List[int]:
+    table = [0] * len(pattern)
+    k = 0
+    for i in range(1, len(pattern)):
+        while k and pattern[i] != pattern[k]:
+            k = table[k - 1]
+        if pattern[i] == pattern[k]:
+            k += 1
+        table[i] = k
+    return table
+
+
+def _find(stream: Sequence[int], pattern: Sequence[int], pos: int) -> int:
+    """The first index at or after ``pos`` where ``pattern`` occurs, or -1."""
+    table = _failure(pattern)
+    k = 0
+    for i in range(pos, len(stream)):
+        while k and stream[i] != pattern[k]:
+            k = table[k - 1]
+        if stream[i] == pattern[k]:
+            k += 1
+            if k == len(pattern):
+                return i - k + 1
+    return -1
+
+
+def _common(a: Sequence[int], b: Sequence[int]) -> int:
+    """The length of the common prefix of ``a`` and ``b``."""
+    return next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), min(len(a), len(b)))
+
+
+def check_edits(original: str, new: str, spans: Sequence[Span], jsx: bool = True,
+                hashes: Optional[Tuple[List[int], List[Span]]] = None) -> None:
+    """Raise ``VerifyError`` unless ``new`` only differs from ``original`` in ``spans``.
+
+    ``spans`` are ``(start, end)`` offsets in ``original``; each may have
+    been replaced by anything, including nothing.  ``hashes`` are
+    ``token_hashes(original, jsx)`` when the caller already has them.
+    """
+    old_hashes, old_tokens = hashes if hashes is not None else token_hashes(original, jsx)
+    new_hashes, new_tokens = token_hashes(new, jsx)
+    segments = _segments(old_tokens, spans)
+
+    def line(index: int) -> int:
+        offset = old_tokens[index][0] if index < len(old_tokens) else len(original)
+        return original.count('\n', 0, offset) + 1
+
+    def fail(index: int, end: Optional[int] = None) -> VerifyError:
+        where = 'line %d' % line(index)
+        if end is not None and line(end - 1) != line(index):
+            where = 'lines %d-%d' % (line(index), line(end - 1))
+        return VerifyError('%s: code outside the intended edits changed' % where)
+
+    last = len(segments) - 1
+    pos = 0
+    for number, (first, end) in enumerate(segments):
+        pattern = old_hashes[first:end]
+        if number == 0:
+            same = _common(pattern, new_hashes)
+            if same < len(pattern) or (last == 0 and len(new_hashes) != len(pattern)):
+                raise fail(first + same)
+            found = 0
+        elif number == last:
+            found = len(new_hashes) - len(pattern)
+            if found < pos:
+                raise fail(first, end)
+            if new_hashes[found:] != pattern:
+                raise fail(end - 1 - _common(pattern[::-1], new_hashes[::-1]))
+        elif not pattern:
+            continue
+        else:
+            found = _find(new_hashes, pattern, pos)
+            if found < 0:  # somewhere in the segment: where its match was lost is unknown
+                raise fail(first, end)
+        pos = found + len(pattern)
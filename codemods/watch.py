@@ -0,0 +1,370 @@
+"""
+Re-apply the codemod transforms to TSX files as they are saved.
+
+Usage (from the repository root)::
+
+    python -m codemods.watch                        # default transforms, client/src
+    python -m codemods.watch -t fragments -t collapsible
+    python -m codemods.watch client/src/pages       # one directory
+    python -m codemods.watch --poll 0.2             # stat polling instead of inotify
+    python -m codemods.journal --rollback           # undo the latest fix, once stopped
+
+Saves are picked up with inotify (through ``ctypes``; nothing to install)
+or, where that is unavailable, by polling ``os.stat``.  Every watched file
+keeps its last content, trigger hits and, per hit, the extent of the region
+its transform looked at.  On a save only the hits whose region overlaps the
+edited span are handed to the transforms, so only those branches are
+tokenized again; the rest of the file is not looked at beyond the trigger
+scan.  That holds for ``fragments``; ``collapsible`` names its state
+variables and extends the imports from the whole page, so it parses the
+whole file again whenever an edit touches one of its sections, and is only
+skipped, not narrowed, when none does.  Each transform runs as a splice list (see ``codemods.pipeline``), and
+output goes through the same checks as the runner's: tags and brackets pair
+up (``codemods.balance``) and no token outside the transforms' edits
+changed (``codemods.verify``).  Like the runner, only the edited span of the
+file's bytes is rewritten.  Every fix written is recorded in the undo
+journal as a run of its own (see ``codemods.journal``); stop watching before
+rolling one back, or the watcher fixes the file again.
+
+When a selected transform depends on what a file imports
+(``Transform.imports``), a save of a file it reads, ``.ts`` or ``.tsx``,
+also re-checks the watched files that import it, directly or not, found in
+the import graph (see ``codemods.imports``).
+"""
+
+import argparse
+import ctypes
+import fnmatch
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .balance import check_balance
+from .imports import ImportGraph, load_graph
+from .journal import JOURNAL_DIR, Journal
+from .output import atomic_write
+from .pipeline import Pipeline
+from .registry import Hit
+from .source import changed_span, read_source
+from .store import REPO_ROOT, display
+from .transforms import TRANSFORMS, default_names, registry
+from .verify import check_edits
+
+WATCH_ROOT = REPO_ROOT / 'client' / 'src'
+SUFFIX = '.tsx'
+
+# A save is often several writes (truncate, write, rename): wait this long
+# for the burst to end before reading the file
+SETTLE = 0.01
+# Fixing a file changes it again; stop after this many rounds regardless
+MAX_ROUNDS = 8
+
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_ISDIR = 0x40000000
+_IN_Q_OVERFLOW = 0x4000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len; then the name
+
+
+class _FileState:
+    __slots__ = ('text', 'hits', 'extents')
+
+    def __init__(self):
+        self.text = ''
+        self.hits: List[Hit] = []
+        self.extents: Dict[int, int] = {}
+
+
+class Watcher:
+    """Keeps the per-file index and applies the transforms to each save.
+
+    Each fix written is recorded in the undo journal in ``journal``, unless
+    that is ``None``.
+    """
+
+    def __init__(self, names: Sequence[str], write: bool = True,
+                 graph: Optional[ImportGraph] = None, journal: Optional[Path] = JOURNAL_DIR):
+        self.names = list(names)
+        self.matcher = registry(tuple(names))
+        self.write = write
+        self.journal = journal
+        self.files: Dict[str, _FileState] = {}
+        self.graph = graph
+        self.patterns = [p for name in names for p in TRANSFORMS[name].imports]
+
+    def _reindex(self, state: _FileState, text: str) -> List[Hit]:
+        """Move ``state`` to ``text``; return the hits the change may affect."""
+        start, old_end, new_end = changed_span(state.text, text) if state.text else (0, 0, len(text))
+        delta = new_end - old_end
+        hits = self.matcher.scan(text)
+        old_starts = {hit.start for hit in state.hits}
+        extents = {}
+        candidates = []
+        for hit in hits:
+            if hit.end <= start:
+                # before the edit: untouched unless its region reaches into it
+                extent = state.extents.get(hit.start)
+                if extent is not None and extent <= start:
+                    extents[hit.start] = extent
+                    continue
+            elif hit.start >= new_end:
+                # after the edit: everything from the trigger on just moved
+                extent = state.extents.get(hit.start - delta)
+                if extent is not None:
+                    extents[hit.start] = extent + delta
+                    continue
+                if hit.start - delta in old_starts:
+                    continue  # still runs off the end of the file, as before
+            candidates.append(hit)
+        for name in self.names:
+            extent = TRANSFORMS[name].extents
+            mine = [h for h in candidates if h.transform == name]
+            if extent is not None and mine:
+                extents.update(extent(text, mine))
+        state.text, state.hits, state.extents = text, hits, extents
+        return candidates
+
+    def update(self, path: str, text: str) -> Tuple[str, List[str]]:
+        """Apply the transforms to a new ``text`` of ``path``.
+
+        Returns the resulting content and the transforms that changed it.
+        Raises ``VerifyError`` when a transform changed tokens outside its
+        own edits.
+        """
+        state = self.files.setdefault(path, _FileState())
+        jsx = not path.endswith('.ts')
+        applied = []
+        for _ in range(MAX_ROUNDS):
+            candidates = self._reindex(state, text)
+            for name in self.names:
+                mine = [h for h in candidates if h.transform == name]
+                if not mine:
+                    continue
+                pipeline = Pipeline(text)
+                if pipeline.add(name, mine):
+                    new = pipeline.text()
+                    check_edits(text, new, pipeline.spans, jsx=jsx)
+                    applied.append(name)
+                    text = new
+                    break  # offsets moved: reindex before the next transform
+            else:
+                break
+        return text, applied
+
+    def dependents(self, path: str) -> List[str]:
+        """The watched files to check again because ``path``, which they import, changed."""
+        if self.graph is None or not self.patterns:
+            return []
+        self.graph.update(path)
+        name = os.path.relpath(path, REPO_ROOT).replace(os.sep, '/')
+        if not any(fnmatch.fnmatchcase(name, pattern) for pattern in self.patterns):
+            return []
+        return sorted(p for p in self.graph.dependents([path]) if p in self.files)
+
+    def process(self, path: str, force: bool = False) -> None:
+        """Handle a save of ``path``: fix it and write it back if needed.
+
+        With ``force`` every hit is handed to the transforms again, even when
+        the file itself did not change.
+        """
+        started = time.perf_counter()
+        if force:
+            self.files.pop(path, None)
+        try:
+            source = read_source(path)
+        except OSError:
+            return
+        text = source.text
+        state = self.files.get(path)
+        if state is not None and state.text == text:
+            return  # our own write, or a touch
+        try:
+            fixed, applied = self.update(path, text)
+            if applied:
+                check_balance(text, fixed, jsx=not path.endswith('.ts'))
+        except Exception as e:  # keep watching whatever one file does
+            self.files.pop(path, None)
+            print('error      %s: %s: %s' % (display(path), type(e).__name__, e), file=sys.stderr)
+            return
+        if applied and self.write:
+            data = source.with_text(fixed)
+            atomic_write(path, data)
+            if self.journal is not None:
+                record = Journal(self.journal)
+                record.add_content(path, source.data, data)
+                record.save()
+        elif applied:  # the file keeps its old content: index that instead
+            self._reindex(self.files[path], text)
+        if applied:
+            print('changed    %s (%s) in %.1f ms' % (display(path), ', '.join(applied),
+                                                     (time.perf_counter() - started) * 1000),
+                  flush=True)
+
+
+class _Inotify:
+    """Just enough of inotify(7) to watch directory trees for saves."""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._dirs: Dict[int, str] = {}
+
+    def add_tree(self, root: str) -> List[str]:
+        """Watch ``root`` and its subdirectories; return the files already there."""
+        found = []
+        for directory, subdirs, files in os.walk(root):
+            subdirs[:] = [d for d in subdirs if d != 'node_modules' and not d.startswith('.')]
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), _WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), 'inotify_add_watch failed: %s' % directory)
+            self._dirs[wd] = directory
+            found.extend(os.path.join(directory, name) for name in files)
+        return found
+
+    def read(self, timeout: Optional[float]) -> Optional[List[str]]:
+        """Paths written since the last call; ``None`` when the queue overflowed."""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        paths = []
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, pos)
+            pos += _EVENT.size
+            name = data[pos:pos + length].rstrip(b'\0').decode('utf-8', 'replace')
+            pos += length
+            if mask & _IN_Q_OVERFLOW:
+                return None
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, name)
+            if mask & _IN_ISDIR:
+                if mask & _IN_CREATE:  # files may land before the new watch does
+                    paths.extend(self.add_tree(path))
+            else:
+                paths.append(path)
+        return paths
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def _inotify_batches(notify: _Inotify) -> Iterator[Optional[List[str]]]:
+    try:
+        while True:
+            paths = notify.read(None)
+            # let the rest of the save land, then report it as one batch
+            while paths is not None:
+                more = notify.read(SETTLE)
+                if more is None:
+                    paths = None
+                elif more:
+                    paths += more
+                    continue
+                break
+            yield paths
+    finally:
+        notify.close()
+
+
+def _tracked(roots: Sequence[str]) -> Dict[str, Tuple[int, int]]:
+    stamps = {}
+    for root in roots:
+        for directory, subdirs, files in os.walk(root):
+            subdirs[:] = [d for d in subdirs if d != 'node_modules' and not d.startswith('.')]
+            for name in files:
+                if name.endswith(('.ts', SUFFIX)):  # .ts: for the files that import it
+                    path = os.path.join(directory, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    stamps[path] = (st.st_mtime_ns, st.st_size)
+    return stamps
+
+
+def _poll_batches(roots: Sequence[str], interval: float) -> Iterator[List[str]]:
+    stamps = _tracked(roots)
+    while True:
+        time.sleep(interval)
+        current = _tracked(roots)
+        changed = [p for p, stamp in current.items() if stamps.get(p) != stamp]
+        stamps = current
+        if changed:
+            yield changed
+
+
+def watch(roots: Sequence[str], names: Sequence[str], poll: Optional[float] = None,
+          write: bool = True, journal: Optional[Path] = JOURNAL_DIR) -> None:
+    """Fix every file under ``roots`` once, then each one again as it is saved."""
+    graph = load_graph() if any(TRANSFORMS[name].imports for name in names) else None
+    watcher = Watcher(names, write, graph, journal)
+    for path in sorted(_tracked(roots)):
+        if path.endswith(SUFFIX):
+            watcher.process(path)
+    print('watching %s (%s)' % (', '.join(display(r) for r in roots), ', '.join(names)),
+          flush=True)
+
+    batches = None
+    if poll is None:
+        try:
+            notify = _Inotify()
+            for root in roots:
+                notify.add_tree(root)
+            batches = _inotify_batches(notify)
+        except (OSError, AttributeError) as e:  # AttributeError: no inotify in this libc
+            print('inotify unavailable (%s); polling instead' % e, file=sys.stderr)
+    if batches is None:
+        batches = _poll_batches(roots, poll or 0.2)
+    for batch in batches:
+        if batch is None:  # events were lost: look at everything
+            batch = list(_tracked(roots))
+        for path in dict.fromkeys(batch):
+            path = os.path.abspath(path)
+            if path.endswith(SUFFIX) and os.path.isfile(path):
+                watcher.process(path)
+            for dependent in watcher.dependents(path):
+                watcher.process(dependent, force=True)
+        if graph is not None:
+            graph.save()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m codemods.watch',
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument('roots', nargs='*', type=Path,
+                        help='directories to watch (default: %s)' % display(str(WATCH_ROOT)))
+    parser.add_argument('-t', '--transform', action='append', choices=sorted(TRANSFORMS),
+                        help='transform to apply; repeatable (default: all default transforms)')
+    parser.add_argument('--poll', type=float, metavar='SECONDS',
+                        help='poll file stamps at this interval instead of using inotify')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='report what would change without writing')
+    parser.add_argument('--no-journal', action='store_true',
+                        help='do not record the fixes in .codemod-journal/ for rollback')
+    args = parser.parse_args(argv)
+
+    names = args.transform or default_names()
+    roots = [os.path.abspath(r) for r in (args.roots or [WATCH_ROOT])]
+    try:
+        watch(roots, names, args.poll, write=not args.dry_run,
+              journal=None if args.no_journal else JOURNAL_DIR)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Worker processes with a time and memory budget per task.
+
+``concurrent.futures`` cannot stop a task once it runs, so one file that
+sends a pattern into catastrophic backtracking would hold up the whole run.
+``WorkerPool`` keeps one pipe per worker process and hands out one task at
+a time.  A task that is still running when its time budget is up gets its
+worker killed and replaced; a worker that dies (killed for memory by the
+kernel, say) is replaced too.  Either way that task is reported as failed
+and the others carry on at full width.  The memory budget is an address
+space limit (``RLIMIT_AS``) set in each worker, so a runaway allocation
+fails with ``MemoryError`` inside the task instead of swapping the machine;
+it is not enforced where the ``resource`` module is missing.
+"""
+
+import multiprocessing
+import time
+from collections import deque
+from multiprocessing.connection import wait
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+
+class TaskFailed(Exception):
+    """A task that produced no result: over budget, or its worker died."""
+
+
+def _serve(conn, fn: Callable, memory: Optional[int]) -> None:
+    if memory and resource is not None:
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+        except (ValueError, OSError):
+            pass  # a lower hard limit is already in place
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        number, args = task
+        try:
+            result = fn(*args)
+        except BaseException as e:  # reported to the caller, the worker lives on
+            result = TaskFailed('%s: %s' % (type(e).__name__, e))
+        conn.send((number, result))
+
+
+class _Worker:
+    __slots__ = ('process', 'conn', 'task', 'deadline')
+
+    def __init__(self, context, fn: Callable, memory: Optional[int]):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child, fn, memory), daemon=True)
+        self.process.start()
+        child.close()
+        self.task: Optional[int] = None
+        self.deadline: Optional[float] = None
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class WorkerPool:
+    """``size`` worker processes running ``fn`` under per-task budgets.
+
+    ``timeout`` is in seconds and ``memory`` in bytes; ``None`` or ``0``
+    means no limit.
+    """
+
+    def __init__(self, fn: Callable, size: int, timeout: Optional[float] = None,
+                 memory: Optional[int] = None):
+        self.fn = fn
+        self.size = max(1, size)
+        self.timeout = timeout or None
+        self.memory = memory or None
+        self._context = multiprocessing.get_context()
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self._context, self.fn, self.memory)
+
+    def map(self, tasks: Iterable[Sequence[Any]]) -> Iterator[Tuple[int, Any]]:
+        """Run ``fn(*args)`` for each task; yield ``(number, result)`` as tasks finish.
+
+        ``number`` is the task's position in ``tasks``.  A task that failed
+        yields a ``TaskFailed`` as its result.
+        """
+        pending = deque(enumerate(tasks))
+        workers = [self._spawn() for _ in range(min(self.size, len(pending)))]
+        busy: Dict[Any, _Worker] = {}
+        try:
+            while pending or busy:
+                for worker in workers:
+                    if worker.task is None and pending:
+                        number, args = pending.popleft()
+                        worker.conn.send((number, tuple(args)))
+                        worker.task = number
+                        worker.deadline = (time.monotonic() + self.timeout
+                                           if self.timeout else None)
+                        busy[worker.conn] = worker
+                deadlines = [w.deadline for w in busy.values() if w.deadline is not None]
+                wait_for = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+                for conn in wait(list(busy), wait_for):
+                    worker = busy.pop(conn)
+                    try:
+                        number, result = conn.recv()
+                    except (EOFError, OSError):
+                        number = worker.task
+                        worker.kill()
+                        code = worker.process.exitcode
+                        workers[workers.index(worker)] = self._spawn()
+                        result = TaskFailed('worker died (exit code %s)' % code)
+                    worker.task = None
+                    yield number, result
+                now = time.monotonic()
+                for conn, worker in list(busy.items()):
+                    if worker.deadline is not None and worker.deadline <= now:
+                        del busy[conn]
+                        number = worker.task
+                        worker.kill()
+                        workers[workers.index(worker)] = self._spawn()
+                        yield number, TaskFailed('over the time budget of %gs' % self.timeout)
+        finally:
+            for worker in workers:
+                if worker.task is None or not worker.process.is_alive():
+                    worker.stop()
+                else:
+                    worker.kill()
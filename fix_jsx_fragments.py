@@ -1,73 +1,97 @@
 #!/usr/bin/env python3
 """
 Script to fix JSX fragment issues in checkout.tsx
+
+    python fix_jsx_fragments.py               # show the fixes as a diff
+    python fix_jsx_fragments.py fixes.json    # also save them as an edit plan
+
+Nothing is written to the page; a saved plan is applied with
+python -m codemods.plan fixes.json --apply.
+
+The fixes target the old layout of the page, where the payment states were
+ternary branches opened by "// Payment Confirmed State" and "// Payment
+Rejected State" comments.  The current checkout.tsx no longer has those
+branches, so on it the script changes nothing and exits saying the layout
+was not found.
 """
 
-import re
+import sys
+
+from codemods.apply import repo_path
+from codemods.balance import BalanceError, check_balance
+from codemods.patch import (
+    INSERT_AFTER, REPLACE, Anchor, AnchorError, Edit, apply_splices, edit_splices,
+)
+from codemods.plan import Plan
+from codemods.source import read_source
+
+PAGE = 'client/src/pages/checkout.tsx'
+
+CONFIRMED = Anchor('// Payment Confirmed State')
+REJECTED = Anchor('// Payment Rejected State', after=CONFIRMED)
+# The branch after the rejected one: ") : (" opens the pending state
+PENDING = Anchor(') : (', after=REJECTED)
+
+# Define the fixes needed based on the task requirements, anchored on the
+# state comments instead of absolute line numbers.  Each fragment line takes
+# its indentation from the page: the first line of the branch it wraps
+# (the state comment, or the line after ") : ("), not the line it replaces
+FIXES = [
+    # After "Payment Confirmed State" comment
+    Edit(CONFIRMED, REPLACE, '<>', level=0),
+    # Before closing the first condition
+    Edit(Anchor(") : pixPaymentStatus === 'rejected' ? (", after=CONFIRMED, offset=-1),
+         REPLACE, '</>', expect='', level=0, like=CONFIRMED),
+    # After "Payment Rejected State" comment
+    Edit(REJECTED, REPLACE, '<>', level=0),
+    # Before closing the second condition
+    Edit(PENDING._replace(offset=-1), REPLACE, '</>', expect='', level=0, like=REJECTED),
+    # After ") : (" for the third condition
+    Edit(PENDING, INSERT_AFTER, '<>', level=0, like=PENDING._replace(offset=1)),
+]
+
 
-def fix_jsx_fragments():
+def fix_jsx_fragments(plan_path=None):
     # Read the file
-    with open('client/src/pages/checkout.tsx', 'r') as f:
-        lines = f.readlines()
-    
-    # Define the fixes needed based on the task requirements
-    fixes = [
-        {
-            'line': 3245,  # After "Payment Confirmed State" comment
-            'action': 'replace',
-            'old': '                    // Payment Confirmed State\n',
-            'new': '                    <>\n'
-        },
-        {
-            'line': 3267,  # Before closing the first condition
-            'action': 'replace', 
-            'old': '              \n',
-            'new': '                    </>\n'
-        },
-        {
-            'line': 3270,  # After "Payment Rejected State" comment
-            'action': 'replace',
-            'old': '                    // Payment Rejected State\n',
-            'new': '                    <>\n'
-        },
-        {
-            'line': 3286,  # Before closing the second condition
-            'action': 'replace',
-            'old': '              \n',
-            'new': '                    </>\n'
-        },
-        {
-            'line': 3289,  # After ") : (" for the third condition
-            'action': 'insert_after',
-            'new': '                    <>\n'
-        }
-    ]
-    
+    source = read_source(repo_path(PAGE))
+    content = source.text
+
     # Apply fixes
-    modified_lines = lines[:]
-    offset = 0
-    
-    for fix in fixes:
-        line_idx = fix['line'] - 1 + offset  # Convert to 0-based index
-        
-        if fix['action'] == 'replace':
-            if line_idx < len(modified_lines):
-                print(f"Replacing line {fix['line']}: {repr(modified_lines[line_idx].rstrip())}")
-                modified_lines[line_idx] = fix['new']
-        elif fix['action'] == 'insert_after':
-            if line_idx < len(modified_lines):
-                print(f"Inserting after line {fix['line']}: {repr(fix['new'].rstrip())}")
-                modified_lines.insert(line_idx + 1, fix['new'])
-                offset += 1
-    
-    # Show what we're working with around the problematic areas
-    print("\n=== SHOWING LINES AROUND KEY AREAS ===")
-    for line_num in [3244, 3245, 3246, 3267, 3268, 3269, 3270, 3271, 3286, 3287, 3288, 3289, 3290]:
-        if line_num - 1 < len(lines):
-            print(f"Line {line_num}: {repr(lines[line_num - 1].rstrip())}")
-    
-    return modified_lines
+    try:
+        splices, applied = edit_splices(content, FIXES)
+    except AnchorError as e:
+        sys.exit(f"Nothing to fix: {PAGE} does not have the layout these fixes "
+                 f"target (already fixed, or changed since): {e}")
+    modified = apply_splices(content, splices)
+
+    lines = content.splitlines()
+    for fix, line_num in applied:
+        if fix.action == REPLACE:
+            print(f"Replacing line {line_num}: {repr(lines[line_num - 1].rstrip())}")
+        else:
+            print(f"Inserting after line {line_num}: {repr(fix.text.rstrip())}")
+
+    # Show the fixes in context, as a diff rendered from the edits themselves
+    plan = Plan()
+    plan.add(PAGE, source, splices, 'fix_jsx_fragments')
+    print("\n=== PLANNED CHANGES ===")
+    sys.stdout.writelines(plan.diff(context=1))
+
+    # Check the result pairs up before anyone writes it out
+    try:
+        check_balance(content, modified)
+        print("\nFragments balanced.")
+    except BalanceError as e:
+        print(f"\nWARNING: result is unbalanced: {e}")
+
+    if plan_path:
+        plan.save(plan_path)
+        print(f"Plan saved to {plan_path}; apply it with: "
+              f"python -m codemods.plan {plan_path} --apply")
+
+    return modified.splitlines(keepends=True)
+
 
 if __name__ == '__main__':
-    modified_lines = fix_jsx_fragments()
-    print(f"\nScript completed. Found {len(modified_lines)} total lines.")
\ No newline at end of file
+    modified_lines = fix_jsx_fragments(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"\nScript completed. Found {len(modified_lines)} total lines.")
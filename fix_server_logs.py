@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Gate the console.log calls of the server's request paths behind LOG_LEVEL.
+
+    python fix_server_logs.py                    # rewrite the default files
+    python fix_server_logs.py --report           # count the calls per file, write nothing
+    python fix_server_logs.py server/index.ts    # other files
+
+Each console.log(...) becomes a logger.debug(...) call that only runs, and
+only builds its arguments, when server/utils/logger.ts has debug enabled.
+This is ``python -m codemods logs`` (see ``codemods.logs``).
+"""
+
+import sys
+
+from codemods.logs import main
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,30 @@
+/**
+ * Logger com nível configurável pela variável LOG_LEVEL
+ * (debug, info, warn, error ou silent; padrão: info em produção, debug fora dela).
+ *
+ * Os logs de depuração do servidor são escritos como
+ * `if (logger.debugEnabled) logger.debug(...)`, para que os objetos passados
+ * como argumento nem sejam montados quando o nível está desativado.
+ */
+
+const LEVELS = { debug: 10, info: 20, warn: 30, error: 40, silent: 50 } as const;
+
+export type LogLevel = keyof typeof LEVELS;
+
+function resolveLevel(value: string | undefined): LogLevel {
+  const level = value?.trim().toLowerCase();
+  if (level && level in LEVELS) {
+    return level as LogLevel;
+  }
+  return process.env.NODE_ENV === 'production' ? 'info' : 'debug';
+}
+
+const level = resolveLevel(process.env.LOG_LEVEL);
+
+export const logger = {
+  level,
+  debugEnabled: LEVELS[level] <= LEVELS.debug,
+  debug: (...args: unknown[]): void => {
+    console.log(...args);
+  },
+};